@@ -1,13 +1,26 @@
+import asyncio
 import io
+import json
 import logging
+from contextlib import asynccontextmanager
 from functools import lru_cache
 
+import numpy as np
+import torch
 import torchaudio  # type: ignore
-from fastapi import FastAPI, File, UploadFile, Query
-from fastapi.responses import JSONResponse
+import yaml
+from fastapi import FastAPI, File, HTTPException, UploadFile, Query, WebSocket
+from fastapi.responses import JSONResponse, Response
 from transformers import AutoModelForCTC, AutoProcessor  # type: ignore
 
+from phonometrics.audio_processing.pitch import pitch_contour
+from phonometrics.audio_processing.resampling import StreamingResampler, resample
+from phonometrics.audio_processing.vad import SpeechTrimmer
+from phonometrics.cache import ResultCache
+from phonometrics.transcription.phonemes.artifacts import load_or_create_artifacts
+from phonometrics.transcription.phonemes.batching import MicroBatchScheduler
 from phonometrics.transcription.phonemes.model import TranscriptionModel
+from phonometrics.transcription.phonemes.posteriorgram import ENCODINGS as POSTERIORGRAM_ENCODINGS
 from phonometrics.transcription.words.whisper_local import LocalWhisperModel
 from phonometrics.transcription.words.whisper_openai import OpenAIWhisperModel
 
@@ -15,26 +28,273 @@ from phonometrics.transcription.words.whisper_openai import OpenAIWhisperModel
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# Load configuration
+with open("config.yaml", "r") as f:
+    config = yaml.safe_load(f)
+phoneme_config = config.get("phoneme_transcription", {})
+vad_config = config.get("vad", {})
+resampling_quality = config.get("resampling", {}).get("quality", "high")
+trimmer = SpeechTrimmer(**vad_config.get("options", {})) if vad_config.get("enabled") else None
 
 # Transcriber setup
 MODEL_NAME = "Cnam-LMSSC/wav2vec2-french-phonemizer"
 logger.info("Initializing transcriber...")
+chunking_config = phoneme_config.get("chunking", {})
+if phoneme_config.get("artifact_dir") is not None:
+    model, processor, token_set = load_or_create_artifacts(MODEL_NAME, phoneme_config["artifact_dir"])
+else:
+    model = AutoModelForCTC.from_pretrained(MODEL_NAME)
+    processor = AutoProcessor.from_pretrained(MODEL_NAME)
+    token_set = None
 transcriber = TranscriptionModel(
-    model=AutoModelForCTC.from_pretrained(MODEL_NAME),
-    processor=AutoProcessor.from_pretrained(MODEL_NAME)
+    model=model,
+    processor=processor,
+    chunk_length_s=chunking_config.get("chunk_length_s"),
+    chunk_overlap_s=chunking_config.get("chunk_overlap_s", 1.0),
+    chunk_batch_size=chunking_config.get("batch_size", 1),
+    precision=phoneme_config.get("precision", "fp32"),
+    backend=phoneme_config.get("backend", "torch"),
+    onnx_cache_dir=phoneme_config.get("onnx_cache_dir"),
+    compile_buckets_s=phoneme_config.get("compile_buckets_s"),
+    max_batch_size=phoneme_config.get("batching", {}).get("max_batch_size", 8),
+    decoder=phoneme_config.get("decoder", {}).get("name", "greedy"),
+    decoder_options=phoneme_config.get("decoder", {}).get("options"),
+    token_set=token_set,
+    trimmer=trimmer,
+    num_encoder_layers=phoneme_config.get("fast_mode", {}).get("num_encoder_layers"),
+    encoder_adapter=phoneme_config.get("fast_mode", {}).get("adapter"),
+    resampling_quality=resampling_quality,
 )
-logger.info("Transcriber ready.")
+batching_config = phoneme_config.get("batching", {})
+scheduler = MicroBatchScheduler(
+    transcriber,
+    max_batch_size=batching_config.get("max_batch_size", 8),
+    max_wait_ms=batching_config.get("max_wait_ms", 10),
+)
+logger.info("Transcriber loaded.")
+
+# Live sessions, each one runs a bounded window through the model per step
+streaming_config = phoneme_config.get("streaming", {})
+stream_slots = asyncio.Semaphore(streaming_config.get("max_sessions", 8))
+
+# Result cache setup, the results depend on the whole model and VAD configuration
+cache_config = config.get("result_cache", {})
+result_cache = ResultCache(
+    max_memory_bytes=int(cache_config.get("max_memory_mb", 64) * 2**20),
+    directory=cache_config.get("directory"),
+    max_disk_bytes=int(cache_config.get("max_disk_mb", 256) * 2**20),
+)
+PHONEME_MODEL_ID = json.dumps(
+    {"model": MODEL_NAME, "vad": vad_config, "resampling": resampling_quality, **phoneme_config}, sort_keys=True
+)
+WORDS_MODEL_ID = json.dumps(
+    {"vad": vad_config, "resampling": resampling_quality, **config.get("local_whisper", {})}, sort_keys=True
+)
+
+
+async def warm_up_transcriber(app: FastAPI):
+    """Warms the transcriber up in a worker thread, then marks the app ready.
+
+    A failed warm-up, e.g. a compilation error on the host, is logged and
+    reported by `/health` instead of leaving the app warming up forever.
+    """
+    try:
+        await asyncio.to_thread(transcriber.warm_up)
+    except Exception as e:
+        logger.exception("Transcriber warm-up failed")
+        app.state.warm_up_error = f"{type(e).__name__}: {e}"
+        return
+    app.state.ready = True
+    logger.info("Transcriber ready.")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    app.state.warm_up_error = None
+    warm_up = asyncio.create_task(warm_up_transcriber(app))
+    await scheduler.start()
+    yield
+    await scheduler.stop()
+    warm_up.cancel()
+    transcriber.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 @app.post("/transcribe/phonemes")
 async def transcribe_phonemes(file: UploadFile = File(...)):
     logger.info("Processing phoneme transcription request")
-    audio_waveform, sample_rate = await extract_audio(file)
-    transcription = transcriber.transcribe_from_waveform(audio_waveform, sample_rate)
+    audio_bytes = await file.read()
+    key = result_cache.key(audio_bytes, "/transcribe/phonemes", PHONEME_MODEL_ID)
+    cached = await cached_response(key)
+    if cached is not None:
+        return cached
+    audio_waveform, sample_rate = load_audio(audio_bytes)
+    transcription = await scheduler.transcribe(audio_waveform, sample_rate)
     logger.info("Phoneme transcription completed")
     logger.info(f"Transcription: {transcription}")
-    return JSONResponse(content=transcription)
+    return await cache_response(key, transcription.to_dict())
+
+
+@app.post("/transcribe")
+async def transcribe(
+    model_size: str = Query("base", enum=["base", "medium"]),
+    words: str = Query("local", enum=["local", "openai"], description="The word transcription service"),
+    pitch: bool = Query(False, description="Adds the pitch contour of the audio"),
+    file: UploadFile = File(...),
+):
+    """Transcribes the phonemes and words of one upload together.
+
+    The audio is decoded, downmixed and resampled to 16kHz once, and the
+    phoneme model, the word model and the optional pitch tracker run
+    concurrently on that buffer. The phonemes and words share the cache of
+    `/transcribe/phonemes` and `/transcribe/words`.
+    """
+    logger.info("Processing combined transcription request")
+    audio_bytes = await file.read()
+    audio_waveform, sample_rate = load_audio(audio_bytes)
+    waveform = await asyncio.to_thread(to_16k_mono, audio_waveform, sample_rate)
+
+    async def transcribe_phonemes():
+        return (await scheduler.transcribe(waveform, 16000)).to_dict()
+
+    async def transcribe_words_locally():
+        whisper_model = await asyncio.to_thread(load_whisper_model, model_size)
+        return await asyncio.to_thread(whisper_model.transcribe_from_waveform, waveform, 16000)
+
+    async def transcribe_words_with_openai():
+        file_content = io.BytesIO(audio_bytes)
+        file_content.name = file.filename
+        return await asyncio.to_thread(load_openai_whisper_model().transcribe_from_binary, file_content)
+
+    parts = [
+        cached_result(
+            result_cache.key(audio_bytes, "/transcribe/phonemes", PHONEME_MODEL_ID),
+            transcribe_phonemes,
+        ),
+        cached_result(
+            result_cache.key(audio_bytes, "/transcribe/words", model_size, WORDS_MODEL_ID),
+            transcribe_words_locally,
+        )
+        if words == "local"
+        else cached_result(result_cache.key(audio_bytes, "/transcribe/words/openai"), transcribe_words_with_openai),
+    ]
+    if pitch:
+        parts.append(asyncio.to_thread(pitch_contour, waveform[0].numpy(), 16000))
+    results = await asyncio.gather(*parts)
+    logger.info("Combined transcription completed")
+    content = {"phonemes": results[0], "words": results[1]}
+    if pitch:
+        content["pitch"] = results[2]
+    return JSONResponse(content=content)
+
+
+@app.websocket("/transcribe/phonemes/stream")
+async def stream_phonemes(websocket: WebSocket, sample_rate: int = 16000):
+    """Transcribes 16-bit little-endian mono PCM chunks while they arrive.
+
+    Every binary message is a chunk of audio, the text message "end" closes
+    the stream. The replies are the messages of `StreamingSession`: the
+    "partial" phonemes, which the next ones replace, the "final" phonemes
+    as they become stable, and the whole transcription at the "end". The
+    chunks are resampled to 16kHz as one stream, so their edges do not
+    click nor drift.
+    """
+    await websocket.accept()
+    if sample_rate <= 0:
+        await websocket.close(code=1008, reason=f"Invalid sample rate {sample_rate}")
+        return
+    if stream_slots.locked():
+        await websocket.close(code=1013, reason="Too many live sessions")
+        return
+    async with stream_slots:
+        logger.info("Processing phoneme streaming session")
+        session = transcriber.open_stream(**streaming_config.get("options", {}))
+        resampler = StreamingResampler(sample_rate, 16000)
+        remainder = b""
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                logger.info("Phoneme streaming session disconnected")
+                return
+            if message.get("bytes") is not None:
+                # a sample can be split across two chunks
+                data = remainder + message["bytes"]
+                remainder = data[len(data) - len(data) % 2 :]
+                samples = resampler.push(pcm_to_waveform(data[: len(data) - len(remainder)]))
+                replies = await asyncio.to_thread(session.push, samples.numpy())
+            elif message.get("text") == "end":
+                samples = resampler.flush()
+                replies = await asyncio.to_thread(session.push, samples.numpy())
+                replies += await asyncio.to_thread(session.finish)
+            else:
+                continue
+            for reply in replies:
+                await websocket.send_json(reply)
+            if message.get("text") == "end":
+                break
+    await websocket.close()
+    logger.info("Phoneme streaming session completed")
+
+
+@app.post("/align/phonemes")
+async def align_phonemes(
+    reference: str = Query(..., description="The expected phonemes"),
+    file: UploadFile = File(...),
+):
+    logger.info("Processing phoneme alignment request")
+    audio_waveform, sample_rate = await extract_audio(file)
+    try:
+        alignment = await asyncio.to_thread(
+            transcriber.align_from_waveform, audio_waveform, sample_rate, reference
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    logger.info("Phoneme alignment completed")
+    return JSONResponse(content=alignment)
+
+
+@app.post("/score/phonemes")
+async def score_phonemes(
+    reference: str = Query(..., description="The expected phonemes"),
+    file: UploadFile = File(...),
+):
+    logger.info("Processing pronunciation scoring request")
+    audio_waveform, sample_rate = await extract_audio(file)
+    try:
+        scores = await asyncio.to_thread(
+            transcriber.score_from_waveform, audio_waveform, sample_rate, reference
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    logger.info("Pronunciation scoring completed")
+    return JSONResponse(content=scores)
+
+
+@app.post("/posteriorgram/phonemes")
+async def posteriorgram_phonemes(
+    encoding: str = Query("float16", enum=list(POSTERIORGRAM_ENCODINGS)),
+    top_k: int = Query(5, ge=1, description="The tokens kept per frame by the topk encoding"),
+    file: UploadFile = File(...),
+):
+    logger.info("Processing phoneme posteriorgram request")
+    audio_bytes = await file.read()
+    key = result_cache.key(audio_bytes, "/posteriorgram/phonemes", PHONEME_MODEL_ID, encoding, str(top_k))
+    cached = await cached_response(key, media_type="application/octet-stream")
+    if cached is not None:
+        return cached
+    audio_waveform, sample_rate = load_audio(audio_bytes)
+    try:
+        payload = await asyncio.to_thread(
+            transcriber.posteriorgram_from_waveform, audio_waveform, sample_rate, encoding, top_k
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    logger.info("Phoneme posteriorgram completed")
+    await asyncio.to_thread(result_cache.put, key, payload)
+    return Response(content=payload, media_type="application/octet-stream")
 
 
 @app.post("/transcribe/words")
@@ -42,39 +302,63 @@ async def transcribe_words(
     model_size: str = Query("base", enum=["base", "medium"]),
     file: UploadFile = File(...),
 ):
-    whisper_model = load_whisper_model(model_size)
     logger.info("Processing word transcription request")
-    audio_waveform, sample_rate = await extract_audio(file)
+    audio_bytes = await file.read()
+    key = result_cache.key(audio_bytes, "/transcribe/words", model_size, WORDS_MODEL_ID)
+    cached = await cached_response(key)
+    if cached is not None:
+        return cached
+    whisper_model = load_whisper_model(model_size)
+    audio_waveform, sample_rate = load_audio(audio_bytes)
     transcription = whisper_model.transcribe_from_waveform(audio_waveform, sample_rate)
     logger.info("Word transcription completed")
     logger.info(f"Transcription: {transcription}")
-    return JSONResponse(content=transcription)
+    return await cache_response(key, transcription)
 
 
 @app.post("/transcribe/words/openai")
 async def transcribe_words(
     file: UploadFile = File(...),
 ):
-    whisper_model = load_openai_whisper_model()
     logger.info("Processing word transcription request")
-    file_content = io.BytesIO(await file.read())
+    audio_bytes = await file.read()
+    key = result_cache.key(audio_bytes, "/transcribe/words/openai")
+    cached = await cached_response(key)
+    if cached is not None:
+        return cached
+    whisper_model = load_openai_whisper_model()
+    file_content = io.BytesIO(audio_bytes)
     file_content.name = file.filename
     transcription = whisper_model.transcribe_from_binary(file_content)
     logger.info("Word transcription completed")
     logger.info(f"Transcription: {transcription}")
-    return JSONResponse(content=transcription)
+    return await cache_response(key, transcription)
 
 
 @app.get("/health")
 async def health_check():
     logger.info("Health check accessed")
+    if app.state.warm_up_error is not None:
+        return JSONResponse(status_code=503, content={"status": "failed", "detail": app.state.warm_up_error})
+    if not app.state.ready:
+        return JSONResponse(status_code=503, content={"status": "warming up"})
     return {"status": "ok"}
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    return result_cache.stats()
+
+
 @lru_cache(maxsize=2)
 def load_whisper_model(model_size: str) -> LocalWhisperModel:
     """Loads the Whisper model based on specified size."""
-    return LocalWhisperModel(model_size=model_size)
+    return LocalWhisperModel(
+        model_size=model_size,
+        trimmer=trimmer,
+        precision=config.get("local_whisper", {}).get("precision"),
+        resampling_quality=resampling_quality,
+    )
 
 
 @lru_cache(maxsize=1)
@@ -90,7 +374,55 @@ def load_openai_whisper_model() -> OpenAIWhisperModel:
 
 async def extract_audio(file: UploadFile):
     """Converts uploaded file into waveform and sample rate."""
-    audio_bytes = await file.read()
+    return load_audio(await file.read())
+
+
+def load_audio(audio_bytes: bytes):
+    """Decodes the content of an audio file into waveform and sample rate."""
     audio_waveform, sample_rate = torchaudio.load(io.BytesIO(audio_bytes))
     logger.info(f"Audio loaded: sample rate = {sample_rate}, waveform shape = {audio_waveform.shape}")
     return audio_waveform, sample_rate
+
+
+def to_16k_mono(audio_waveform: torch.Tensor, sample_rate: int) -> torch.Tensor:
+    """Downmixes a waveform to mono, then resamples it to 16kHz, shape (1, SAMPLES)."""
+    return resample(audio_waveform.mean(dim=0, keepdim=True), sample_rate, 16000, resampling_quality)
+
+
+def pcm_to_waveform(data: bytes) -> torch.Tensor:
+    """Converts 16-bit little-endian mono PCM into a float waveform."""
+    return torch.from_numpy(np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768)
+
+
+async def cached_response(key: str, media_type: str = "application/json"):
+    """Returns the cached response of a request, or None on a cache miss.
+
+    The lookup can read the disk store, so it runs in a worker thread.
+    """
+    cached = await asyncio.to_thread(result_cache.get, key)
+    if cached is None:
+        return None
+    logger.info("Result served from the cache")
+    return Response(content=cached, media_type=media_type)
+
+
+async def cached_result(key: str, compute):
+    """Returns the cached JSON result of a request, computing it on a cache miss."""
+    cached = await asyncio.to_thread(result_cache.get, key)
+    if cached is not None:
+        logger.info("Result served from the cache")
+        return json.loads(cached)
+    content = await compute()
+    await cache_response(key, content)
+    return content
+
+
+async def cache_response(key: str, content) -> JSONResponse:
+    """Builds the JSON response of a request and caches its body.
+
+    The body is written to the disk store, and the store pruned, in a worker
+    thread.
+    """
+    response = JSONResponse(content=content)
+    await asyncio.to_thread(result_cache.put, key, response.body)
+    return response
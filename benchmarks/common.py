@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import os
+import statistics
+import time
+
+from typing import Any
+from typing import Callable
+
+import torch
+import torchaudio  # type: ignore
+
+from phonometrics.transcription.phonemes.tokens import TokenSet
+
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".ogg", ".flac")
+MODEL_NAME = "Cnam-LMSSC/wav2vec2-french-phonemizer"
+
+
+def load_clips(folder: str) -> list[tuple[str, torch.Tensor, int]]:
+    """Loads every audio file of a folder.
+
+    Parameters
+    ----------
+    folder : str
+        The folder holding the clips, e.g. "audio_files".
+
+    Returns
+    -------
+    list[tuple[str, torch.Tensor, int]]
+        The file name, waveform and sample rate of each clip, sorted by name.
+    """
+    clips = []
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(AUDIO_EXTENSIONS):
+            waveform, sample_rate = torchaudio.load(os.path.join(folder, name))
+            clips.append((name, waveform, sample_rate))
+    return clips
+
+
+def measure(function: Callable[[], Any], repeats: int) -> tuple[Any, float]:
+    """Runs a function several times after one warm-up call.
+
+    Parameters
+    ----------
+    function : Callable[[], Any]
+        The function to time.
+    repeats : int
+        How many timed calls to make.
+
+    Returns
+    -------
+    tuple[Any, float]
+        The result of the last call and the median latency in seconds.
+    """
+    result = function()
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        latencies.append(time.perf_counter() - start)
+    return result, statistics.median(latencies)
+
+
+def phonemes(token_set: TokenSet, transcription: str) -> list[str]:
+    """Splits a transcription into phonemes, dropping word boundaries.
+
+    Parameters
+    ----------
+    token_set : TokenSet
+        The token set of the model that produced the transcription.
+    transcription : str
+        The transcription.
+
+    Returns
+    -------
+    list[str]
+        The phonemes of the transcription.
+    """
+    return [
+        token
+        for token in token_set.tokenize(transcription)
+        if token != token_set.silence_token
+    ]
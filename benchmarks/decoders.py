@@ -0,0 +1,218 @@
+"""Compares the available decoders over the logits of a corpus.
+
+The phonemizer runs once over every clip of the corpus and its logits are
+cached on disk, so later runs only measure decoding. Every decoder whose
+dependencies are installed then decodes the same logits. For each decoder
+the script reports the latency percentiles of a clip, the throughput in
+seconds of audio decoded per second, the peak Python memory of a pass over
+the corpus (traced with tracemalloc, native allocations are not counted),
+and the phoneme error rate (PER). The PER is measured against the
+references given with --references, a JSON file mapping clip names to their
+phonetic transcription, and otherwise against the greedy transcription.
+
+The KenLM decoders (kensho, parlance, flashlight) only run when --kenlm is
+given, the prefix beam search runs without a language model and, when
+--lm is given, once more with it.
+
+Usage:
+    python -m benchmarks.decoders --lm phonemes.npz --kenlm phonemes.arpa
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import torch
+
+from transformers import AutoModelForCTC  # type: ignore
+from transformers import AutoProcessor  # type: ignore
+
+from benchmarks.common import MODEL_NAME
+from benchmarks.common import load_clips
+from benchmarks.common import phonemes
+from phonometrics.transcription.phonemes.decoder import Decoder
+from phonometrics.transcription.phonemes.decoder import build_decoder
+from phonometrics.transcription.phonemes.metrics import edit_distance
+from phonometrics.transcription.phonemes.model import TranscriptionModel
+from phonometrics.transcription.phonemes.tokens import TokenSet
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model-name", default=MODEL_NAME)
+    parser.add_argument("--audio-folder", default="audio_files")
+    parser.add_argument("--logits-cache", default=".cache/logits")
+    parser.add_argument(
+        "--references", default=None, help="A JSON file of references"
+    )
+    parser.add_argument("--lm", default=None, help="A PhonemeNgramLM file")
+    parser.add_argument("--kenlm", default=None, help="A KenLM model file")
+    parser.add_argument("--beam-width", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=3)
+    return parser.parse_args()
+
+
+def cached_logits(
+    args: argparse.Namespace,
+) -> list[tuple[str, torch.Tensor, float]]:
+    """Loads the logits of every clip, running the model on cache misses.
+
+    Returns
+    -------
+    list[tuple[str, torch.Tensor, float]]
+        The name, logits and duration in seconds of each clip.
+    """
+    folder = os.path.join(
+        args.logits_cache, args.model_name.replace("/", "--")
+    )
+    os.makedirs(folder, exist_ok=True)
+    model = None
+    items = []
+    for name, waveform, sample_rate in load_clips(args.audio_folder):
+        path = os.path.join(folder, f"{name}.pt")
+        if not os.path.exists(path):
+            if model is None:
+                model = TranscriptionModel(
+                    AutoModelForCTC.from_pretrained(args.model_name),
+                    AutoProcessor.from_pretrained(args.model_name),
+                )
+            waveform = model._prepare_waveform(waveform, sample_rate)
+            logits = model._infer(model._process_inputs(waveform, 16000))
+            torch.save(
+                {"logits": logits, "duration": waveform.shape[-1] / 16000},
+                path,
+            )
+        cached = torch.load(path, weights_only=True)
+        items.append((name, cached["logits"], cached["duration"]))
+    return items
+
+
+def decoder_configurations(
+    args: argparse.Namespace,
+) -> dict[str, tuple[str, dict]]:
+    """Lists the decoders to compare.
+
+    Returns
+    -------
+    dict[str, tuple[str, dict]]
+        The name and keyword arguments of `build_decoder` of each decoder,
+        by label.
+    """
+    configurations = {
+        "greedy": ("greedy", {}),
+        "beam": ("beam", {"beam_width": args.beam_width}),
+    }
+    if args.lm is not None:
+        configurations["beam+lm"] = (
+            "beam",
+            {"beam_width": args.beam_width, "lm": args.lm},
+        )
+    if args.kenlm is not None:
+        for name in ("kensho", "parlance", "flashlight"):
+            configurations[name] = (name, {"lm_path": args.kenlm})
+    return configurations
+
+
+def benchmark(
+    decoder: Decoder,
+    items: list[tuple[str, torch.Tensor, float]],
+    references: dict[str, str],
+    token_set: TokenSet,
+    repeats: int,
+) -> dict:
+    """Measures one decoder over every clip.
+
+    Returns
+    -------
+    dict
+        The latency of every call in seconds ("latencies"), the decoded
+        audio duration in seconds ("duration"), the peak traced memory in
+        bytes ("peak_memory"), and the phoneme errors ("errors") over the
+        number of reference phonemes ("phonemes").
+    """
+    decoder(items[0][1])  # warm-up, e.g. worker pools and caches
+
+    latencies = []
+    duration = 0.0
+    errors = n_phonemes = 0
+    for name, logits, clip_duration in items:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            (result,) = decoder(logits)
+            latencies.append(time.perf_counter() - start)
+        duration += clip_duration * repeats
+        expected = phonemes(token_set, references[name])
+        errors += edit_distance(
+            expected, phonemes(token_set, result.transcription)
+        )
+        n_phonemes += len(expected)
+
+    tracemalloc.start()
+    for _, logits, _ in items:
+        decoder(logits)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "latencies": latencies,
+        "duration": duration,
+        "peak_memory": peak_memory,
+        "errors": errors,
+        "phonemes": n_phonemes,
+    }
+
+
+def main():
+    args = parse_args()
+    items = cached_logits(args)
+    if not items:
+        raise SystemExit(f"No audio file found in {args.audio_folder}")
+    token_set = TokenSet.from_processor(
+        AutoProcessor.from_pretrained(args.model_name)
+    )
+
+    if args.references is not None:
+        with open(args.references, "r") as f:
+            references = json.load(f)
+    else:
+        greedy = build_decoder("greedy", token_set)
+        references = {
+            name: greedy(logits)[0].transcription for name, logits, _ in items
+        }
+
+    print(
+        f"{'decoder':<12} {'p50 [ms]':>9} {'p90 [ms]':>9} {'p99 [ms]':>9} "
+        f"{'audio s/s':>10} {'peak [MB]':>10} {'PER':>7}"
+    )
+    for label, (name, kwargs) in decoder_configurations(args).items():
+        # a missing optional dependency shows up when the decoder is built,
+        # or in its worker processes on the first call
+        try:
+            decoder = build_decoder(name, token_set, **kwargs)
+            try:
+                stats = benchmark(
+                    decoder, items, references, token_set, args.repeats
+                )
+            finally:
+                decoder.close()
+        except (ImportError, RuntimeError) as e:
+            print(f"{label:<12} skipped: {e}")
+            continue
+
+        p50, p90, p99 = np.percentile(stats["latencies"], [50, 90, 99])
+        throughput = stats["duration"] / max(sum(stats["latencies"]), 1e-9)
+        print(
+            f"{label:<12} {p50 * 1000:>9.1f} {p90 * 1000:>9.1f} "
+            f"{p99 * 1000:>9.1f} {throughput:>10.1f} "
+            f"{stats['peak_memory'] / 2**20:>10.1f} "
+            f"{stats['errors'] / max(stats['phonemes'], 1):>7.2%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Compares reduced-precision phoneme transcription against fp32.
+
+The phonemizer runs once in fp32 and once in the requested precision over
+every sample clip. For each clip the script reports the median latency of
+both runs, the speedup, and the phoneme error rate (PER) of the
+reduced-precision transcription measured against the fp32 one. The resident
+weight memory of both models is reported first; a 16-bit precision that the
+CPU does not support falls back to fp32, which shows as equal sizes.
+
+Usage:
+    python -m benchmarks.precision --precision int8
+    python -m benchmarks.precision --precision bf16
+"""
+
+from __future__ import annotations
+
+import argparse
+
+import torch
+
+from transformers import AutoModelForCTC  # type: ignore
+from transformers import AutoProcessor  # type: ignore
+
+from benchmarks.common import MODEL_NAME
+from benchmarks.common import load_clips
+from benchmarks.common import measure
+from benchmarks.common import phonemes
+from phonometrics.transcription.phonemes.metrics import edit_distance
+from phonometrics.transcription.phonemes.model import TranscriptionModel
+from phonometrics.transcription.phonemes.precision import PRECISIONS
+
+
+def weight_bytes(model: torch.nn.Module) -> int:
+    """Sums the size of the weights and buffers, quantized ones included."""
+
+    def size(value) -> int:
+        if isinstance(value, torch.Tensor):
+            return value.numel() * value.element_size()
+        if isinstance(value, (tuple, list)):
+            return sum(size(item) for item in value)
+        return 0
+
+    return sum(size(value) for value in model.state_dict().values())
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--precision",
+        choices=[p for p in PRECISIONS if p != "fp32"],
+        default="int8",
+    )
+    parser.add_argument("--model-name", default=MODEL_NAME)
+    parser.add_argument("--audio-folder", default="audio_files")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=None)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    torch.manual_seed(0)
+    if args.threads is not None:
+        torch.set_num_threads(args.threads)
+
+    processor = AutoProcessor.from_pretrained(args.model_name)
+    reference = TranscriptionModel(
+        AutoModelForCTC.from_pretrained(args.model_name), processor
+    )
+    candidate = TranscriptionModel(
+        AutoModelForCTC.from_pretrained(args.model_name),
+        processor,
+        precision=args.precision,
+    )
+    token_set = reference._token_set
+    print(
+        f"weights: fp32 {weight_bytes(reference._model) / 2**20:.1f} MiB, "
+        f"{args.precision} {weight_bytes(candidate._model) / 2**20:.1f} MiB"
+    )
+
+    print(
+        f"{'clip':<20} {'fp32 [ms]':>10} {args.precision + ' [ms]':>10} "
+        f"{'speedup':>8} {'PER':>7}"
+    )
+    total_reference = total_candidate = 0.0
+    total_errors = total_phonemes = 0
+    for name, waveform, sample_rate in load_clips(args.audio_folder):
+        expected, reference_latency = measure(
+            lambda: reference.transcribe_from_waveform(waveform, sample_rate),
+            args.repeats,
+        )
+        actual, candidate_latency = measure(
+            lambda: candidate.transcribe_from_waveform(waveform, sample_rate),
+            args.repeats,
+        )
+        expected_phonemes = phonemes(token_set, expected.transcription)
+        actual_phonemes = phonemes(token_set, actual.transcription)
+        errors = edit_distance(expected_phonemes, actual_phonemes)
+
+        total_reference += reference_latency
+        total_candidate += candidate_latency
+        total_errors += errors
+        total_phonemes += len(expected_phonemes)
+        print(
+            f"{name:<20} {reference_latency * 1000:>10.1f} "
+            f"{candidate_latency * 1000:>10.1f} "
+            f"{reference_latency / candidate_latency:>7.2f}x "
+            f"{errors / max(len(expected_phonemes), 1):>7.2%}"
+        )
+
+    print(
+        f"{'total':<20} {total_reference * 1000:>10.1f} "
+        f"{total_candidate * 1000:>10.1f} "
+        f"{total_reference / total_candidate:>7.2f}x "
+        f"{total_errors / max(total_phonemes, 1):>7.2%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Compares the cold start of the phonemizer from the hub and from artifacts.
+
+Every run loads the model and its processor in a fresh interpreter, once
+with `from_pretrained` on the model name, which checks the hub for updates
+even when the files are cached, and once from the local artifacts written
+by `save_artifacts`, which never reaches the hub. The artifacts are saved
+first if they don't exist yet. The script reports the median time of the
+imports and of the loading over the runs.
+
+Usage:
+    python -m benchmarks.startup --repeats 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import MODEL_NAME
+from phonometrics.transcription.phonemes import artifacts
+
+
+HUB_LOAD = """
+import json, time
+start = time.perf_counter()
+from transformers import AutoModelForCTC, AutoProcessor
+imported = time.perf_counter()
+AutoProcessor.from_pretrained({model_name!r})
+AutoModelForCTC.from_pretrained({model_name!r})
+loaded = time.perf_counter()
+print(json.dumps([imported - start, loaded - imported]))
+"""
+
+ARTIFACT_LOAD = """
+import json, time
+start = time.perf_counter()
+from phonometrics.transcription.phonemes.artifacts import load_artifacts
+imported = time.perf_counter()
+load_artifacts({directory!r})
+loaded = time.perf_counter()
+print(json.dumps([imported - start, loaded - imported]))
+"""
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model-name", default=MODEL_NAME)
+    parser.add_argument("--artifact-dir", default=".cache/artifacts")
+    parser.add_argument("--repeats", type=int, default=5)
+    return parser.parse_args()
+
+
+def run(code: str, repeats: int) -> tuple[float, float]:
+    """Runs a script in fresh interpreters.
+
+    Returns
+    -------
+    tuple[float, float]
+        The median import and loading times in seconds.
+    """
+    timings = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        timings.append(json.loads(output.strip().splitlines()[-1]))
+    return (
+        statistics.median(x[0] for x in timings),
+        statistics.median(x[1] for x in timings),
+    )
+
+
+def main():
+    args = parse_args()
+    artifacts.load_or_create_artifacts(args.model_name, args.artifact_dir)
+
+    print(f"{'source':<10} {'import [s]':>11} {'load [s]':>9}")
+    for source, code in (
+        ("hub", HUB_LOAD.format(model_name=args.model_name)),
+        (
+            "artifacts",
+            ARTIFACT_LOAD.format(
+                directory=artifacts.artifact_dir(
+                    args.model_name, args.artifact_dir
+                )
+            ),
+        ),
+    ):
+        import_time, load_time = run(code, args.repeats)
+        print(f"{source:<10} {import_time:>11.2f} {load_time:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Measures the fast mode of the phonemizer, a truncated encoder.
+
+The phonemizer runs at full depth and then with only the first N transformer
+layers of its encoder, for every requested N. For each depth the script
+reports the total latency over the sample clips, the speedup, and the
+phoneme error rate (PER) of the truncated transcription measured against the
+full-depth one.
+
+With `--adapters`, an `EncoderAdapter` per depth is loaded from that folder,
+or fitted on the clips of `--calibration-folder` and saved there when it is
+missing, and the PER with the adapter is reported too. Fitting on the clips
+that are evaluated flatters the adapter, so keep a separate calibration
+folder for numbers that matter.
+
+Usage:
+    python -m benchmarks.truncation --layers 12 18 21
+    python -m benchmarks.truncation --layers 18 --adapters .cache/adapters \\
+        --calibration-folder calibration_audio
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import os
+
+import torch
+
+from transformers import AutoModelForCTC  # type: ignore
+from transformers import AutoProcessor  # type: ignore
+
+from benchmarks.common import MODEL_NAME
+from benchmarks.common import load_clips
+from benchmarks.common import measure
+from benchmarks.common import phonemes
+from phonometrics.transcription.phonemes.metrics import edit_distance
+from phonometrics.transcription.phonemes.model import TranscriptionModel
+from phonometrics.transcription.phonemes.model import Waveform
+from phonometrics.transcription.phonemes.truncation import EncoderAdapter
+from phonometrics.transcription.phonemes.truncation import truncate_encoder
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--layers",
+        type=int,
+        nargs="+",
+        default=None,
+        help="the depths to measure, by default a quarter, a half and "
+        "three quarters of the encoder",
+    )
+    parser.add_argument("--adapters", default=None)
+    parser.add_argument("--calibration-folder", default=None)
+    parser.add_argument("--regularization", type=float, default=1e-3)
+    parser.add_argument("--model-name", default=MODEL_NAME)
+    parser.add_argument("--audio-folder", default="audio_files")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=None)
+    return parser.parse_args()
+
+
+def transcribe_clips(
+    transcriber: TranscriptionModel,
+    clips: list[tuple[str, torch.Tensor, int]],
+    repeats: int,
+) -> tuple[list[list[str]], float]:
+    """Transcribes every clip, returning the phonemes and total latency."""
+    results, latency = [], 0.0
+    for _, waveform, sample_rate in clips:
+        result, clip_latency = measure(
+            lambda: transcriber.transcribe_from_waveform(
+                waveform, sample_rate
+            ),
+            repeats,
+        )
+        results.append(phonemes(transcriber._token_set, result.transcription))
+        latency += clip_latency
+    return results, latency
+
+
+def error_rate(expected: list[list[str]], actual: list[list[str]]) -> float:
+    """The phoneme error rate of all the clips together."""
+    errors = sum(map(edit_distance, expected, actual))
+    return errors / max(sum(map(len, expected)), 1)
+
+
+def load_adapter(
+    args: argparse.Namespace,
+    model: AutoModelForCTC,
+    processor: AutoProcessor,
+    num_layers: int,
+) -> EncoderAdapter:
+    """Loads the adapter of a depth, fitting and saving it if missing."""
+    path = os.path.join(args.adapters, f"layers_{num_layers}.npz")
+    if os.path.exists(path):
+        return EncoderAdapter.load(path)
+
+    folder = args.calibration_folder or args.audio_folder
+    waveforms = [
+        Waveform(waveform, sample_rate).resample(16000).to_mono().data
+        for _, waveform, sample_rate in load_clips(folder)
+    ]
+    adapter = EncoderAdapter.fit(
+        model,
+        processor,
+        [waveform.squeeze() for waveform in waveforms],
+        num_layers,
+        regularization=args.regularization,
+    )
+    os.makedirs(args.adapters, exist_ok=True)
+    adapter.save(path)
+    print(f"fitted {path} on {len(waveforms)} clips of {folder}")
+    return adapter
+
+
+def main():
+    args = parse_args()
+    torch.manual_seed(0)
+    if args.threads is not None:
+        torch.set_num_threads(args.threads)
+
+    processor = AutoProcessor.from_pretrained(args.model_name)
+    model = AutoModelForCTC.from_pretrained(args.model_name)
+    depth = model.config.num_hidden_layers
+    layers = args.layers or [depth // 4, depth // 2, 3 * depth // 4]
+    if args.adapters is not None and args.calibration_folder is None:
+        print("warning: the adapters are fitted on the evaluated clips")
+
+    reference = TranscriptionModel(copy.deepcopy(model), processor)
+    clips = load_clips(args.audio_folder)
+
+    expected, reference_latency = transcribe_clips(
+        reference, clips, args.repeats
+    )
+    header = f"{'layers':>7} {'latency [ms]':>13} {'speedup':>8} {'PER':>7}"
+    if args.adapters is not None:
+        header += f" {'PER adapter':>12}"
+    print(header)
+    print(f"{depth:>7} {reference_latency * 1000:>13.1f} {1:>7.2f}x")
+
+    for num_layers in layers:
+        candidate = TranscriptionModel(
+            copy.deepcopy(model), processor, num_encoder_layers=num_layers
+        )
+        actual, latency = transcribe_clips(candidate, clips, args.repeats)
+        line = (
+            f"{num_layers:>7} {latency * 1000:>13.1f} "
+            f"{reference_latency / latency:>7.2f}x "
+            f"{error_rate(expected, actual):>7.2%}"
+        )
+        if args.adapters is not None:
+            adapter = load_adapter(args, model, processor, num_layers)
+            adapted = truncate_encoder(
+                copy.deepcopy(model), num_layers, adapter
+            )
+            actual, _ = transcribe_clips(
+                TranscriptionModel(adapted, processor), clips, args.repeats
+            )
+            line += f" {error_rate(expected, actual):>12.2%}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,17 +18,13 @@ class AppConfig:
     def audio_files_path(self):
         return self.config_content.get("audio_folder", "audio_folder")
 
-    def phoneme_transcription_url(self):
-        return self.config_content.get("transcription_service_url")
+    def combined_transcription_url(self):
+        return self.config_content.get("combined_transcription_service_url")
 
-    def word_transcription_url(self):
-        # Use the URLs from the configuration
-        phoneme_transcription_service_url = self.config_content.get("transcription_service_url")
+    def word_transcription_service(self):
+        # The combined endpoint takes "local" or "openai", any other preference means OpenAI
         preferred_transcription_service = self.config_content.get("preferred_word_transcription_service", "local")
-        if preferred_transcription_service == "local":
-            return self.config_content.get("local_word_transcription_service_url")
-        else:
-            return self.config_content.get("openai_word_transcription_service_url")
+        return "local" if preferred_transcription_service == "local" else "openai"
 
 # Load configuration
 with open("config.yaml", "r") as f:
@@ -47,8 +43,7 @@ def process_selected_file(selected_file):
     with open(file_path, 'rb') as f:
         audio_bytes = f.read()
 
-    transcription_phonemes = transcribe_phonemes(audio_bytes)
-    transcription_words = transcribe_words(audio_bytes)
+    transcription_phonemes, transcription_words = transcribe(audio_bytes)
     # Load audio data using soundfile
     audio_file = io.BytesIO(audio_bytes)
     y, sr = sf.read(audio_file)
@@ -63,36 +58,22 @@ def process_selected_file(selected_file):
     return file_path, phonemes, words, img_array
 
 
-def transcribe_phonemes(audio_bytes):
+def transcribe(audio_bytes):
     # Prepare the files payload
     files = {
         'file': ('recorded_audio.wav', audio_bytes, 'audio/wav')
     }
-    # Send the audio to the phoneme transcription service
+    # Upload the audio once, the service transcribes phonemes and words together
+    params = {'words': app_config.word_transcription_service()}
     try:
-        response_phonemes = requests.post(app_config.phoneme_transcription_url(), files=files)
-        response_phonemes.raise_for_status()
-        transcription_phonemes = response_phonemes.json()
+        response = requests.post(app_config.combined_transcription_url(), files=files, params=params)
+        response.raise_for_status()
+        transcription = response.json()
+        transcription_phonemes, transcription_words = transcription['phonemes'], transcription['words']
     except requests.exceptions.RequestException as e:
-        print(f"Error contacting phoneme transcription service: {e}")
-        transcription_phonemes = {'transcription': ''}
-    return transcription_phonemes
-
-
-def transcribe_words(audio_bytes):
-    # Prepare the files payload
-    files = {
-        'file': ('recorded_audio.wav', audio_bytes, 'audio/wav')
-    }
-    # Send the audio to the word transcription service
-    try:
-        response_words = requests.post(app_config.word_transcription_url(), files=files)
-        response_words.raise_for_status()
-        transcription_words = response_words.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error contacting word transcription service: {e}")
-        transcription_words = {'transcription': ''}
-    return transcription_words
+        print(f"Error contacting transcription service: {e}")
+        transcription_phonemes, transcription_words = {'transcription': ''}, {'transcription': ''}
+    return transcription_phonemes, transcription_words
 
 
 def plot_waveform_and_pitch(y, sr, phonemes_transcription):
@@ -219,10 +200,9 @@ with gr.Blocks() as demo:
                 buf.seek(0)  # Reset buffer position
 
                 audio_bytes = buf.read()
-                # Transcribe phonemes
-                user_transcription_phonemes = transcribe_phonemes(audio_bytes)
+                # Transcribe phonemes and words
+                user_transcription_phonemes, user_transcription_words = transcribe(audio_bytes)
                 phonemes = user_transcription_phonemes['transcription']
-                user_transcription_words = transcribe_words(audio_bytes)
                 words = user_transcription_words['transcription']
                 img_array = plot_waveform_and_pitch(y, sr, user_transcription_phonemes)
                 # Compare phonetic transcriptions
@@ -20,3 +20,21 @@ def extract_pitch(audio_data: np.ndarray, sample_rate: int):
     pitch = call(snd, "To Pitch", 0.0, pitch_range[0], pitch_range[1])
 
     return pitch
+
+
+def pitch_contour(audio_data: np.ndarray, sample_rate: int) -> dict:
+    """
+    Extract the pitch contour of audio data as JSON-serializable lists.
+
+    Returns a dictionary with the "times" of the analysis frames in seconds
+    and their "frequencies" in Hz, None for the unvoiced frames.
+    """
+    pitch = extract_pitch(audio_data, sample_rate)
+    frequencies = pitch.selected_array["frequency"]
+    return {
+        "times": pitch.xs().tolist(),
+        "frequencies": [
+            float(frequency) if frequency > 0 else None
+            for frequency in frequencies
+        ],
+    }
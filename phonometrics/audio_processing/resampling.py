@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Sequence
+
+import torch
+import torchaudio  # type: ignore
+
+
+QUALITIES = ("high", "fast")
+
+
+def resample(
+    waveform: torch.Tensor,
+    orig_freq: int,
+    new_freq: int = 16000,
+    quality: str = "high",
+) -> torch.Tensor:
+    """Resamples a waveform, reusing the filter of every pair of rates.
+
+    Parameters
+    ----------
+    waveform : torch.Tensor
+        The floating point waveform of shape (..., SAMPLES).
+    orig_freq : int
+        The sample rate of the waveform.
+    new_freq : int, optional
+        The target sample rate (default is 16000).
+    quality : str, optional
+        One of `QUALITIES`. "high" is the windowed sinc interpolation of
+        `torchaudio.functional.resample`, with the same output, its polyphase
+        kernel being computed once per pair of rates instead of once per
+        call. "fast" averages the samples falling into every output sample
+        when downsampling and interpolates linearly when upsampling, a
+        cheaper filter that lets more aliasing through (default is "high").
+
+    Returns
+    -------
+    torch.Tensor
+        The waveform of shape (..., ceil(SAMPLES * new_freq / orig_freq)).
+    """
+    if quality not in QUALITIES:
+        raise ValueError(
+            f"Unknown quality {quality!r}, expected one of {QUALITIES}"
+        )
+    if orig_freq == new_freq or waveform.shape[-1] == 0:
+        return waveform
+    if quality == "fast":
+        return _interpolate(waveform, orig_freq, new_freq)
+    return _sinc_resampler(orig_freq, new_freq, waveform.dtype)(waveform)
+
+
+def resample_batch(
+    waveforms: Sequence[torch.Tensor],
+    orig_freqs: Sequence[int],
+    new_freq: int = 16000,
+    quality: str = "high",
+) -> list[torch.Tensor]:
+    """Resamples several waveforms, one pass per distinct sample rate.
+
+    The waveforms sharing a sample rate are right-padded and filtered
+    together, and each output is cut back to its own length, so every
+    waveform comes out as `resample` returns it on its own.
+
+    Parameters
+    ----------
+    waveforms : Sequence[torch.Tensor]
+        The floating point waveforms, each of shape (..., SAMPLES) with the
+        same leading dimensions.
+    orig_freqs : Sequence[int]
+        The sample rate of each waveform.
+    new_freq : int, optional
+        The target sample rate (default is 16000).
+    quality : str, optional
+        One of `QUALITIES`, see `resample` (default is "high").
+
+    Returns
+    -------
+    list[torch.Tensor]
+        The resampled waveforms, in the input order.
+    """
+    if len(waveforms) != len(orig_freqs):
+        raise ValueError(
+            f"Got {len(waveforms)} waveforms but {len(orig_freqs)} "
+            "sample rates"
+        )
+    results = list(waveforms)
+    groups: dict[int, list[int]] = {}
+    for i, orig_freq in enumerate(orig_freqs):
+        groups.setdefault(orig_freq, []).append(i)
+
+    for orig_freq, indices in groups.items():
+        # the fast filter depends on the length, so it only runs clip by clip
+        if len(indices) == 1 or quality == "fast":
+            for i in indices:
+                results[i] = resample(
+                    waveforms[i], orig_freq, new_freq, quality
+                )
+            continue
+        length = max(waveforms[i].shape[-1] for i in indices)
+        padded = torch.stack(
+            [
+                torch.nn.functional.pad(
+                    waveforms[i], (0, length - waveforms[i].shape[-1])
+                )
+                for i in indices
+            ]
+        )
+        resampled = resample(padded, orig_freq, new_freq, quality)
+        for row, i in enumerate(indices):
+            n_samples = _output_length(
+                waveforms[i].shape[-1], orig_freq, new_freq
+            )
+            results[i] = resampled[row, ..., :n_samples]
+    return results
+
+
+@lru_cache(maxsize=32)
+def _sinc_resampler(
+    orig_freq: int, new_freq: int, dtype: torch.dtype
+) -> torchaudio.transforms.Resample:
+    """Builds the sinc resampler of a pair of rates, kept for the next calls.
+
+    The resampler holds the kernel of every phase, the costly part of
+    resampling short chunks, e.g. 160 phases from 44.1kHz to 16kHz.
+    """
+    return torchaudio.transforms.Resample(
+        orig_freq, new_freq, dtype=dtype
+    ).eval()
+
+
+def _interpolate(
+    waveform: torch.Tensor, orig_freq: int, new_freq: int
+) -> torch.Tensor:
+    """Resamples with the "fast" filter, see `resample`."""
+    shape = waveform.shape
+    n_samples = _output_length(shape[-1], orig_freq, new_freq)
+    flat = waveform.reshape(-1, 1, shape[-1])
+    if new_freq < orig_freq:
+        flat = torch.nn.functional.interpolate(
+            flat, size=n_samples, mode="area"
+        )
+    else:
+        flat = torch.nn.functional.interpolate(
+            flat, size=n_samples, mode="linear", align_corners=False
+        )
+    return flat.reshape(*shape[:-1], n_samples)
+
+
+def _output_length(n_samples: int, orig_freq: int, new_freq: int) -> int:
+    """The number of samples of a resampled waveform, rounded up."""
+    return -(-n_samples * new_freq // orig_freq)
+
+
+class StreamingResampler:
+    """Resamples a stream chunk by chunk as `resample` does the whole of it.
+
+    Every output sample of the sinc filter depends on the input samples
+    within half the filter width on both sides, so the resampler keeps the
+    raw samples of the stream that the next outputs still need, and only
+    emits the outputs whose inputs have all arrived. Resampling each chunk on
+    its own would instead pad every chunk edge with zeros, clicking at every
+    edge and drifting by a fraction of a sample per chunk.
+
+    The stream always goes through the "high" quality filter, the "fast"
+    one depending on the length of the whole waveform.
+    """
+
+    def __init__(self, orig_freq: int, new_freq: int = 16000):
+        """
+        Parameters
+        ----------
+        orig_freq : int
+            The sample rate of the stream.
+        new_freq : int, optional
+            The target sample rate (default is 16000).
+        """
+        if orig_freq <= 0 or new_freq <= 0:
+            raise ValueError(
+                f"Sample rates must be positive, got {orig_freq} and "
+                f"{new_freq}"
+            )
+        self.orig_freq = orig_freq
+        self.new_freq = new_freq
+        self._resampler = None
+        if orig_freq != new_freq:
+            self._resampler = _sinc_resampler(
+                orig_freq, new_freq, torch.float32
+            )
+            # the inputs between two periods of the filter phases
+            self._orig_step = orig_freq // self._resampler.gcd
+        # the raw samples the next outputs need, starting with the zero
+        # padding of the filter before the stream
+        width = self._resampler.width if self._resampler is not None else 0
+        self._buffer = torch.zeros(width)
+        self._received = 0
+        self._emitted = 0
+
+    def push(self, samples: torch.Tensor) -> torch.Tensor:
+        """Adds samples to the stream and resamples what they complete.
+
+        Parameters
+        ----------
+        samples : torch.Tensor
+            The next samples of the stream, of shape (SAMPLES,).
+
+        Returns
+        -------
+        torch.Tensor
+            The next resampled samples, possibly none.
+        """
+        samples = samples.to(torch.float32)
+        self._received += len(samples)
+        if self._resampler is None:
+            self._emitted += len(samples)
+            return samples
+        self._buffer = torch.cat((self._buffer, samples))
+        return self._resample(self._buffer)
+
+    def flush(self) -> torch.Tensor:
+        """Ends the stream, resampling the samples left.
+
+        Returns
+        -------
+        torch.Tensor
+            The last resampled samples, so that the stream comes out with
+            as many samples as `resample` gives the whole waveform.
+        """
+        if self._resampler is None:
+            return torch.zeros(0)
+        n_samples = _output_length(
+            self._received, self.orig_freq, self.new_freq
+        )
+        n_left = n_samples - self._emitted
+        padding = self._resampler.width + self._orig_step
+        outputs = self._resample(
+            torch.cat((self._buffer, torch.zeros(padding)))
+        )
+        self._emitted = n_samples
+        self._buffer = torch.zeros(0)
+        return outputs[:n_left]
+
+    def _resample(self, buffer: torch.Tensor) -> torch.Tensor:
+        """Filters the complete periods of `buffer`, keeping the rest."""
+        orig_step = self._orig_step
+        width = self._resampler.width
+        # the buffer starts at the first input of the next period, each
+        # period reading 2 * width + orig_step inputs, orig_step apart
+        n_periods = (len(buffer) - 2 * width) // orig_step
+        if n_periods <= 0:
+            self._buffer = buffer
+            return torch.zeros(0)
+        end = n_periods * orig_step + 2 * width
+        outputs = torch.nn.functional.conv1d(
+            buffer[None, None, :end],
+            self._resampler.kernel,
+            stride=orig_step,
+        )
+        consumed = n_periods * orig_step
+        self._buffer = buffer[consumed:]
+        outputs = outputs[0].transpose(0, 1).reshape(-1)
+        self._emitted += len(outputs)
+        return outputs
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+from typing import Union
+
+import numpy as np
+import torch
+
+
+class SpeechTimeline:
+    """Maps times of a trimmed waveform back to the original waveform.
+
+    Attributes
+    ----------
+    regions : np.ndarray
+        The kept regions of the original waveform, of shape (REGIONS, 2),
+        as start and end samples.
+    sample_rate : int
+        The sample rate of the waveform.
+    """
+
+    def __init__(self, regions: np.ndarray, sample_rate: int):
+        """
+        Parameters
+        ----------
+        regions : np.ndarray
+            The kept regions of the original waveform, of shape (REGIONS, 2),
+            as start and end samples.
+        sample_rate : int
+            The sample rate of the waveform.
+        """
+        self.regions = regions
+        self.sample_rate = sample_rate
+        lengths = regions[:, 1] - regions[:, 0]
+        # where every region starts in the trimmed waveform
+        self._trimmed_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    def to_original_ms(
+        self, timestamps: np.ndarray, is_end: bool = False
+    ) -> np.ndarray:
+        """Converts timestamps of the trimmed waveform to the original one.
+
+        Parameters
+        ----------
+        timestamps : np.ndarray
+            The timestamps in the trimmed waveform, in milliseconds.
+        is_end : bool, optional
+            Whether the timestamps end segments, a timestamp at the junction
+            of two regions then belongs to the first one (default is False,
+            it belongs to the second one).
+
+        Returns
+        -------
+        np.ndarray
+            The timestamps in the original waveform, in milliseconds.
+        """
+        samples = np.asarray(timestamps, dtype=np.float64) * (
+            self.sample_rate / 1000
+        )
+        side = "left" if is_end else "right"
+        region = np.maximum(
+            np.searchsorted(self._trimmed_starts, samples, side=side) - 1, 0
+        )
+        original = self.regions[region, 0] + (
+            samples - self._trimmed_starts[region]
+        )
+        return np.rint(original * (1000 / self.sample_rate)).astype(
+            np.asarray(timestamps).dtype
+        )
+
+
+class SpeechTrimmer:
+    """Cuts the non-speech regions of a waveform before inference.
+
+    The waveform is split into frames, and a frame holds speech when its
+    energy is within `threshold_db` of the loudest frame and its spectrum is
+    not flat like noise. Silences shorter than `min_silence_ms` are kept, as
+    are speech bursts padded by `padding_ms` on both sides, so the phonemes
+    next to a pause keep their context. The cuts fall on frame boundaries,
+    which keeps the 20 ms frames of wav2vec2 aligned with the original
+    timeline.
+
+    Attributes
+    ----------
+    threshold_db : float
+        How far below the loudest frame a speech frame can be, in dB.
+    floor_db : float
+        The energy below which a frame is never speech, in dBFS.
+    flatness_threshold : float
+        The spectral flatness above which a frame is noise.
+    frame_ms : int
+        The frame duration in milliseconds.
+    min_silence_ms : int
+        The shortest silence cut, in milliseconds.
+    min_speech_ms : int
+        The shortest speech burst kept, in milliseconds.
+    padding_ms : int
+        The silence kept around every speech region, in milliseconds.
+    """
+
+    def __init__(
+        self,
+        threshold_db: float = 40.0,
+        floor_db: float = -60.0,
+        flatness_threshold: float = 0.5,
+        frame_ms: int = 20,
+        min_silence_ms: int = 400,
+        min_speech_ms: int = 60,
+        padding_ms: int = 200,
+    ):
+        """
+        Parameters
+        ----------
+        threshold_db : float, optional
+            How far below the loudest frame a speech frame can be, in dB
+            (default is 40.0).
+        floor_db : float, optional
+            The energy below which a frame is never speech, in dBFS
+            (default is -60.0).
+        flatness_threshold : float, optional
+            The spectral flatness, between 0 and 1, above which a frame is
+            noise. White noise is around 0.56, voiced speech below 0.2
+            (default is 0.5).
+        frame_ms : int, optional
+            The frame duration in milliseconds (default is 20).
+        min_silence_ms : int, optional
+            The shortest silence cut, in milliseconds (default is 400).
+        min_speech_ms : int, optional
+            The shortest speech burst kept, in milliseconds, shorter ones
+            are clicks (default is 60).
+        padding_ms : int, optional
+            The silence kept around every speech region, in milliseconds
+            (default is 200).
+        """
+        self.threshold_db = threshold_db
+        self.floor_db = floor_db
+        self.flatness_threshold = flatness_threshold
+        self.frame_ms = frame_ms
+        self.min_silence_ms = min_silence_ms
+        self.min_speech_ms = min_speech_ms
+        self.padding_ms = padding_ms
+
+    def speech_frames(self, waveform: np.ndarray, sample_rate: int):
+        """Classifies every frame of a mono waveform as speech or not.
+
+        Returns
+        -------
+        np.ndarray
+            Whether every frame holds speech, the last partial frame
+            included.
+        """
+        frame_length = sample_rate * self.frame_ms // 1000
+        n_frames = -(-len(waveform) // frame_length)
+        frames = np.zeros(n_frames * frame_length, dtype=np.float32)
+        frames[: len(waveform)] = waveform
+        frames = frames.reshape(n_frames, frame_length)
+
+        energy_db = 10 * np.log10(np.mean(frames**2, axis=1) + 1e-10)
+        power = np.abs(np.fft.rfft(frames, axis=1)) ** 2 + 1e-10
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(
+            power, axis=1
+        )
+        loud = energy_db > max(
+            energy_db.max() - self.threshold_db, self.floor_db
+        )
+        return loud & (flatness < self.flatness_threshold)
+
+    def regions(self, waveform: np.ndarray, sample_rate: int) -> np.ndarray:
+        """Finds the regions of a mono waveform to keep.
+
+        Parameters
+        ----------
+        waveform : np.ndarray
+            The mono waveform.
+        sample_rate : int
+            The sample rate of the waveform.
+
+        Returns
+        -------
+        np.ndarray
+            The start and end sample of every region, of shape (REGIONS, 2),
+            empty if no frame holds speech.
+        """
+        frame_length = sample_rate * self.frame_ms // 1000
+        speech = self.speech_frames(waveform, sample_rate)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], speech, [0]))))
+        runs = edges.reshape(-1, 2)
+        runs = runs[
+            runs[:, 1] - runs[:, 0] >= self.min_speech_ms // self.frame_ms
+        ]
+        if len(runs) == 0:
+            return np.zeros((0, 2), dtype=np.int64)
+
+        # padded runs closer than the shortest silence become one region
+        padding = self.padding_ms // self.frame_ms
+        runs = runs + np.array([-padding, padding])
+        gaps = runs[1:, 0] - runs[:-1, 1]
+        is_cut = gaps >= self.min_silence_ms // self.frame_ms
+        starts = np.concatenate((runs[:1, 0], runs[1:, 0][is_cut]))
+        ends = np.concatenate((runs[:-1, 1][is_cut], runs[-1:, 1]))
+        regions = np.stack([starts, ends], axis=1) * frame_length
+        return np.clip(regions, 0, len(waveform)).astype(np.int64)
+
+    def trim(
+        self, waveform: Union[torch.Tensor, np.ndarray], sample_rate: int
+    ) -> tuple[Union[torch.Tensor, np.ndarray], SpeechTimeline]:
+        """Cuts the non-speech regions of a mono waveform.
+
+        A waveform without any speech frame is kept whole.
+
+        Parameters
+        ----------
+        waveform : Union[torch.Tensor, np.ndarray]
+            The mono waveform, of shape (SAMPLES,).
+        sample_rate : int
+            The sample rate of the waveform.
+
+        Returns
+        -------
+        tuple[Union[torch.Tensor, np.ndarray], SpeechTimeline]
+            The trimmed waveform, of the same type as the input, and the
+            timeline mapping its times back to the input.
+        """
+        samples = (
+            waveform.detach().cpu().numpy()
+            if isinstance(waveform, torch.Tensor)
+            else np.asarray(waveform)
+        )
+        regions = self.regions(samples, sample_rate)
+        if len(regions) == 0:
+            regions = np.array([[0, len(samples)]], dtype=np.int64)
+        timeline = SpeechTimeline(regions, sample_rate)
+        if len(regions) == 1 and regions[0, 0] == 0:
+            return waveform[: regions[0, 1]], timeline
+
+        pieces = [waveform[start:end] for start, end in regions]
+        if isinstance(waveform, torch.Tensor):
+            return torch.cat(pieces), timeline
+        return np.concatenate(pieces), timeline
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+
+from collections import OrderedDict
+from typing import Optional
+
+
+class ResultCache:
+    """Caches serialized results by the content of the audio they describe.
+
+    The results live in an in-memory LRU bounded by their total size in
+    bytes, in front of an optional on-disk store that survives restarts. A
+    result found on disk only is promoted back to memory. The results are
+    kept serialized, so a hit is returned as is, without any conversion.
+
+    The on-disk store is bounded too: once its files outgrow
+    `max_disk_bytes`, the least recently used ones, by modification time,
+    are deleted down to 90% of the budget. A disk hit refreshes the time of
+    its file.
+
+    Attributes
+    ----------
+    max_memory_bytes : int
+        The total size of the results kept in memory.
+    directory : Optional[str]
+        The folder of the on-disk store, if any.
+    max_disk_bytes : int
+        The total size of the files of the on-disk store.
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: int = 64 * 2**20,
+        directory: Optional[str] = None,
+        max_disk_bytes: int = 256 * 2**20,
+    ):
+        """
+        Parameters
+        ----------
+        max_memory_bytes : int, optional
+            The total size of the results kept in memory, the least recently
+            used ones are evicted beyond it (default is 64 MiB).
+        directory : Optional[str], optional
+            The folder of the on-disk store (default is None, memory only).
+        max_disk_bytes : int, optional
+            The total size of the files of the on-disk store, the least
+            recently used ones are deleted beyond it (default is 256 MiB).
+        """
+        self.max_memory_bytes = max_memory_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        # the size of the on-disk store, as of the last scan plus the writes
+        self._disk_bytes = (
+            sum(size for _, size, _ in self._disk_files())
+            if directory is not None
+            else 0
+        )
+
+    @staticmethod
+    def key(audio: bytes, *parts: str) -> str:
+        """Identifies a result by its audio and everything that shapes it.
+
+        Parameters
+        ----------
+        audio : bytes
+            The content of the audio file.
+        *parts : str
+            The other inputs of the result, e.g. the endpoint, the model id
+            and the decoder configuration.
+
+        Returns
+        -------
+        str
+            The hexadecimal BLAKE2b digest of the audio and the parts.
+        """
+        digest = hashlib.blake2b(audio, digest_size=20)
+        for part in parts:
+            # the length prefix keeps ("ab", "c") and ("a", "bc") apart
+            encoded = part.encode("utf-8")
+            digest.update(len(encoded).to_bytes(8, "little"))
+            digest.update(encoded)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns the result of a key, or None if it is not cached.
+
+        Parameters
+        ----------
+        key : str
+            The key of the result, see `key`.
+
+        Returns
+        -------
+        Optional[bytes]
+            The serialized result.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._memory_hits += 1
+                return value
+
+        value = self._read(key)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                return None
+            self._disk_hits += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: bytes):
+        """Caches the result of a key, in memory and on disk.
+
+        Parameters
+        ----------
+        key : str
+            The key of the result, see `key`.
+        value : bytes
+            The serialized result.
+        """
+        with self._lock:
+            self._remember(key, value)
+        self._write(key, value)
+
+    def stats(self) -> dict:
+        """Returns the counters of the cache.
+
+        Returns
+        -------
+        dict
+            The number of "memory_hits", "disk_hits" and "misses", the
+            "hit_rate", and the number of "entries" and "memory_bytes" held in
+            memory.
+        """
+        with self._lock:
+            lookups = self._memory_hits + self._disk_hits + self._misses
+            return {
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": (
+                    (self._memory_hits + self._disk_hits) / lookups
+                    if lookups
+                    else 0.0
+                ),
+                "entries": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+            }
+
+    def _remember(self, key: str, value: bytes):
+        """Stores a result in memory, evicting the least recently used ones.
+
+        The lock must be held.
+        """
+        if len(value) > self.max_memory_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._entries[key] = value
+        self._memory_bytes += len(value)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _path(self, key: str) -> str:
+        """Returns the file of a key, spread over folders of 256 files."""
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _read(self, key: str) -> Optional[bytes]:
+        """Reads a result from disk, if there is a disk store holding it."""
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            # the modification time orders the files for the eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return value
+
+    def _write(self, key: str, value: bytes):
+        """Writes a result to disk through a temporary file, if enabled.
+
+        The file is moved into place once complete, so concurrent readers
+        never see a partial result.
+        """
+        if self.directory is None or len(value) > self.max_disk_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        with self._lock:
+            self._disk_bytes += len(value) - replaced
+            needs_pruning = self._disk_bytes > self.max_disk_bytes
+        if needs_pruning:
+            self._prune()
+
+    def _prune(self):
+        """Deletes the least recently used files down to 90% of the budget.
+
+        The store is scanned again, so the files written by other processes
+        sharing the folder count as well. The scan runs without the lock, so
+        lookups and writes go on meanwhile, and one thread prunes at a time.
+        """
+        if not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                written_before = self._disk_bytes
+            files = sorted(self._disk_files())
+            total = sum(size for _, size, _ in files)
+            target = self.max_disk_bytes * 9 // 10
+            for _, size, path in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+            with self._lock:
+                # adds the writes of other threads during the scan, which
+                # it may have counted already: the next prune rescans anyway
+                self._disk_bytes = total + self._disk_bytes - written_before
+        finally:
+            self._prune_lock.release()
+
+    def _disk_files(self) -> list[tuple[int, int, str]]:
+        """Lists the modification time, size and path of the stored files."""
+        files = []
+        if not os.path.isdir(self.directory):
+            return files
+        for folder in os.scandir(self.directory):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return files
@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+from typing import Optional
+from typing import Sequence
+from typing import Union
+
+import numpy as np
+import torch
+
+from phonometrics.transcription.phonemes.tokens import TokenSet
+
+
+class ForcedAligner:
+    """Aligns CTC log-probabilities with a known phoneme sequence.
+
+    The alignment is the most probable CTC path (Viterbi) through the
+    reference tokens, with optional blanks between them. The trellis of
+    every clip of a batch is advanced one frame at a time for all the
+    clips and all the states at once, and the paths are traced back in the
+    same way, so the only Python loops run over the frames.
+
+    Word boundaries of the reference are aligned to the silence token, as
+    the model emits it between words, but they are left out of the results.
+
+    Attributes
+    ----------
+    token_set : TokenSet
+        The token set of the model.
+    ms_per_timestep : int
+        The duration of a logit frame in milliseconds.
+    """
+
+    def __init__(self, token_set: TokenSet, ms_per_timestep: int = 20):
+        """
+        Parameters
+        ----------
+        token_set : TokenSet
+            The token set of the model.
+        ms_per_timestep : int, optional
+            The duration of a logit frame in milliseconds (default is 20).
+        """
+        self.token_set = token_set
+        self.ms_per_timestep = ms_per_timestep
+
+    def tokenize(self, reference: str) -> list[int]:
+        """Converts a phonetic reference into token ids.
+
+        Parameters
+        ----------
+        reference : str
+            The expected phonemes, with words separated by whitespace.
+
+        Returns
+        -------
+        list[int]
+            The token ids of the reference.
+        """
+        tokens = self.token_set.tokenize(" ".join(reference.split()))
+        if self.token_set.unk_token in tokens:
+            raise ValueError(
+                f"The reference {reference!r} contains characters that are "
+                "not phonemes of the model"
+            )
+        return [self.token_set.id_by_token[token] for token in tokens]
+
+    def align(
+        self,
+        log_probs: Union[torch.Tensor, np.ndarray],
+        references: Sequence[Union[str, Sequence[int]]],
+        lengths: Optional[Sequence[int]] = None,
+    ) -> list[dict]:
+        """Aligns a batch of clips with their reference.
+
+        Parameters
+        ----------
+        log_probs : Union[torch.Tensor, np.ndarray]
+            The log-probabilities of the model, of shape
+            (BATCH_SIZE, TIMESTEPS, TOKEN_SET_SIZE).
+        references : Sequence[Union[str, Sequence[int]]]
+            The reference of every clip, as a phonetic transcription or as
+            token ids.
+        lengths : Optional[Sequence[int]], optional
+            The number of real frames of every clip (default is None, all
+            the frames are real).
+
+        Returns
+        -------
+        list[dict]
+            The alignment of every clip with keys:
+            "phonemes": the reference phonemes,
+            "start_timestamps" and "end_timestamps": the time span of each
+            phoneme in milliseconds,
+            "scores": the mean log-probability of each phoneme over its
+            frames,
+            "score": the mean log-probability per frame of the whole path.
+        """
+        log_probs = _to_numpy(log_probs)
+        results = []
+        for item_log_probs, segments in zip(
+            log_probs, self.align_frames(log_probs, references, lengths)
+        ):
+            ids, columns = np.unique(segments["ids"], return_inverse=True)
+            scores = segment_means(
+                item_log_probs[:, ids],
+                columns,
+                segments["start_frames"],
+                segments["end_frames"],
+            )
+            results.append(
+                {
+                    **self.timestamps(segments),
+                    "scores": scores.tolist(),
+                    "score": segments["score"],
+                }
+            )
+        return results
+
+    def align_frames(
+        self,
+        log_probs: Union[torch.Tensor, np.ndarray],
+        references: Sequence[Union[str, Sequence[int]]],
+        lengths: Optional[Sequence[int]] = None,
+    ) -> list[dict]:
+        """Finds the frames of every reference phoneme of a batch of clips.
+
+        The parameters are the same as for `align`.
+
+        Returns
+        -------
+        list[dict]
+            The segments of every clip with keys:
+            "ids": the token ids of the reference phonemes, without the
+            word boundaries,
+            "start_frames" and "end_frames": the frame span of each phoneme,
+            "score": the mean log-probability per frame of the whole path.
+        """
+        log_probs = _to_numpy(log_probs)
+        batch_size, n_timesteps, _ = log_probs.shape
+        if len(references) != batch_size:
+            raise ValueError("Every clip needs exactly one reference")
+        if lengths is None:
+            lengths = [n_timesteps] * batch_size
+        lengths = np.asarray(lengths, dtype=np.int64)
+        targets = [
+            self.tokenize(x) if isinstance(x, str) else list(x)
+            for x in references
+        ]
+
+        states, emissions = self._emissions(log_probs, targets)
+        paths, path_scores = self._viterbi(
+            states, emissions, lengths, [2 * len(x) + 1 for x in targets]
+        )
+
+        results = []
+        for i, target in enumerate(targets):
+            if not np.isfinite(path_scores[i]):
+                raise ValueError(
+                    f"Clip {i} is too short to be aligned with its reference"
+                )
+            # the path never goes back, so the frames of a token are
+            # contiguous
+            path = paths[i, : lengths[i]]
+            token_states = 2 * np.arange(len(target)) + 1
+            ids = np.array(target, dtype=np.int64)
+            is_phoneme = ids != self.token_set.silence_token_id
+            results.append(
+                {
+                    "ids": ids[is_phoneme],
+                    "start_frames": np.searchsorted(path, token_states)[
+                        is_phoneme
+                    ],
+                    "end_frames": np.searchsorted(
+                        path, token_states, side="right"
+                    )[is_phoneme],
+                    "score": float(path_scores[i] / max(lengths[i], 1)),
+                }
+            )
+        return results
+
+    def timestamps(self, segments: dict) -> dict:
+        """Converts the frame spans of `align_frames` into timestamps.
+
+        Parameters
+        ----------
+        segments : dict
+            The segments of a clip, as returned by `align_frames`.
+
+        Returns
+        -------
+        dict
+            The "phonemes", "start_timestamps" and "end_timestamps" of the
+            clip, the timestamps in milliseconds.
+        """
+        return {
+            "phonemes": self.token_set.compiled.tokens[
+                segments["ids"]
+            ].tolist(),
+            "start_timestamps": (
+                segments["start_frames"] * self.ms_per_timestep
+            ).tolist(),
+            "end_timestamps": (
+                segments["end_frames"] * self.ms_per_timestep
+            ).tolist(),
+        }
+
+    def _emissions(
+        self, log_probs: np.ndarray, targets: list[list[int]]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Builds the CTC states of every clip and their log-probabilities.
+
+        The states of a reference of length L are its tokens interleaved
+        with 2L + 1 blanks. The references are padded to the longest one
+        with unreachable states.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            The token id of every state, of shape (BATCH_SIZE, STATES), and
+            the log-probability of every state at every frame, of shape
+            (BATCH_SIZE, TIMESTEPS, STATES).
+        """
+        blank_id = self.token_set.blank_token_id
+        n_states = 2 * max((len(x) for x in targets), default=0) + 1
+        states = np.full((len(targets), n_states), blank_id, dtype=np.int64)
+        for i, target in enumerate(targets):
+            states[i, 1 : 2 * len(target) : 2] = target
+
+        emissions = np.take_along_axis(log_probs, states[:, None, :], axis=2)
+        for i, target in enumerate(targets):
+            emissions[i, :, 2 * len(target) + 1 :] = -np.inf
+        return states, emissions
+
+    def _viterbi(
+        self,
+        states: np.ndarray,
+        emissions: np.ndarray,
+        lengths: np.ndarray,
+        n_states: Sequence[int],
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Finds the most probable CTC path of every clip.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            The state of every frame of the paths, of shape
+            (BATCH_SIZE, TIMESTEPS), and the log-probability of each path.
+        """
+        batch_size, n_timesteps, max_states = emissions.shape
+        batch = np.arange(batch_size)
+
+        # a token can be reached from the token before it when they differ
+        can_skip = np.zeros_like(states, dtype=bool)
+        can_skip[:, 2:] = (states[:, 2:] != self.token_set.blank_token_id) & (
+            states[:, 2:] != states[:, :-2]
+        )
+
+        scores = np.full((batch_size, max_states), -np.inf)
+        scores[:, :2] = emissions[:, 0, :2]
+        # 0: stay in the state, 1: come from the previous one, 2: skip one
+        moves = np.zeros((batch_size, n_timesteps, max_states), dtype=np.int8)
+        candidates = np.full((3, batch_size, max_states), -np.inf)
+        for t in range(1, n_timesteps):
+            candidates[0] = scores
+            candidates[1, :, 1:] = scores[:, :-1]
+            candidates[2, :, 2:] = np.where(
+                can_skip[:, 2:], scores[:, :-2], -np.inf
+            )
+            move = np.argmax(candidates, axis=0)
+            best = np.take_along_axis(candidates, move[None], axis=0)[0]
+            # the clips shorter than t frames keep their last scores
+            running = (t < lengths)[:, None]
+            scores = np.where(running, best + emissions[:, t], scores)
+            moves[:, t] = np.where(running, move, 0)
+
+        # a path ends on the last token or on the blank after it
+        last = np.array(n_states) - 1
+        ends = np.stack([last, np.maximum(last - 1, 0)], axis=1)
+        end_scores = np.take_along_axis(scores, ends, axis=1)
+        state = ends[batch, np.argmax(end_scores, axis=1)]
+        path_scores = end_scores.max(axis=1)
+
+        paths = np.zeros((batch_size, n_timesteps), dtype=np.int64)
+        for t in range(n_timesteps - 1, -1, -1):
+            paths[:, t] = state
+            state = state - moves[batch, t, state]
+        return paths, path_scores
+
+
+def segment_means(
+    values: np.ndarray,
+    columns: np.ndarray,
+    start_frames: np.ndarray,
+    end_frames: np.ndarray,
+) -> np.ndarray:
+    """Averages per-frame values over segments, all at once.
+
+    The values are summed cumulatively over time, so the sum over a segment
+    is the difference of two prefix sums.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        The per-frame values, of shape (TIMESTEPS, COLUMNS).
+    columns : np.ndarray
+        The column of `values` averaged over each segment.
+    start_frames : np.ndarray
+        The first frame of each segment.
+    end_frames : np.ndarray
+        The frame following the last one of each segment. Every segment
+        must hold at least one frame.
+
+    Returns
+    -------
+    np.ndarray
+        The mean value of every segment.
+    """
+    prefix_sums = np.zeros((values.shape[0] + 1, values.shape[1]))
+    np.cumsum(values, axis=0, dtype=np.float64, out=prefix_sums[1:])
+    sums = (
+        prefix_sums[end_frames, columns] - prefix_sums[start_frames, columns]
+    )
+    return sums / (end_frames - start_frames)
+
+
+def _to_numpy(log_probs: Union[torch.Tensor, np.ndarray]) -> np.ndarray:
+    """Returns the log-probabilities as a float32 NumPy array."""
+    if isinstance(log_probs, torch.Tensor):
+        return log_probs.detach().float().cpu().numpy()
+    return np.asarray(log_probs, dtype=np.float32)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import tempfile
+
+from typing import Optional
+
+from transformers import AutoModelForCTC
+from transformers import AutoProcessor
+
+from phonometrics.transcription.phonemes.tokens import TokenSet
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "phonometrics", "artifacts"
+)
+TOKEN_SET_FILE = "tokens.json"
+
+
+def artifact_dir(model_name: str, cache_dir: Optional[str] = None) -> str:
+    """Returns the folder holding the artifacts of a model.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model on the Hugging Face hub.
+    cache_dir : Optional[str], optional
+        The folder caching the artifacts of every model (default is None,
+        see `DEFAULT_CACHE_DIR`).
+
+    Returns
+    -------
+    str
+        The folder of the model.
+    """
+    return os.path.join(
+        cache_dir or DEFAULT_CACHE_DIR, model_name.replace("/", "--")
+    )
+
+
+def save_artifacts(
+    model: AutoModelForCTC, processor: AutoProcessor, directory: str
+):
+    """Saves everything needed to serve a model without the hub.
+
+    The folder receives the model config and its weights as safetensors,
+    which are memory-mapped on load instead of unpickled, the tokenizer and
+    feature extractor of the processor, and the TokenSet. The files are
+    written to a temporary folder first and moved into place once complete,
+    so an interrupted save never leaves partial artifacts behind.
+
+    Parameters
+    ----------
+    model : AutoModelForCTC
+        The CTC model.
+    processor : AutoProcessor
+        The processor of the model.
+    directory : str
+        Where to write the artifacts.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent)
+    try:
+        processor.save_pretrained(tmp_dir)
+        model.save_pretrained(tmp_dir, safe_serialization=True)
+        # written last, its presence marks complete artifacts
+        TokenSet.from_processor(processor).save(
+            os.path.join(tmp_dir, TOKEN_SET_FILE)
+        )
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.replace(tmp_dir, directory)
+    finally:
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+
+
+def load_artifacts(
+    directory: str,
+) -> tuple[AutoModelForCTC, AutoProcessor, TokenSet]:
+    """Loads the artifacts written by `save_artifacts`, never reaching the hub.
+
+    Parameters
+    ----------
+    directory : str
+        The folder of the artifacts.
+
+    Returns
+    -------
+    tuple[AutoModelForCTC, AutoProcessor, TokenSet]
+        The model, its processor and its TokenSet.
+    """
+    processor = AutoProcessor.from_pretrained(
+        directory, local_files_only=True
+    )
+    model = AutoModelForCTC.from_pretrained(
+        directory, local_files_only=True, use_safetensors=True
+    )
+    token_set = TokenSet.load(os.path.join(directory, TOKEN_SET_FILE))
+    return model, processor, token_set
+
+
+def load_or_create_artifacts(
+    model_name: str, cache_dir: Optional[str] = None
+) -> tuple[AutoModelForCTC, AutoProcessor, TokenSet]:
+    """Loads the artifacts of a model, downloading them on the first call.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model on the Hugging Face hub.
+    cache_dir : Optional[str], optional
+        The folder caching the artifacts of every model (default is None,
+        see `DEFAULT_CACHE_DIR`).
+
+    Returns
+    -------
+    tuple[AutoModelForCTC, AutoProcessor, TokenSet]
+        The model, its processor and its TokenSet.
+    """
+    directory = artifact_dir(model_name, cache_dir)
+    if not os.path.exists(os.path.join(directory, TOKEN_SET_FILE)):
+        logger.info(f"Saving the artifacts of {model_name} to {directory}")
+        save_artifacts(
+            AutoModelForCTC.from_pretrained(model_name),
+            AutoProcessor.from_pretrained(model_name),
+            directory,
+        )
+    return load_artifacts(directory)
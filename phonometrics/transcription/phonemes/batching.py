@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from typing import Optional
+
+import torch
+
+from phonometrics.transcription.phonemes.model import TranscriptionModel
+from phonometrics.transcription.phonemes.result import TranscriptionResult
+
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatchScheduler:
+    """Coalesces concurrent transcription requests into batched forward passes.
+
+    Requests are queued and collected for at most `max_wait_ms` milliseconds
+    or until `max_batch_size` of them are waiting, whichever comes first.
+    The collected batch is then transcribed with a single call to
+    `TranscriptionModel.transcribe_batch` in a worker thread, and each
+    request gets its own transcription back. While a batch is running, new
+    requests keep queueing up and form the next batch.
+
+    Attributes
+    ----------
+    _model : TranscriptionModel
+        The model used for batched transcription.
+    max_batch_size : int
+        The maximum number of requests transcribed together.
+    max_wait_ms : float
+        How long the first request of a batch waits for company.
+    """
+
+    def __init__(
+        self,
+        model: TranscriptionModel,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+    ):
+        """
+        Parameters
+        ----------
+        model : TranscriptionModel
+            The model used for batched transcription.
+        max_batch_size : int, optional
+            The maximum number of requests transcribed together
+            (default is 8).
+        max_wait_ms : float, optional
+            How long the first request of a batch waits for other requests,
+            in milliseconds (default is 10).
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self._model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Starts the background task that forms and runs the batches."""
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the background task and fails the requests still queued."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._fail(pending, RuntimeError("The batching scheduler was stopped"))
+
+    async def transcribe(
+        self, waveform: torch.Tensor, sample_rate: int
+    ) -> TranscriptionResult:
+        """Queues a waveform for transcription and waits for its result.
+
+        Parameters
+        ----------
+        waveform : torch.Tensor
+            The audio waveform to be transcribed.
+        sample_rate : int
+            The sample rate of the waveform.
+
+        Returns
+        -------
+        TranscriptionResult
+            The transcription of the audio, in the same format as
+            `TranscriptionModel.transcribe_from_waveform`.
+        """
+        if self._worker is None:
+            raise RuntimeError("The batching scheduler is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((waveform, sample_rate, future))
+        return await future
+
+    async def _collect_batch(self) -> list[tuple]:
+        """Waits for a first request and gathers more until the batch closes.
+
+        Returns
+        -------
+        list[tuple]
+            The `(waveform, sample_rate, future)` entries of the batch.
+        """
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait_ms / 1000
+
+        try:
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            self._fail(
+                batch, RuntimeError("The batching scheduler was stopped")
+            )
+            raise
+
+        # requests whose client went away meanwhile are not worth computing
+        return [entry for entry in batch if not entry[2].done()]
+
+    async def _run(self):
+        """Forms batches forever and resolves the futures of their requests."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            if not batch:
+                continue
+
+            waveforms = [waveform for waveform, _, _ in batch]
+            sample_rates = [sample_rate for _, sample_rate, _ in batch]
+            logger.info(f"Transcribing a batch of {len(batch)} request(s)")
+            try:
+                results = await loop.run_in_executor(
+                    None, self._model.transcribe_batch, waveforms, sample_rates
+                )
+            except asyncio.CancelledError:
+                self._fail(
+                    batch, RuntimeError("The batching scheduler was stopped")
+                )
+                raise
+            except Exception as e:
+                self._fail(batch, e)
+                continue
+
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    @staticmethod
+    def _fail(batch: list[tuple], exception: Exception):
+        """Propagates an exception to every unresolved request of a batch.
+
+        Parameters
+        ----------
+        batch : list[tuple]
+            The `(waveform, sample_rate, future)` entries of the batch.
+        exception : Exception
+            The exception the waiting requests should raise.
+        """
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(exception)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+
+def chunk_starts(
+    n_samples: int, chunk_samples: int, stride_samples: int
+) -> list[int]:
+    """Computes where each window of a chunked waveform starts.
+
+    Windows are `chunk_samples` long and start every `stride_samples`
+    samples. The last window ends at the end of the waveform, so it may be
+    shorter than the others.
+
+    Parameters
+    ----------
+    n_samples : int
+        The length of the waveform.
+    chunk_samples : int
+        The length of a window.
+    stride_samples : int
+        The distance between the starts of two consecutive windows.
+
+    Returns
+    -------
+    list[int]
+        The start sample of every window.
+    """
+    if not 0 < stride_samples <= chunk_samples:
+        raise ValueError(
+            "The stride must be positive and not longer than the chunk"
+        )
+    starts = [0]
+    while starts[-1] + chunk_samples < n_samples:
+        starts.append(starts[-1] + stride_samples)
+    return starts
+
+
+def frame_boundaries(
+    starts: list[int],
+    chunk_samples: int,
+    n_frames: int,
+    samples_per_frame: int,
+) -> list[int]:
+    """Assigns every output frame to exactly one window.
+
+    Two consecutive windows share an overlap region. The frames left of the
+    middle of that region are taken from the earlier window and the frames
+    right of it from the later one, so each kept frame has context on both
+    sides except at the very ends of the waveform.
+
+    Parameters
+    ----------
+    starts : list[int]
+        The start sample of every window, as returned by `chunk_starts`.
+        Every start has to be a multiple of `samples_per_frame`.
+    chunk_samples : int
+        The length of a window.
+    n_frames : int
+        The number of frames the whole waveform produces.
+    samples_per_frame : int
+        How many waveform samples one logit frame covers.
+
+    Returns
+    -------
+    list[int]
+        `len(starts) + 1` global frame indices. Window `k` contributes the
+        frames `boundaries[k]` to `boundaries[k + 1]`.
+    """
+    boundaries = [0]
+    for start, next_start in zip(starts[:-1], starts[1:]):
+        middle = (next_start + start + chunk_samples) / 2
+        boundaries.append(
+            min(
+                max(round(middle / samples_per_frame), boundaries[-1]),
+                n_frames,
+            )
+        )
+    boundaries.append(n_frames)
+    return boundaries
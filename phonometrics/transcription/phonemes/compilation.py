@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import bisect
+import logging
+
+from typing import Optional
+from typing import Sequence
+
+import torch
+
+from transformers import AutoModelForCTC
+from transformers.modeling_outputs import CausalLMOutput
+
+
+logger = logging.getLogger(__name__)
+
+
+class BucketedCompiledModel:
+    """Runs a `torch.compile`d CTC model on a small set of input shapes.
+
+    Every input is right-padded to the shortest duration bucket that fits it,
+    and its batch is padded to the next power of two, so the compiled graph
+    only ever sees a few static shapes and never recompiles after
+    `warm_up`. The logits are cut back to the frames of the real input.
+    Inputs longer than the largest bucket run through the eager model; set
+    the chunk length of `TranscriptionModel` to at most the largest bucket to
+    keep them on the compiled path.
+
+    It is called like the original model, `model(input_values,
+    attention_mask=...)`, so it can stand in for the PyTorch model inside
+    `TranscriptionModel`.
+
+    Attributes
+    ----------
+    config : PretrainedConfig
+        The configuration of the wrapped model.
+    buckets : list[int]
+        The padded input lengths, in samples at 16kHz.
+    """
+
+    def __init__(
+        self,
+        model: AutoModelForCTC,
+        buckets_s: Sequence[float],
+        with_attention_mask: bool,
+        max_batch_size: int = 1,
+    ):
+        """
+        Parameters
+        ----------
+        model : AutoModelForCTC
+            The CTC model to compile.
+        buckets_s : Sequence[float]
+            The durations inputs are padded to, in seconds.
+        with_attention_mask : bool
+            Whether the model takes an attention mask. Models without one see
+            the padding as silence, which can slightly change their output.
+        max_batch_size : int, optional
+            The largest batch the model will be called with (default is 1).
+        """
+        if not buckets_s:
+            raise ValueError("At least one duration bucket is required")
+        self.config = model.config
+        self.buckets = sorted({int(seconds * 16000) for seconds in buckets_s})
+        self._model = model.eval()
+        self._dtype = model.dtype
+        self._compiled = torch.compile(model, dynamic=False)
+        self._with_attention_mask = with_attention_mask
+        self._batch_sizes = [1]
+        while self._batch_sizes[-1] < max_batch_size:
+            self._batch_sizes.append(self._batch_sizes[-1] * 2)
+
+        # one graph per (bucket, batch size) pair has to stay cached
+        n_shapes = len(self.buckets) * len(self._batch_sizes)
+        torch._dynamo.config.cache_size_limit = max(
+            torch._dynamo.config.cache_size_limit, n_shapes
+        )
+
+    def _bucket(self, n_samples: int) -> Optional[int]:
+        """Returns the shortest bucket that fits an input, if any."""
+        i = bisect.bisect_left(self.buckets, n_samples)
+        return self.buckets[i] if i < len(self.buckets) else None
+
+    def _batch_size(self, batch_size: int) -> int:
+        """Returns the padded batch size of a batch."""
+        i = bisect.bisect_left(self._batch_sizes, batch_size)
+        return (
+            self._batch_sizes[i] if i < len(self._batch_sizes) else batch_size
+        )
+
+    def __call__(
+        self,
+        input_values: torch.Tensor,
+        attention_mask: Optional[torch.Tensor] = None,
+    ) -> CausalLMOutput:
+        """Runs the compiled model on a batch of processed inputs.
+
+        Parameters
+        ----------
+        input_values : torch.Tensor
+            The processed inputs of shape (BATCH_SIZE, SAMPLES).
+        attention_mask : Optional[torch.Tensor], optional
+            The mask of the real samples (default is None, all samples are
+            real).
+
+        Returns
+        -------
+        CausalLMOutput
+            The output holding the `logits` tensor of the real input frames.
+        """
+        batch_size, n_samples = input_values.shape
+        bucket = self._bucket(n_samples)
+        if bucket is None:
+            return self._model(input_values, attention_mask=attention_mask)
+
+        # the dtypes are part of the compiled graph's guards as well
+        padded_batch_size = self._batch_size(batch_size)
+        padded_values = torch.zeros(
+            padded_batch_size, bucket, dtype=self._dtype
+        )
+        padded_values[:batch_size, :n_samples] = input_values
+        padded_mask = torch.zeros(padded_batch_size, bucket, dtype=torch.long)
+        if attention_mask is None:
+            padded_mask[:batch_size, :n_samples] = 1
+        else:
+            padded_mask[:batch_size, :n_samples] = attention_mask
+
+        logits = self._run(padded_values, padded_mask)
+        n_frames = int(self._model._get_feat_extract_output_lengths(n_samples))
+        return CausalLMOutput(logits=logits[:batch_size, :n_frames])
+
+    def _run(
+        self, input_values: torch.Tensor, attention_mask: torch.Tensor
+    ) -> torch.Tensor:
+        """Calls the compiled model on an already padded batch."""
+        with torch.no_grad():
+            return self._compiled(
+                input_values,
+                attention_mask=(
+                    attention_mask if self._with_attention_mask else None
+                ),
+            ).logits
+
+    def warm_up(self):
+        """Compiles the graph of every bucket and batch size up front."""
+        for bucket in self.buckets:
+            for batch_size in self._batch_sizes:
+                logger.info(
+                    f"Compiling for {bucket / 16000:.1f}s inputs "
+                    f"in batches of {batch_size}"
+                )
+                self._run(
+                    torch.zeros(batch_size, bucket, dtype=self._dtype),
+                    torch.ones(batch_size, bucket, dtype=torch.long),
+                )
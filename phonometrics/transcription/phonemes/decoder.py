@@ -2,17 +2,57 @@
 from __future__ import annotations
 
 import logging
+import multiprocessing
+import os
+import threading
 
-from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Optional
 from typing import Union
 
 import numpy as np
 import torch
 
+from phonometrics.transcription.phonemes.ngram import PhonemeNgramLM
+from phonometrics.transcription.phonemes.result import TranscriptionResult
 from phonometrics.transcription.phonemes.tokens import TokenSet
 
 
+# the pyctcdecode decoder of a KenshoLMDecoder worker process, see _init_kensho_worker
+_kensho_worker_decoder = None
+_kensho_worker_error = None
+
+
+def _init_kensho_worker(tokens: list[str], lm_path: str, decoder_kwargs: dict):
+    """
+    Builds the pyctcdecode decoder of a worker process, loading the KenLM model once per worker.
+
+    A failing initializer would make the pool replace the worker over and over, so the error is kept and raised
+    by the first decoding call instead.
+    """
+
+    global _kensho_worker_decoder, _kensho_worker_error
+
+    try:
+        from pyctcdecode import build_ctcdecoder
+
+        _kensho_worker_decoder = build_ctcdecoder(tokens, lm_path, **decoder_kwargs)
+    except Exception as e:
+        _kensho_worker_error = e
+
+
+def _kensho_decode_beams(logits: np.ndarray, beam_kwargs: dict) -> list:
+    """
+    Runs the beam search of a single batch item with the decoder of the current worker process.
+    """
+
+    if _kensho_worker_error is not None:
+        raise RuntimeError("The KenLM decoder could not be built in the worker process") from _kensho_worker_error
+
+    return _kensho_worker_decoder.decode_beams(logits, **beam_kwargs)
+
+
 class Decoder:
     """
     Decoder
@@ -77,10 +117,19 @@ class Decoder:
                     "start_timesteps": list,
                     "end_timesteps": list,
                 }, ...]
+            A prediction may also hold the "log_probs" of its item, of shape (TIMESTEPS, TOKEN_SET_SIZE), when the
+            decoder already computed them. They are then used for the token probabilities instead of the logits.
         """
 
         raise NotImplementedError()
 
+    def close(self):
+        """
+        Release the resources held by the decoder, e.g. worker processes. The base decoder holds none.
+        """
+
+        pass
+
     def _ctc_decode(
         self,
         predicted_ids: Union[torch.Tensor, np.ndarray, list[int]],
@@ -89,10 +138,15 @@ class Decoder:
         """
         Decode the predicted using the CTC decoding algorithm.
 
+        Repeated ids are merged and blanks are dropped with array operations over the whole batch instead of
+        looping over the timesteps. A token spanning a single timestep t gets the timesteps (t, t + 1), a longer
+        one the timesteps of its first and last occurrence.
+
         Parameters:
         ----------
             predicted_ids: Union[torch.Tensor, np.ndarray, list[int]]
-                Model's output tensors of shape (BATCH_SIZE, TIMESTEPS, TOKEN_SET_SIZE)
+                Predicted ids of shape (BATCH_SIZE, TIMESTEPS), or a list of BATCH_SIZE id sequences of
+                possibly different lengths
 
             return_timesteps: Optional[bool] = True
                 If True, return the timesteps of the decoded sequence.
@@ -107,57 +161,150 @@ class Decoder:
                 }, ...]
         """
 
-        predictions = []
-
-        for i in range(len(predicted_ids)):  # for each item in the batch
-
-            i_predicted_ids = []
-            i_start_timesteps = []
-            i_end_timesteps = []
-            previous_predicted_id = None
-
-            for t in range(
-                len(predicted_ids[i])
-            ):  # for each timestep in the item
-
-                predicted_id = int(predicted_ids[i][t])
+        # the items are laid end to end in a single flat array, offsets[i] being the first timestep of item i
+        if isinstance(predicted_ids, torch.Tensor):
+            predicted_ids = predicted_ids.detach().cpu().numpy()
+        if isinstance(predicted_ids, np.ndarray) and predicted_ids.dtype != object:
+            batch_size = predicted_ids.shape[0]
+            lengths = np.full(batch_size, predicted_ids.shape[1] if predicted_ids.ndim > 1 else 0)
+            flat_ids = predicted_ids.reshape(-1).astype(np.int64)
+        else:  # ragged items, e.g. the token lists of the LM decoders
+            items = [np.asarray(item, dtype=np.int64).reshape(-1) for item in predicted_ids]
+            batch_size = len(items)
+            lengths = np.array([len(item) for item in items], dtype=np.int64)
+            flat_ids = np.concatenate(items) if batch_size > 0 else np.zeros(0, dtype=np.int64)
+
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+        n_timesteps = len(flat_ids)
+
+        # a run is a maximal sequence of equal ids inside an item, every non blank run becomes a token
+        run_starts_mask = np.ones(n_timesteps, dtype=bool)
+        run_starts_mask[1:] = flat_ids[1:] != flat_ids[:-1]
+        run_starts_mask[offsets[offsets < n_timesteps]] = True
+        run_starts = np.flatnonzero(run_starts_mask)
+        run_lasts = np.append(run_starts[1:], n_timesteps) - 1
+
+        is_token = flat_ids[run_starts] != self.token_set.blank_token_id
+        run_starts = run_starts[is_token]
+        run_lasts = run_lasts[is_token]
+        ids = flat_ids[run_starts]
+
+        # side="right" skips the empty items sharing the offset of the next one
+        items_index = np.searchsorted(offsets, run_starts, side="right") - 1
+        start_timesteps = run_starts - offsets[items_index]
+        # a single timestep token ends at the next timestep, a longer one at its last timestep
+        end_timesteps = np.where(run_lasts == run_starts, start_timesteps + 1, run_lasts - offsets[items_index])
+
+        splits = np.cumsum(np.bincount(items_index, minlength=batch_size))[:-1]
+        ids = np.split(ids, splits)
+        start_timesteps = np.split(start_timesteps, splits)
+        end_timesteps = np.split(end_timesteps, splits)
 
-                if predicted_id != self.token_set.blank_token_id:
-
-                    if (
-                        len(i_predicted_ids) == 0
-                        or previous_predicted_id
-                        == self.token_set.blank_token_id
-                        or predicted_id != i_predicted_ids[-1]
-                    ):
-                        i_predicted_ids.append(predicted_id)
-                        if return_timesteps:
-                            i_start_timesteps.append(t)
-                            i_end_timesteps.append(t + 1)
-
-                    elif (
-                        predicted_id == i_predicted_ids[-1]
-                        and return_timesteps
-                    ):
-                        i_end_timesteps[-1] = t
-
-                previous_predicted_id = predicted_id
+        predictions = []
 
+        for i in range(batch_size):  # for each item in the batch
             predictions.append(
                 {
-                    "ids": i_predicted_ids,
+                    "ids": ids[i].tolist(),
                     "start_timesteps": (
-                        i_start_timesteps if return_timesteps else None
+                        start_timesteps[i].tolist() if return_timesteps else None
                     ),
                     "end_timesteps": (
-                        i_end_timesteps if return_timesteps else None
+                        end_timesteps[i].tolist() if return_timesteps else None
                     ),
                 }
             )
 
         return predictions
 
-    def __call__(self, logits: torch.Tensor) -> list[dict]:
+    def _id_probabilities(
+        self,
+        logits: torch.Tensor,
+        ids: np.ndarray,
+        log_probs: Optional[Union[torch.Tensor, np.ndarray]] = None,
+    ) -> torch.Tensor:
+        """
+        Compute the per-timestep probabilities of some token ids only.
+
+        Instead of a softmax over the whole token set, a log-softmax normalizer is computed per timestep and only
+        the logits of the requested ids are gathered and normalized.
+
+        Parameters:
+        ----------
+            logits: torch.Tensor
+                Model's output tensor of a single item, of shape (TIMESTEPS, TOKEN_SET_SIZE)
+
+            ids: np.ndarray
+                The token ids to compute the probabilities of
+
+            log_probs: Optional[Union[torch.Tensor, np.ndarray]] = None
+                Log-probabilities of shape (TIMESTEPS, TOKEN_SET_SIZE) already computed by the decoder, if any.
+                They are used as they are instead of normalizing the logits.
+
+        Returns:
+        ----------
+            torch.Tensor: CPU tensor of shape (TIMESTEPS, len(ids)) with the probabilities of the ids
+        """
+
+        if log_probs is not None:
+            log_probs = torch.as_tensor(log_probs)
+            return log_probs[:, torch.as_tensor(ids, device=log_probs.device)].float().exp().cpu()
+
+        if logits.dtype != torch.float32:
+            logits = logits.float()
+        log_normalizers = torch.logsumexp(logits, dim=-1, keepdim=True)
+        return (logits[:, torch.as_tensor(ids, device=logits.device)] - log_normalizers).exp().cpu()
+
+    def _segment_probabilities(
+        self,
+        probabilities: torch.Tensor,
+        columns: np.ndarray,
+        start_timesteps: np.ndarray,
+        end_timesteps: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Compute the mean probability of every token over its window of timesteps, all at once.
+
+        The probabilities are summed cumulatively over time, so the sum over a window is the difference of two
+        prefix sums. Empty windows get a NaN probability.
+
+        Parameters:
+        ----------
+            probabilities: torch.Tensor
+                Per-timestep probabilities of the distinct predicted ids of a single item, of shape
+                (TIMESTEPS, N_IDS), as returned by `_id_probabilities`
+
+            columns: np.ndarray
+                The column of `probabilities` holding the predicted id of every window
+
+            start_timesteps: np.ndarray
+                The first timestep of every window
+
+            end_timesteps: np.ndarray
+                The timestep following the last one of every window
+
+        Returns:
+        ----------
+            np.ndarray: the mean probability of every window
+        """
+
+        n_timesteps = probabilities.shape[0]
+
+        prefix_sums = np.zeros((n_timesteps + 1, probabilities.shape[1]))
+        np.cumsum(probabilities.numpy(), axis=0, dtype=np.float64, out=prefix_sums[1:])
+
+        # same bounds as slicing the timesteps with [start:end]
+        starts = np.clip(start_timesteps, 0, n_timesteps)
+        ends = np.clip(end_timesteps, 0, n_timesteps)
+        lengths = ends - starts
+
+        sums = prefix_sums[np.maximum(ends, starts), columns] - prefix_sums[starts, columns]
+        means = np.full(len(sums), np.nan)
+        np.divide(sums, lengths, out=means, where=lengths > 0)
+
+        return means
+
+    def __call__(self, logits: torch.Tensor) -> list[TranscriptionResult]:
         """
         Getting the predictions given the model's output logits.
 
@@ -168,98 +315,66 @@ class Decoder:
 
         Returns:
         ----------
-            list[dict]: Decoded prediction list of size BATCH_SIZE with format:
-                [{
-                    "transcription": list,
-                    "start_timesteps": list,
-                    "end_timesteps": list,
-                }, ...]
+            list[TranscriptionResult]: Decoded prediction list of size BATCH_SIZE, with the transcription, the
+                token ids, the start and end timestamps in milliseconds and the probabilities of every token
         """
 
         result = []
+        compiled = self.token_set.compiled
 
+        # the search and the probabilities run in fp32 whatever the model precision
+        logits = logits.detach().float()
         predictions = self._get_predictions(logits)
-        logits_probs = (
-            torch.nn.functional.softmax(logits.float(), dim=-1)
-            .to("cpu")
-            .detach()
-        )
 
         for i, prediction in enumerate(predictions):
 
-            transcription = ""
-            transcription_start_timestamps = []
-            transcription_end_timestamps = []
-            transcription_probabilities = []
-
+            # the index of every reported token in the prediction, with its id
             if "transcription" in prediction:
                 transcription = prediction["transcription"]
-                J = range(len(transcription))
+                token_ids = compiled.ids(
+                    char if char != " " else self.token_set.silence_token for char in transcription
+                )
+                token_indices = np.arange(len(token_ids))
             else:
-                J = range(len(prediction["ids"]))
+                predicted_ids = np.asarray(prediction["ids"], dtype=np.int64)
+                token_indices = np.flatnonzero(compiled.reported(predicted_ids, self.skip_special_tokens))
+                token_ids = predicted_ids[token_indices]
+                transcription = compiled.to_text(token_ids)
 
-            for j in J:
+            start_timestamps = None
+            end_timestamps = None
+            probabilities = None
 
-                if "transcription" in prediction:
-                    token = (
-                        transcription[j]
-                        if transcription[j] != " "
-                        else self.token_set.silence_token
-                    )
-                    if token not in self.token_set.tokens:
-                        token = self.token_set.unk_token
-                    predicted_id = self.token_set.id_by_token[token]
-                else:
-                    predicted_id = prediction["ids"][j]
-
-                    if predicted_id == self.token_set.silence_token_id:
-                        transcription += " "
-                    elif (
-                        self.skip_special_tokens
-                        and self.token_set.tokens[predicted_id]
-                        in self.token_set.special_tokens
-                    ):
-                        continue
-                    else:
-                        transcription += self.token_set.tokens[predicted_id]
-
-                if prediction["start_timesteps"] is not None:
-                    start_timestep = prediction["start_timesteps"][j]
-                    transcription_start_timestamps.append(
-                        int(start_timestep * self.ms_per_timestep)
-                    )
+            if prediction["start_timesteps"] is not None:
+                start_timesteps = np.asarray(prediction["start_timesteps"], dtype=np.int64)[token_indices]
+                start_timestamps = start_timesteps * self.ms_per_timestep
 
-                    # as we report the character based probability and more than one timestep can be responsable for the character prediction,
-                    # when a start_timestep and end_timestep are provided we'll report the mean value of the this range of timesteps,
-                    # otherwise we'll report the mean probability of a window defined be the start_timestep_t and start_timestep_t+1
-
-                    if prediction["end_timesteps"] is not None:
-                        window_end_timestep = prediction["end_timesteps"][j]
-                    else:
-                        window_end_timestep = start_timestep + 1
-
-                    if (
-                        start_timestep == window_end_timestep
-                    ):  # it needs to have at least one timestep of difference
-                        window_end_timestep += 1
-
-                    window_probabilities = [
-                        x[predicted_id]
-                        for x in logits_probs[i][
-                            start_timestep:window_end_timestep
-                        ]
-                    ]
-                    probability = float(np.mean(window_probabilities))
-                    transcription_probabilities.append(probability)
+                # as we report the character based probability and more than one timestep can be responsable for the character prediction,
+                # when a start_timestep and end_timestep are provided we'll report the mean value of the this range of timesteps,
+                # otherwise we'll report the mean probability of a window defined be the start_timestep_t and start_timestep_t+1
 
                 if prediction["end_timesteps"] is not None:
-                    end_timestep = prediction["end_timesteps"][j]
-                    transcription_end_timestamps.append(
-                        int(end_timestep * self.ms_per_timestep)
-                    )
+                    window_end_timesteps = np.asarray(prediction["end_timesteps"], dtype=np.int64)[token_indices]
+                else:
+                    window_end_timesteps = start_timesteps + 1
+
+                # it needs to have at least one timestep of difference
+                window_end_timesteps = np.where(
+                    start_timesteps == window_end_timesteps,
+                    window_end_timesteps + 1,
+                    window_end_timesteps,
+                )
+
+                # only the probabilities of the predicted ids are ever read
+                unique_ids, columns = np.unique(token_ids, return_inverse=True)
+                id_probabilities = self._id_probabilities(logits[i], unique_ids, prediction.get("log_probs"))
+                probabilities = self._segment_probabilities(
+                    id_probabilities, columns, start_timesteps, window_end_timesteps
+                )
 
-                    # probability = float(logits_probs[i][start_timestep][predicted_id])
-                    # transcription_probabilities[-1] = probability
+            if prediction["end_timesteps"] is not None:
+                end_timesteps = np.asarray(prediction["end_timesteps"], dtype=np.int64)[token_indices]
+                end_timestamps = end_timesteps * self.ms_per_timestep
 
             # transcription trimming
             if len(transcription) > 0:
@@ -271,45 +386,19 @@ class Decoder:
                     left_offset : len(transcription) - right_offset
                 ]
 
-                if len(transcription_start_timestamps) > 0:
-                    transcription_start_timestamps = (
-                        transcription_start_timestamps[
-                            left_offset : len(transcription_start_timestamps)
-                            - right_offset
-                        ]
-                    )
-                if len(transcription_end_timestamps) > 0:
-                    transcription_end_timestamps = (
-                        transcription_end_timestamps[
-                            left_offset : len(transcription_end_timestamps)
-                            - right_offset
-                        ]
-                    )
-                if len(transcription_probabilities) > 0:
-                    transcription_probabilities = transcription_probabilities[
-                        left_offset : len(transcription_probabilities)
-                        - right_offset
-                    ]
+                token_ids, start_timestamps, end_timestamps, probabilities = (
+                    x[left_offset : len(x) - right_offset] if x is not None else None
+                    for x in (token_ids, start_timestamps, end_timestamps, probabilities)
+                )
 
             result.append(
-                {
-                    "transcription": transcription,
-                    "start_timestamps": (
-                        transcription_start_timestamps
-                        if len(transcription_start_timestamps) > 0
-                        else None
-                    ),
-                    "end_timestamps": (
-                        transcription_end_timestamps
-                        if len(transcription_end_timestamps) > 0
-                        else None
-                    ),
-                    "probabilities": (
-                        transcription_probabilities
-                        if len(transcription_probabilities) > 0
-                        else None
-                    ),
-                }
+                TranscriptionResult(
+                    transcription,
+                    token_ids=token_ids,
+                    start_timestamps=start_timestamps,
+                    end_timestamps=end_timestamps,
+                    probabilities=probabilities,
+                )
             )
 
         return result
@@ -335,6 +424,199 @@ class GreedyDecoder(Decoder):
         return predictions
 
 
+class PrefixBeamSearchDecoder(Decoder):
+    """
+    CTC prefix beam search decoder written with NumPy only, with an optional phoneme n-gram language model
+
+    Each frame extends every beam with all the plausible tokens at once, as a (BEAMS x TOKENS) score matrix, and the
+    extensions leading to the same prefix are merged. Frames where the blank is almost certain only update the scores
+    of the existing beams. The LM scores are added when a token is appended to a prefix (shallow fusion).
+
+    The start timestep of a token is the frame where it was appended, its end timestep the last of the consecutive
+    following frames where it stays the argmax of the frame, as the GreedyDecoder repeats it (or start + 1 for a
+    single frame).
+
+    Parameters
+    ----------
+    token_set : TokenSet
+        The TokenSet object to use for decoding.
+
+    lm: Optional[Union[PhonemeNgramLM, str]] = None
+        The phoneme n-gram language model, or the path of one saved with PhonemeNgramLM.save. None decodes
+        without LM.
+
+    alpha: Optional[float] = 0.5
+        Weighting associated with the LM log-probabilities. A weight of 0 means the LM has no effect.
+
+    beta: Optional[float] = 0.0
+        Score added for every token appended to a beam (insertion bonus).
+
+    beam_width: Optional[int] = 16
+        Maximum number of beams at each step in decoding.
+
+    beam_prune_logp: Optional[float] = -10.0
+        Beams that are much worse than best beam will be pruned.
+
+    token_min_logp: Optional[float] = -5.0
+        Tokens below this logp are skipped unless they are argmax of frame.
+
+    blank_skip_logp: Optional[float] = -0.001
+        Frames whose blank logp is above this value don't extend the beams.
+    """
+
+    def __init__(
+        self,
+        token_set: TokenSet,
+        lm: Optional[Union[PhonemeNgramLM, str]] = None,
+        alpha: Optional[float] = 0.5,
+        beta: Optional[float] = 0.0,
+        beam_width: Optional[int] = 16,
+        beam_prune_logp: Optional[float] = -10.0,
+        token_min_logp: Optional[float] = -5.0,
+        blank_skip_logp: Optional[float] = -0.001,
+    ):
+
+        super().__init__(token_set)
+
+        if isinstance(lm, str):
+            lm = PhonemeNgramLM.load(lm)
+        if lm is not None:
+            lm.check_token_set(token_set)
+
+        self.lm = lm
+        self.alpha = alpha
+        self.beta = beta
+        self.beam_width = beam_width
+        self.beam_prune_logp = beam_prune_logp
+        self.token_min_logp = token_min_logp
+        self.blank_skip_logp = blank_skip_logp
+
+    def _get_predictions(self, logits: torch.Tensor) -> list[dict]:
+
+        log_probs = torch.log_softmax(logits.detach().float(), dim=-1).cpu().numpy()
+
+        predictions = []
+        for item_log_probs in log_probs:
+            prediction = self._beam_search(item_log_probs)
+            # handing the log-probabilities over, so that they aren't computed twice
+            prediction["log_probs"] = item_log_probs
+            predictions.append(prediction)
+
+        return predictions
+
+    def _beam_search(self, log_probs: np.ndarray) -> dict:
+        """
+        Run the prefix beam search over the frames of a single item.
+
+        Parameters:
+        ----------
+            log_probs: np.ndarray
+                Log-probabilities of shape (TIMESTEPS, TOKEN_SET_SIZE)
+
+        Returns:
+        ----------
+            dict: the best beam, with format:
+                {
+                    "ids": list,
+                    "start_timesteps": list,
+                    "end_timesteps": list,
+                }
+        """
+
+        blank_id = self.token_set.blank_token_id
+
+        # beams: their prefix, the start and last frame of each token, and the log-probability of the prefix ending
+        # with a blank (b) or with its last token (nb)
+        prefixes = [()]
+        starts = [()]
+        lasts = [()]
+        p_b = np.zeros(1)
+        p_nb = np.full(1, -np.inf)
+
+        for t, frame in enumerate(log_probs):
+
+            last_ids = np.array([prefix[-1] if prefix else blank_id for prefix in prefixes])
+            repeat = np.where(last_ids != blank_id, frame[last_ids], -np.inf)
+
+            # the beams as they are: followed by a blank, or by their last token once more
+            stay_b = np.logaddexp(p_b, p_nb) + frame[blank_id]
+            stay_nb = p_nb + repeat
+            for k in np.flatnonzero(repeat >= frame.max()):
+                if lasts[k][-1] == t - 1:
+                    lasts[k] = lasts[k][:-1] + (t,)
+
+            if frame[blank_id] > self.blank_skip_logp:
+                p_b, p_nb = stay_b, stay_nb
+                continue
+
+            is_candidate = frame >= self.token_min_logp
+            is_candidate[np.argmax(frame)] = True
+            is_candidate[blank_id] = False
+            candidates = np.flatnonzero(is_candidate)
+
+            # (BEAMS x CANDIDATES) scores of the beams extended with one more token, repeating the last token
+            # of a prefix needs a blank in between
+            scores = np.where(
+                candidates[None, :] == last_ids[:, None], p_b[:, None], np.logaddexp(p_b, p_nb)[:, None]
+            ) + (frame[candidates] + self.beta)[None, :]
+            if self.lm is not None and self.alpha != 0:
+                lm_scores = np.stack([self.lm.next_token_scores(prefix) for prefix in prefixes])
+                scores += self.alpha * lm_scores[:, candidates]
+
+            threshold = max(np.logaddexp(stay_b, stay_nb).max(), scores.max(initial=-np.inf)) + self.beam_prune_logp
+            beam_index, candidate_index = np.nonzero(scores >= threshold)
+            extension_scores = scores[beam_index, candidate_index]
+            if len(extension_scores) > self.beam_width:
+                best = np.argpartition(-extension_scores, self.beam_width)[: self.beam_width]
+                beam_index, candidate_index = beam_index[best], candidate_index[best]
+                extension_scores = extension_scores[best]
+
+            # merging the extensions into the existing beams, the extensions read the timesteps of their beam
+            # before this frame's merges
+            position = {prefix: k for k, prefix in enumerate(prefixes)}
+            beam_starts, beam_lasts = starts, lasts
+            prefixes, starts, lasts = list(prefixes), list(starts), list(lasts)
+            new_b, new_nb = stay_b.tolist(), stay_nb.tolist()
+            for k, token_id, score in zip(
+                beam_index.tolist(), candidates[candidate_index].tolist(), extension_scores.tolist()
+            ):
+                prefix = prefixes[k] + (token_id,)
+                j = position.get(prefix)
+                if j is None:
+                    position[prefix] = len(prefixes)
+                    prefixes.append(prefix)
+                    starts.append(beam_starts[k] + (t,))
+                    lasts.append(beam_lasts[k] + (t,))
+                    new_b.append(-np.inf)
+                    new_nb.append(score)
+                else:
+                    # the timesteps follow the most probable of the merged paths
+                    if score > np.logaddexp(new_b[j], new_nb[j]):
+                        starts[j] = beam_starts[k] + (t,)
+                        lasts[j] = beam_lasts[k] + (t,)
+                    new_nb[j] = np.logaddexp(new_nb[j], score)
+
+            p_b, p_nb = np.array(new_b), np.array(new_nb)
+            totals = np.logaddexp(p_b, p_nb)
+            kept = np.flatnonzero(totals >= totals.max() + self.beam_prune_logp)
+            if len(kept) > self.beam_width:
+                kept = kept[np.argpartition(-totals[kept], self.beam_width)[: self.beam_width]]
+            prefixes = [prefixes[k] for k in kept]
+            starts = [starts[k] for k in kept]
+            lasts = [lasts[k] for k in kept]
+            p_b, p_nb = p_b[kept], p_nb[kept]
+
+        best = int(np.argmax(np.logaddexp(p_b, p_nb)))
+
+        return {
+            "ids": list(prefixes[best]),
+            "start_timesteps": list(starts[best]),
+            "end_timesteps": [
+                last if last > start else start + 1 for start, last in zip(starts[best], lasts[best])
+            ],
+        }
+
+
 class ParlanceLMDecoder(Decoder):
     """
     Parlance Language Model decoder
@@ -499,6 +781,12 @@ class FlashlightLMDecoder(Decoder):
         The device where the decoder will be executed, by default it's "cpu", if you want to use gpu,
         then you'll need to install the flashlight with CUDA support and set the decoder_device to "cuda"
 
+    num_threads: Optional[int] = None
+        Number of threads decoding the items of a batch concurrently. The native decoder releases the GIL, and
+        every thread gets its own decoder instance since a decoder keeps the state of its search. The language
+        model and the lexicon trie are shared. None means one thread per cpu, 0 decodes in the calling thread.
+        Call close() to shut the threads down.
+
     """
 
     def __init__(
@@ -513,6 +801,7 @@ class FlashlightLMDecoder(Decoder):
         word_score: Optional[float] = -1.0,
         sil_score: Optional[float] = 0.0,
         decoder_device: Optional[str] = "cpu",
+        num_threads: Optional[int] = None,
     ):
 
         super().__init__(token_set)
@@ -547,6 +836,7 @@ class FlashlightLMDecoder(Decoder):
         self.word_score = word_score
         self.sil_score = sil_score
         self.decoder_device = decoder_device
+        self.num_threads = num_threads
 
         if self.lexicon_path is not None:
             tokens_keys = self.token_set.id_by_token.keys()
@@ -621,7 +911,8 @@ class FlashlightLMDecoder(Decoder):
             # LexiconDecoder(decoder options, trie, lm, silence index,
             #                blank index (for CTC), unk index,
             #                transitiona matrix, is token-level lm)
-            self.decoder = LexiconDecoder(
+            self._build_decoder = partial(
+                LexiconDecoder,
                 self.decoder_opts,
                 self.trie,
                 self.lm,
@@ -664,7 +955,8 @@ class FlashlightLMDecoder(Decoder):
                 log_add=False,
                 criterion_type=CriterionType.CTC,
             )
-            self.decoder = LexiconFreeDecoder(
+            self._build_decoder = partial(
+                LexiconFreeDecoder,
                 self.decoder_opts,
                 self.lm,
                 self.token_set.silence_token_id,
@@ -672,45 +964,58 @@ class FlashlightLMDecoder(Decoder):
                 [],
             )
 
-    def _get_predictions(self, logits: torch.Tensor) -> list[dict]:
+        # every thread decoding items gets its own decoder, this one belongs to the constructing thread
+        self.decoder = self._build_decoder()
+        self._thread_decoders = threading.local()
+        self._thread_decoders.decoder = self.decoder
+        self.pool = None
+        if self.num_threads != 0:
+            self.pool = ThreadPoolExecutor(max_workers=self.num_threads or os.cpu_count())
 
-        # This parameter controls the number of best results to be considered for decoding.
-        # Nowadays, it's 1 by default. In the future, I may change this if I add some randomness for decoding.
-        nbest_results = 1
+    def close(self):
 
-        logits = logits.to(self.decoder_device)
-        B, T, N = logits.size()
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
 
-        tokens = []
-        # scores = []
-        for i in range(B):
-            logits_ptr = logits.data_ptr() + 4 * i * logits.stride(0)
-
-            # decoder.decode(emissions, Time, Ntokens)
-            # result is a list of sorted hypothesis, 0-index is the best hypothesis
-            # each hypothesis is a struct with "score" and "words" representation
-            # in the hypothesis and the "tokens" representation
-            results = self.decoder.decode(logits_ptr, T, N)
-
-            best_results = results[
-                :nbest_results
-            ]  # getting the best candidates
-            tokens_best = []
-            # scores_best = []
-            for result in best_results:
-                tokens_best.append(result.tokens)
-                # scores_best.append(result.score)
-            tokens.append(tokens_best)
-            # scores.append(scores_best)
-
-        token_array = np.array(tokens, dtype=object).transpose((1, 0, 2))
-        # scores_arrray = np.array(scores, dtype=object).transpose()
-
-        predicted_ids = token_array[0][:]  # getting best candidates
+    def _thread_decoder(self):
+        """
+        Get the decoder instance of the current thread, building it on first use.
+        """
 
-        predictions = self._ctc_decode(predicted_ids)
+        decoder = getattr(self._thread_decoders, "decoder", None)
+        if decoder is None:
+            decoder = self._thread_decoders.decoder = self._build_decoder()
+        return decoder
 
-        return predictions
+    def _decode_item(self, decoder, logits_ptr: int, n_timesteps: int, n_tokens: int) -> list[int]:
+        """
+        Run the beam search of a single batch item and return the token ids of its best hypothesis.
+        """
+
+        # decoder.decode(emissions, Time, Ntokens)
+        # result is a list of sorted hypothesis, 0-index is the best hypothesis
+        # each hypothesis is a struct with "score" and "words" representation
+        # in the hypothesis and the "tokens" representation
+        results = decoder.decode(logits_ptr, n_timesteps, n_tokens)
+        return results[0].tokens
+
+    def _get_predictions(self, logits: torch.Tensor) -> list[dict]:
+
+        # the decoder reads the float32 emissions straight from memory, one item every stride(0) values
+        logits = logits.to(self.decoder_device, dtype=torch.float32).contiguous()
+        B, T, N = logits.size()
+        logits_ptrs = [logits.data_ptr() + 4 * i * logits.stride(0) for i in range(B)]
+
+        if self.pool is None or B <= 1:
+            predicted_ids = [self._decode_item(self._thread_decoder(), x, T, N) for x in logits_ptrs]
+        else:
+            # logits stays referenced until every item is decoded
+            predicted_ids = list(
+                self.pool.map(lambda x: self._decode_item(self._thread_decoder(), x, T, N), logits_ptrs)
+            )
+
+        return self._ctc_decode(predicted_ids)
 
 
 class KenshoLMDecoder(Decoder):
@@ -774,6 +1079,11 @@ class KenshoLMDecoder(Decoder):
     hotword_weights: Optional[float]) = 10.0
         Weight factor for hotword importance.
 
+    num_workers: Optional[int] = None
+        Number of long-lived worker processes running the beam search. Each worker loads the KenLM model once
+        when it starts and keeps it for all the following calls. None means one worker per cpu, 0 decodes in the
+        calling process. Call close() to shut the workers down.
+
     """
 
     def __init__(
@@ -791,6 +1101,7 @@ class KenshoLMDecoder(Decoder):
         prune_history: Optional[bool] = False,
         hotwords: Optional[list[str]] = None,
         hotword_weights: Optional[float] = 10.0,
+        num_workers: Optional[int] = None,
     ):
 
         super().__init__(token_set)
@@ -807,6 +1118,7 @@ class KenshoLMDecoder(Decoder):
         self.prune_history = prune_history
         self.hotwords = hotwords
         self.hotword_weights = hotword_weights
+        self.num_workers = num_workers
 
         try:
             from pyctcdecode import build_ctcdecoder
@@ -828,9 +1140,7 @@ class KenshoLMDecoder(Decoder):
             for x in self.token_set.tokens
         ]
 
-        self.decoder = build_ctcdecoder(
-            tokens,
-            self.lm_path,
+        decoder_kwargs = dict(
             alpha=self.alpha,
             beta=self.beta,
             unigrams=self.unigrams,
@@ -838,58 +1148,119 @@ class KenshoLMDecoder(Decoder):
             lm_score_boundary=self.lm_score_boundary,
         )
 
+        self.decoder = None
+        self.pool = None
+        if self.num_workers == 0:
+            self.decoder = build_ctcdecoder(tokens, self.lm_path, **decoder_kwargs)
+        else:
+            # spawned workers don't inherit the threads of the serving process (torch, uvicorn),
+            # which makes them safe to start at any time
+            self.pool = multiprocessing.get_context("spawn").Pool(
+                processes=self.num_workers,
+                initializer=_init_kensho_worker,
+                initargs=(tokens, self.lm_path, decoder_kwargs),
+            )
+
+    def close(self):
+
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
     def _get_predictions(self, logits: torch.Tensor) -> list[dict]:
 
-        with Pool() as pool:
-
-            decoder_outputs = self.decoder.decode_beams_batch(
-                pool,
-                logits.cpu().detach().numpy(),
-                beam_width=self.beam_width,
-                beam_prune_logp=self.beam_prune_logp,
-                token_min_logp=self.token_min_logp,
-                prune_history=self.prune_history,
-                hotwords=self.hotwords,
-                hotword_weight=self.hotword_weights,
-            )
+        beam_kwargs = dict(
+            beam_width=self.beam_width,
+            beam_prune_logp=self.beam_prune_logp,
+            token_min_logp=self.token_min_logp,
+            prune_history=self.prune_history,
+            hotwords=self.hotwords,
+            hotword_weight=self.hotword_weights,
+        )
+        batch_logits = list(logits.cpu().detach().numpy())
 
-            predictions = []
+        if self.decoder is not None:
+            decoder_outputs = [self.decoder.decode_beams(x, **beam_kwargs) for x in batch_logits]
+        elif self.pool is not None:
+            decoder_outputs = self.pool.map(partial(_kensho_decode_beams, beam_kwargs=beam_kwargs), batch_logits)
+        else:
+            raise RuntimeError("The decoder was closed")
+
+        predictions = []
+
+        for decoder_output in decoder_outputs:
 
-            for decoder_output in decoder_outputs:
+            # pyctcdecode < 0.1 returns (text, word_frames, logit_score, lm_score) per beam, later versions
+            # insert the last LM state after the text, so the word frames are always the third last element
+            best_beam = decoder_output[0]
+            transcription, word_frames = best_beam[0], best_beam[-3]
+            start_timesteps = []
+            last_end_timestep = None
 
-                transcription, word_frames, logit_score, lm_score = (
-                    decoder_output[0]
+            for word_frame in word_frames:
+                word = word_frame[0]
+                start_timestep = word_frame[1][0]
+                end_timestep = word_frame[1][1]
+
+                # as the pyctcdecode doesn't return the character based timestamp, we need to make an approximation of it
+                timestep_per_char = max(
+                    1, int((end_timestep - start_timestep) / len(word))
                 )
-                start_timesteps = []
-                last_end_timestep = None
 
-                for word_frame in word_frames:
-                    word = word_frame[0]
-                    start_timestep = word_frame[1][0]
-                    end_timestep = word_frame[1][1]
+                # handling whitespaces
+                if last_end_timestep is not None:
+                    start_timesteps.append(last_end_timestep)
 
-                    # as the pyctcdecode doesn't return the character based timestamp, we need to make an approximation of it
-                    timestep_per_char = max(
-                        1, int((end_timestep - start_timestep) / len(word))
+                for i in range(0, len(word)):
+                    start_timesteps.append(
+                        start_timestep + i * timestep_per_char
                     )
 
-                    # handling whitespaces
-                    if last_end_timestep is not None:
-                        start_timesteps.append(last_end_timestep)
+                last_end_timestep = end_timestep
 
-                    for i in range(0, len(word)):
-                        start_timesteps.append(
-                            start_timestep + i * timestep_per_char
-                        )
+            predictions.append(
+                {
+                    "transcription": transcription,
+                    "start_timesteps": start_timesteps,
+                    "end_timesteps": None,
+                }
+            )
 
-                    last_end_timestep = end_timestep
+        return predictions
 
-                predictions.append(
-                    {
-                        "transcription": transcription,
-                        "start_timesteps": start_timesteps,
-                        "end_timesteps": None,
-                    }
-                )
 
-        return predictions
+DECODERS = {
+    "greedy": GreedyDecoder,
+    "beam": PrefixBeamSearchDecoder,
+    "kensho": KenshoLMDecoder,
+    "parlance": ParlanceLMDecoder,
+    "flashlight": FlashlightLMDecoder,
+}
+
+
+def build_decoder(name: str, token_set: TokenSet, **kwargs) -> Decoder:
+    """
+    Build a decoder from its name, e.g. the one selected in the configuration.
+
+    Parameters:
+    ----------
+        name: str
+            One of the keys of DECODERS: "greedy", "beam" (the built-in prefix beam search), or one of the KenLM
+            decoders "kensho", "parlance" and "flashlight", which need their optional dependencies.
+
+        token_set: TokenSet
+            The TokenSet object to use for decoding.
+
+        **kwargs:
+            The other arguments of the decoder class, e.g. beam_width or lm_path.
+
+    Returns:
+    ----------
+        Decoder: the decoder, to be closed with close() once unused.
+    """
+
+    if name not in DECODERS:
+        raise ValueError(f"Unknown decoder {name!r}, expected one of {tuple(DECODERS)}")
+
+    return DECODERS[name](token_set, **kwargs)
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from typing import Sequence
+
+
+def edit_distance(reference: Sequence, hypothesis: Sequence) -> int:
+    """Computes the Levenshtein distance between two sequences.
+
+    Parameters
+    ----------
+    reference : Sequence
+        The reference sequence, e.g. a list of phonemes.
+    hypothesis : Sequence
+        The sequence compared to the reference.
+
+    Returns
+    -------
+    int
+        The minimal number of substitutions, insertions and deletions that
+        turn `hypothesis` into `reference`.
+    """
+    previous = list(range(len(hypothesis) + 1))
+    for i, expected in enumerate(reference, start=1):
+        current = [i]
+        for j, actual in enumerate(hypothesis, start=1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (expected != actual),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def phoneme_error_rate(
+    reference: Sequence[str], hypothesis: Sequence[str]
+) -> float:
+    """Computes the phoneme error rate of a hypothesis.
+
+    Parameters
+    ----------
+    reference : Sequence[str]
+        The reference phonemes.
+    hypothesis : Sequence[str]
+        The recognized phonemes.
+
+    Returns
+    -------
+    float
+        The edit distance divided by the length of the reference. An empty
+        reference gives 0 for an empty hypothesis and 1 otherwise.
+    """
+    if len(reference) == 0:
+        return float(len(hypothesis) > 0)
+    return edit_distance(reference, hypothesis) / len(reference)
@@ -1,14 +1,36 @@
 # mostly taken from https://github.com/jonatasgrosman/huggingsound
 from __future__ import annotations
 
+import math
+
+from typing import Optional
+from typing import Sequence
+
 import torch
 import torchaudio
 
 from transformers import AutoModelForCTC
 from transformers import AutoProcessor
-
-from phonometrics.transcription.phonemes.decoder import GreedyDecoder
+from transformers import BatchFeature
+
+from phonometrics.audio_processing.resampling import resample
+from phonometrics.audio_processing.resampling import resample_batch
+from phonometrics.audio_processing.vad import SpeechTimeline
+from phonometrics.audio_processing.vad import SpeechTrimmer
+from phonometrics.transcription.phonemes.alignment import ForcedAligner
+from phonometrics.transcription.phonemes.chunking import chunk_starts
+from phonometrics.transcription.phonemes.chunking import frame_boundaries
+from phonometrics.transcription.phonemes.compilation import BucketedCompiledModel
+from phonometrics.transcription.phonemes.decoder import build_decoder
+from phonometrics.transcription.phonemes.onnx_backend import OnnxCTCModel
+from phonometrics.transcription.phonemes.posteriorgram import encode_posteriorgram
+from phonometrics.transcription.phonemes.precision import apply_precision
+from phonometrics.transcription.phonemes.result import TranscriptionResult
+from phonometrics.transcription.phonemes.scoring import GOPScorer
+from phonometrics.transcription.phonemes.streaming import StreamingSession
 from phonometrics.transcription.phonemes.tokens import TokenSet
+from phonometrics.transcription.phonemes.truncation import EncoderAdapter
+from phonometrics.transcription.phonemes.truncation import truncate_encoder
 
 
 class Waveform:
@@ -50,11 +72,7 @@ class Waveform:
             The resampled waveform.
         """
         if self.sample_rate != target_sample_rate:
-            self.data = torchaudio.functional.resample(
-                self.data,
-                orig_freq=self.sample_rate,
-                new_freq=target_sample_rate,
-            )
+            self.data = resample(self.data, self.sample_rate, target_sample_rate)
             self.sample_rate = target_sample_rate
         return self
 
@@ -73,6 +91,29 @@ class Waveform:
         return self
 
 
+def feature_lengths(config, input_lengths: torch.Tensor) -> torch.Tensor:
+    """Computes the number of logit frames produced for each input length.
+
+    Applies the output size formula of the convolutional feature extractor
+    layer by layer, mirroring what the model does internally.
+
+    Parameters
+    ----------
+    config : PretrainedConfig
+        The model configuration holding `conv_kernel` and `conv_stride`.
+    input_lengths : torch.Tensor
+        The number of waveform samples of each batch item.
+
+    Returns
+    -------
+    torch.Tensor
+        The number of logit frames of each batch item.
+    """
+    for kernel_size, stride in zip(config.conv_kernel, config.conv_stride):
+        input_lengths = torch.div(input_lengths - kernel_size, stride, rounding_mode="floor") + 1
+    return input_lengths
+
+
 # class TranscriptionModel:
 #     """Encapsulates the transcription model and related processing components.
 #
@@ -206,11 +247,44 @@ class TranscriptionModel:
         The processor for preparing audio inputs.
     _token_set : TokenSet
         The token set derived from the processor.
-    _decoder : GreedyDecoder
+    _decoder : Decoder
         The decoder for generating transcriptions from logits.
+    _aligner : ForcedAligner
+        The aligner of the logits with a reference transcription.
+    _scorer : GOPScorer
+        The pronunciation scorer of the logits against a reference transcription.
+    _chunk_samples : Optional[int]
+        The window length used for long audio, in samples at 16kHz.
+    _chunk_overlap_samples : int
+        The overlap between two consecutive windows, in samples at 16kHz.
+    _chunk_batch_size : int
+        The number of windows run through the model together.
+    _trimmer : Optional[SpeechTrimmer]
+        The trimmer cutting the non-speech regions before transcription.
+    _resampling_quality : str
+        The quality of the resampling to 16kHz.
     """
 
-    def __init__(self, model: AutoModelForCTC, processor: AutoProcessor):
+    def __init__(
+        self,
+        model: AutoModelForCTC,
+        processor: AutoProcessor,
+        chunk_length_s: Optional[float] = None,
+        chunk_overlap_s: float = 1.0,
+        chunk_batch_size: int = 1,
+        precision: str = "fp32",
+        backend: str = "torch",
+        onnx_cache_dir: Optional[str] = None,
+        compile_buckets_s: Optional[Sequence[float]] = None,
+        max_batch_size: int = 1,
+        decoder: str = "greedy",
+        decoder_options: Optional[dict] = None,
+        token_set: Optional[TokenSet] = None,
+        trimmer: Optional[SpeechTrimmer] = None,
+        num_encoder_layers: Optional[int] = None,
+        encoder_adapter: Optional[str] = None,
+        resampling_quality: str = "high",
+    ):
         """
         Parameters
         ----------
@@ -218,11 +292,125 @@ class TranscriptionModel:
             The trained CTC model for transcription.
         processor : AutoProcessor
             The processor for preparing audio inputs.
+        chunk_length_s : Optional[float], optional
+            If given, audio longer than this many seconds is split into
+            overlapping windows of this length, which bounds the peak memory
+            of inference (default is None, the whole audio in one pass).
+        chunk_overlap_s : float, optional
+            The overlap between two consecutive windows in seconds. Each
+            window keeps the frames up to the middle of its overlaps, so every
+            kept frame has at least half of this as context (default is 1.0).
+        chunk_batch_size : int, optional
+            The number of windows run through the model together
+            (default is 1).
+        precision : str, optional
+            The inference precision, see `precision.PRECISIONS`. "int8"
+            quantizes the encoder linear layers in place, which speeds up CPU
+            inference. "bf16" and "fp16" cast the weights and activations in
+            place, halving the weight memory, and fall back to fp32 on CPUs
+            without native support (default is "fp32").
+        backend : str, optional
+            The inference backend, "torch" or "onnx". With "onnx" the model is
+            exported to ONNX once, cached on disk and served by ONNX Runtime on
+            CPU (default is "torch").
+        onnx_cache_dir : Optional[str], optional
+            The folder caching the exported ONNX graphs (default is None, see
+            `onnx_backend.DEFAULT_CACHE_DIR`).
+        compile_buckets_s : Optional[Sequence[float]], optional
+            If given, the torch model is compiled with `torch.compile` and
+            every input is padded to the shortest of these durations, in
+            seconds, that fits it, so the graph never recompiles after
+            `warm_up` (default is None, eager mode).
+        max_batch_size : int, optional
+            The largest batch given to `transcribe_batch`, used to compile the
+            batched graphs ahead of time (default is 1).
+        decoder : str, optional
+            The decoder turning the logits into transcriptions, see
+            `decoder.DECODERS`. "beam" is the built-in prefix beam search, the
+            other beam search decoders need their optional dependencies
+            (default is "greedy").
+        decoder_options : Optional[dict], optional
+            The keyword arguments of the decoder, e.g. {"beam_width": 16}
+            (default is None).
+        token_set : Optional[TokenSet], optional
+            The token set of the processor, e.g. loaded with the artifacts
+            of the model (default is None, derived from the processor).
+        trimmer : Optional[SpeechTrimmer], optional
+            If given, the non-speech regions of the audio are cut before
+            transcription and the timestamps are shifted back to the original
+            audio (default is None, the whole audio is transcribed).
+        num_encoder_layers : Optional[int], optional
+            If given, only the first this many transformer layers of the
+            encoder run and feed the CTC head, a fast mode trading accuracy for
+            latency, see `python -m benchmarks.truncation` (default is None,
+            the whole encoder).
+        encoder_adapter : Optional[str], optional
+            The `.npz` file of an `EncoderAdapter` fitted for
+            `num_encoder_layers`, inserted before the CTC head to recover part
+            of the accuracy of the truncated encoder (default is None).
+        resampling_quality : str, optional
+            The quality of the resampling of audio that is not at 16kHz, see
+            `resampling.QUALITIES` (default is "high").
         """
-        self._model = model
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Unknown backend {backend!r}, expected 'torch' or 'onnx'")
+        if backend == "onnx" and precision != "fp32":
+            raise ValueError("The onnx backend only supports the fp32 precision")
+        if backend == "onnx" and compile_buckets_s is not None:
+            raise ValueError("Compilation is only supported by the torch backend")
+        if encoder_adapter is not None and num_encoder_layers is None:
+            raise ValueError("encoder_adapter requires num_encoder_layers")
+
+        if num_encoder_layers is not None:
+            adapter = EncoderAdapter.load(encoder_adapter) if encoder_adapter is not None else None
+            model = truncate_encoder(model, num_encoder_layers, adapter)
+        self._model = apply_precision(model, precision)
+        # the inputs follow the weights of a 16-bit float model
+        self._input_dtype = self._model.dtype
+        if backend == "onnx":
+            self._model = OnnxCTCModel.from_model(
+                model,
+                with_attention_mask=processor.feature_extractor.return_attention_mask,
+                cache_dir=onnx_cache_dir,
+            )
+        if compile_buckets_s is not None:
+            self._model = BucketedCompiledModel(
+                self._model,
+                compile_buckets_s,
+                with_attention_mask=processor.feature_extractor.return_attention_mask,
+                max_batch_size=max(max_batch_size, chunk_batch_size),
+            )
         self._processor = processor
-        self._token_set = TokenSet.from_processor(processor)
-        self._decoder = GreedyDecoder(self._token_set)
+        self._token_set = token_set if token_set is not None else TokenSet.from_processor(processor)
+        self._decoder = build_decoder(decoder, self._token_set, **(decoder_options or {}))
+        self._aligner = ForcedAligner(self._token_set)
+        self._scorer = GOPScorer(self._aligner)
+        self._trimmer = trimmer
+        self._resampling_quality = resampling_quality
+
+        self._chunk_samples = None
+        self._chunk_overlap_samples = int(chunk_overlap_s * 16000)
+        self._chunk_batch_size = chunk_batch_size
+        if chunk_length_s is not None:
+            if not 0.1 <= chunk_overlap_s < chunk_length_s:
+                raise ValueError(
+                    "chunk_overlap_s must be at least 0.1 seconds and shorter than chunk_length_s"
+                )
+            if chunk_batch_size < 1:
+                raise ValueError("chunk_batch_size must be at least 1")
+            self._chunk_samples = int(chunk_length_s * 16000)
+
+    def warm_up(self):
+        """Runs the model ahead of the first request.
+
+        A compiled model builds the graph of every duration bucket here, which
+        otherwise happens on the first requests that hit each bucket. Any
+        other model runs once on a second of silence.
+        """
+        if isinstance(self._model, BucketedCompiledModel):
+            self._model.warm_up()
+        else:
+            self._forward(self._process_inputs(torch.zeros(16000), 16000))
 
     def _process_inputs(self, audio_waveform: torch.Tensor, sample_rate: int):
         """Prepares the audio input for the model.
@@ -245,9 +433,55 @@ class TranscriptionModel:
             return_tensors="pt",
         )
 
+    def _process_batch_inputs(self, waveforms: Sequence[torch.Tensor]) -> BatchFeature:
+        """Prepares several 16kHz mono waveforms as one padded model input.
+
+        Every waveform is normalized on its own, exactly as in the
+        single-request path, and the batch is then right-padded with the
+        feature extractor's padding value.
+
+        Parameters
+        ----------
+        waveforms : Sequence[torch.Tensor]
+            The audio waveforms, already resampled to 16kHz and downmixed.
+
+        Returns
+        -------
+        BatchFeature
+            The padded `input_values` together with an `attention_mask`
+            marking the real samples of each item.
+        """
+        return self._pad([self._process_inputs(waveform, 16000).input_values[0] for waveform in waveforms])
+
+    def _pad(self, input_values: Sequence[torch.Tensor]) -> BatchFeature:
+        """Right-pads processed 1D inputs into one batch.
+
+        Parameters
+        ----------
+        input_values : Sequence[torch.Tensor]
+            The processed inputs of each batch item.
+
+        Returns
+        -------
+        BatchFeature
+            The padded `input_values` together with an `attention_mask`
+            marking the real samples of each item.
+        """
+        lengths = torch.tensor([len(values) for values in input_values])
+        padded = torch.nn.utils.rnn.pad_sequence(
+            input_values,
+            batch_first=True,
+            padding_value=self._processor.feature_extractor.padding_value,
+        )
+        attention_mask = (torch.arange(padded.shape[1]) < lengths[:, None]).long()
+        return BatchFeature({"input_values": padded, "attention_mask": attention_mask})
+
     def _infer(self, inputs):
         """Performs inference using the model.
 
+        A single input longer than the configured chunk length is run window
+        by window, see `_infer_chunked`.
+
         Parameters
         ----------
         inputs : dict
@@ -258,11 +492,85 @@ class TranscriptionModel:
         torch.Tensor
             The logits produced by the model.
         """
+        batch_size, n_samples = inputs.input_values.shape
+        if self._chunk_samples is not None and batch_size == 1 and n_samples > self._chunk_samples:
+            return self._infer_chunked(inputs.input_values[0])
+        return self._forward(inputs)
+
+    def _infer_chunked(self, input_values: torch.Tensor) -> torch.Tensor:
+        """Performs inference on overlapping windows and stitches the logits.
+
+        The window starts are multiples of the model's frame size, so the
+        frames of every window line up with the frames of the whole input.
+        Only one batch of windows is in flight at a time, and the kept frames
+        are copied straight into the output, so the peak memory does not grow
+        with the length of the audio beyond the logits themselves. The last
+        window, shorter than the others, runs on its own, as padding it
+        would change its logits.
+
+        Parameters
+        ----------
+        input_values : torch.Tensor
+            The processed 1D input of a single waveform.
+
+        Returns
+        -------
+        torch.Tensor
+            The logits of the whole input, of shape (1, TIMESTEPS, TOKEN_SET_SIZE),
+            with the same frame count and timing as an unchunked pass.
+        """
+        samples_per_frame = math.prod(self._model.config.conv_stride)
+        stride = self._chunk_samples - self._chunk_overlap_samples
+        stride = max(stride - stride % samples_per_frame, samples_per_frame)
+
+        n_samples = len(input_values)
+        n_frames = int(feature_lengths(self._model.config, torch.tensor(n_samples)))
+        starts = chunk_starts(n_samples, self._chunk_samples, stride)
+        boundaries = frame_boundaries(starts, self._chunk_samples, n_frames, samples_per_frame)
+
+        n_full = sum(start + self._chunk_samples <= n_samples for start in starts)
+        batches = [
+            range(first, min(first + self._chunk_batch_size, n_full))
+            for first in range(0, n_full, self._chunk_batch_size)
+        ]
+        if n_full < len(starts):
+            batches.append(range(n_full, len(starts)))
+
+        logits = None
+        for batch in batches:
+            inputs = self._pad([input_values[starts[k] : starts[k] + self._chunk_samples] for k in batch])
+            chunk_logits = self._forward(inputs)
+            if logits is None:
+                logits = chunk_logits.new_empty((1, n_frames, chunk_logits.shape[-1]))
+
+            for i, k in enumerate(batch):
+                begin, end = boundaries[k], boundaries[k + 1]
+                offset = starts[k] // samples_per_frame
+                logits[0, begin:end] = chunk_logits[i, begin - offset : end - offset]
+
+        return logits
+
+    def _forward(self, inputs) -> torch.Tensor:
+        """Runs the model once on a processed input.
+
+        Parameters
+        ----------
+        inputs : dict
+            The processed input tensor, optionally with an attention mask.
+
+        Returns
+        -------
+        torch.Tensor
+            The logits produced by the model.
+        """
+        attention_mask = None
+        if self._processor.feature_extractor.return_attention_mask:
+            attention_mask = inputs.get("attention_mask")
         with torch.no_grad():
-            logits = self._model(inputs.input_values).logits
+            logits = self._model(inputs.input_values.to(self._input_dtype), attention_mask=attention_mask).logits
         return logits
 
-    def _decode(self, logits) -> dict:
+    def _decode(self, logits) -> TranscriptionResult:
         """Decodes the model's logits into a transcription.
 
         Parameters
@@ -272,12 +580,12 @@ class TranscriptionModel:
 
         Returns
         -------
-        dict
+        TranscriptionResult
             The decoded transcription.
         """
         return self._decoder(logits)[0]
 
-    def transcribe_from_waveform(self, waveform: torch.Tensor, sample_rate: int) -> dict:
+    def transcribe_from_waveform(self, waveform: torch.Tensor, sample_rate: int) -> TranscriptionResult:
         """Transcribes the given audio waveform.
 
         Parameters
@@ -289,21 +597,233 @@ class TranscriptionModel:
 
         Returns
         -------
-        dict
+        TranscriptionResult
             The transcription of the audio.
         """
-        if sample_rate != 16000:
-            waveform = torchaudio.functional.resample(waveform, orig_freq=sample_rate, new_freq=16000)
-            sample_rate = 16000
+        waveform = self._prepare_waveform(waveform, sample_rate)
+        waveform, timeline = self._trim(waveform)
+        inputs = self._process_inputs(waveform, 16000)
+        logits = self._infer(inputs)
+        return self._restore_timeline(self._decode(logits), timeline)
+
+    def transcribe_batch(self, waveforms: Sequence[torch.Tensor], sample_rates: Sequence[int]) -> list[TranscriptionResult]:
+        """Transcribes several audio waveforms with a single forward pass.
 
-        if waveform.shape[0] > 1:
-            waveform = torch.mean(waveform, dim=0)
+        The waveforms are padded to a common length and masked, and the
+        logits of each item are cut back to its own number of frames before
+        decoding, so every transcription matches what
+        `transcribe_from_waveform` returns for the same audio.
 
-        inputs = self._process_inputs(waveform, sample_rate)
+        Parameters
+        ----------
+        waveforms : Sequence[torch.Tensor]
+            The audio waveforms to be transcribed.
+        sample_rates : Sequence[int]
+            The sample rate of each waveform.
+
+        Returns
+        -------
+        list[TranscriptionResult]
+            One transcription per waveform, in the input order.
+        """
+        if len(waveforms) != len(sample_rates):
+            raise ValueError(f"Got {len(waveforms)} waveforms but {len(sample_rates)} sample rates")
+        if len(waveforms) == 0:
+            return []
+
+        waveforms, timelines = zip(*(self._trim(waveform) for waveform in self._prepare_waveforms(waveforms, sample_rates)))
+        results = [None] * len(waveforms)
+
+        # audio longer than a chunk is windowed anyway, so it goes on its own
+        batched = []
+        for i, waveform in enumerate(waveforms):
+            if self._chunk_samples is not None and len(waveform) > self._chunk_samples:
+                results[i] = self._decode(self._infer(self._process_inputs(waveform, 16000)))
+            else:
+                batched.append(i)
+
+        if batched:
+            inputs = self._process_batch_inputs([waveforms[i] for i in batched])
+            logits = self._infer(inputs)
+            frame_lengths = feature_lengths(self._model.config, inputs.attention_mask.sum(dim=-1))
+            for j, (i, length) in enumerate(zip(batched, frame_lengths.tolist())):
+                results[i] = self._decode(logits[j : j + 1, :length])
+
+        return [self._restore_timeline(result, timeline) for result, timeline in zip(results, timelines)]
+
+    def _trim(self, waveform: torch.Tensor) -> tuple[torch.Tensor, Optional[SpeechTimeline]]:
+        """Cuts the non-speech regions of a 16kHz waveform, if a trimmer is set.
+
+        Returns
+        -------
+        tuple[torch.Tensor, Optional[SpeechTimeline]]
+            The waveform to transcribe and the timeline of its regions in the
+            original waveform, None when nothing was trimmed.
+        """
+        if self._trimmer is None:
+            return waveform, None
+        return self._trimmer.trim(waveform, 16000)
+
+    @staticmethod
+    def _restore_timeline(result: TranscriptionResult, timeline: Optional[SpeechTimeline]) -> TranscriptionResult:
+        """Shifts the timestamps of a trimmed waveform's transcription back to the original waveform."""
+        if timeline is not None:
+            if result.start_timestamps is not None:
+                result.start_timestamps = timeline.to_original_ms(result.start_timestamps)
+            if result.end_timestamps is not None:
+                result.end_timestamps = timeline.to_original_ms(result.end_timestamps, is_end=True)
+        return result
+
+    def align_from_waveform(self, waveform: torch.Tensor, sample_rate: int, reference: str) -> dict:
+        """Aligns the given audio waveform with its expected phonemes.
+
+        Parameters
+        ----------
+        waveform : torch.Tensor
+            The audio waveform to be aligned.
+        sample_rate : int
+            The sample rate of the waveform.
+        reference : str
+            The expected phonetic transcription, with words separated by
+            whitespace.
+
+        Returns
+        -------
+        dict
+            The alignment of the reference, as returned by
+            `ForcedAligner.align`.
+        """
+        return self._aligner.align(self._log_probs_from_waveform(waveform, sample_rate), [reference])[0]
+
+    def score_from_waveform(self, waveform: torch.Tensor, sample_rate: int, reference: str) -> dict:
+        """Scores the pronunciation of each expected phoneme of a waveform.
+
+        Parameters
+        ----------
+        waveform : torch.Tensor
+            The audio waveform to be scored.
+        sample_rate : int
+            The sample rate of the waveform.
+        reference : str
+            The expected phonetic transcription, with words separated by
+            whitespace.
+
+        Returns
+        -------
+        dict
+            The Goodness of Pronunciation of each phoneme of the reference,
+            as returned by `GOPScorer.score`.
+        """
+        return self._scorer.score(self._log_probs_from_waveform(waveform, sample_rate), [reference])[0]
+
+    def posteriorgram_from_waveform(
+        self, waveform: torch.Tensor, sample_rate: int, encoding: str = "float16", top_k: int = 5
+    ) -> bytes:
+        """Encodes the frame-level phoneme log-posteriors of a waveform.
+
+        The frames cover the whole audio, trimming aside, so their times
+        are `ms_per_timestep` apart from the start of the original audio.
+
+        Parameters
+        ----------
+        waveform : torch.Tensor
+            The audio waveform.
+        sample_rate : int
+            The sample rate of the waveform.
+        encoding : str, optional
+            The encoding of the payload, see `posteriorgram.ENCODINGS`
+            (default is "float16").
+        top_k : int, optional
+            The number of tokens kept per frame by the "topk" encoding
+            (default is 5).
+
+        Returns
+        -------
+        bytes
+            The payload, with the vocabulary of the token set and the frame
+            duration of the decoder in its header, see
+            `posteriorgram.encode_posteriorgram`.
+        """
+        log_probs = self._log_probs_from_waveform(waveform, sample_rate)[0]
+        return encode_posteriorgram(
+            log_probs.numpy(),
+            list(self._token_set.tokens),
+            self._decoder.ms_per_timestep,
+            encoding=encoding,
+            top_k=top_k,
+        )
+
+    def open_stream(self, **options) -> StreamingSession:
+        """Starts the incremental transcription of audio being recorded.
+
+        Parameters
+        ----------
+        **options
+            The window options of the session, see `StreamingSession`.
+
+        Returns
+        -------
+        StreamingSession
+            The session, fed with 16kHz mono samples.
+        """
+        return StreamingSession(
+            lambda waveform: self._forward(self._process_inputs(waveform, 16000)),
+            self._decoder,
+            samples_per_frame=math.prod(self._model.config.conv_stride),
+            **options,
+        )
+
+    def _log_probs_from_waveform(self, waveform: torch.Tensor, sample_rate: int) -> torch.Tensor:
+        """Runs the model on a waveform and normalizes its logits.
+
+        Returns
+        -------
+        torch.Tensor
+            The log-probabilities of shape (1, TIMESTEPS, TOKEN_SET_SIZE).
+        """
+        waveform = self._prepare_waveform(waveform, sample_rate)
+        inputs = self._process_inputs(waveform, 16000)
         logits = self._infer(inputs)
-        return self._decode(logits)
+        return torch.log_softmax(logits.float(), dim=-1)
 
-    def transcribe_from_file(self, path_to_audio: str) -> dict:
+    def _prepare_waveform(self, waveform: torch.Tensor, sample_rate: int) -> torch.Tensor:
+        """Downmixes a waveform to mono and resamples it to 16kHz.
+
+        Parameters
+        ----------
+        waveform : torch.Tensor
+            The audio waveform.
+        sample_rate : int
+            The sample rate of the waveform.
+
+        Returns
+        -------
+        torch.Tensor
+            The 16kHz mono waveform.
+        """
+        return self._prepare_waveforms([waveform], [sample_rate])[0]
+
+    def _prepare_waveforms(self, waveforms: Sequence[torch.Tensor], sample_rates: Sequence[int]) -> list[torch.Tensor]:
+        """Downmixes waveforms to mono and resamples them to 16kHz together.
+
+        The downmix comes first, so only one channel is resampled.
+
+        Parameters
+        ----------
+        waveforms : Sequence[torch.Tensor]
+            The audio waveforms.
+        sample_rates : Sequence[int]
+            The sample rate of each waveform.
+
+        Returns
+        -------
+        list[torch.Tensor]
+            The 16kHz mono waveforms, of shape (SAMPLES,).
+        """
+        mono = [waveform.mean(dim=0) if waveform.dim() > 1 else waveform for waveform in waveforms]
+        return resample_batch(mono, sample_rates, 16000, self._resampling_quality)
+
+    def transcribe_from_file(self, path_to_audio: str) -> TranscriptionResult:
         """Loads an audio file and transcribes its content.
 
         Parameters
@@ -313,15 +833,17 @@ class TranscriptionModel:
 
         Returns
         -------
-        dict
-            The transcription of the audio as a dictionary
-            containing the transcription, start timestamps,
-            end timestamps and probabilities.
-            Keys: "transcription",
-                  "start_timestamps",
-                  "end_timestamps",
-                  "probabilities"
+        TranscriptionResult
+            The transcription of the audio, with the start
+            timestamps, end timestamps and probabilities of
+            every token. Its `to_dict` method gives the keys
+            "transcription", "start_timestamps",
+            "end_timestamps" and "probabilities".
         """
         # torchaudio.set_audio_backend("soundfile")
         waveform, sample_rate = torchaudio.load(path_to_audio)
         return self.transcribe_from_waveform(waveform, sample_rate)
+
+    def close(self):
+        """Releases the resources held by the decoder, such as worker pools."""
+        self._decoder.close()
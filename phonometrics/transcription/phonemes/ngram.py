@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import math
+
+from collections import Counter
+from typing import Iterable
+from typing import Sequence
+
+import numpy as np
+
+from phonometrics.transcription.phonemes.tokens import TokenSet
+
+
+class PhonemeNgramLM:
+    """A token-level n-gram language model stored in flat NumPy arrays.
+
+    The n-grams are sequences of token ids of a `TokenSet`, so the model
+    scores phonemes and word boundaries (the silence token) directly. Every
+    k-gram of order k >= 2 is encoded as a single int64 key, the digits of
+    its token ids in base `vocabulary_size + 1` (the extra symbol marks the
+    start of a sequence), and the keys of each order are kept sorted next
+    to their log-probabilities. Looking up all the continuations of a
+    context is therefore two binary searches, and the model is saved as a
+    handful of arrays in a single `.npz` file.
+
+    Unseen n-grams are scored with stupid backoff: the score of the longest
+    known suffix of the context, plus `log(backoff_weight)` per dropped
+    context token. The scores are natural logarithms.
+
+    Attributes
+    ----------
+    tokens : list[str]
+        The tokens of the token set the model was trained for.
+    order : int
+        The length of the longest n-grams.
+    backoff_weight : float
+        The stupid backoff penalty factor.
+    """
+
+    def __init__(
+        self,
+        tokens: Sequence[str],
+        unigram_scores: np.ndarray,
+        keys: Sequence[np.ndarray],
+        scores: Sequence[np.ndarray],
+        backoff_weight: float = 0.4,
+    ):
+        """
+        Parameters
+        ----------
+        tokens : Sequence[str]
+            The tokens of the token set, in id order.
+        unigram_scores : np.ndarray
+            The log-probability of every token, of shape (VOCABULARY_SIZE,).
+        keys : Sequence[np.ndarray]
+            For every order from 2 up, the sorted keys of the known n-grams.
+        scores : Sequence[np.ndarray]
+            The conditional log-probabilities matching `keys`.
+        backoff_weight : float, optional
+            The stupid backoff penalty factor (default is 0.4).
+        """
+        if len(keys) != len(scores):
+            raise ValueError("Every order needs both its keys and its scores")
+        self.tokens = list(tokens)
+        self.order = len(keys) + 1
+        self.backoff_weight = backoff_weight
+        self._base = len(self.tokens) + 1
+        self._bos = len(self.tokens)
+        if self._base**self.order >= 2**63:
+            raise ValueError(
+                f"A {self.order}-gram over {len(self.tokens)} tokens does not "
+                "fit in an int64 key"
+            )
+        self._unigram_scores = np.asarray(unigram_scores, dtype=np.float32)
+        self._keys = [np.asarray(x, dtype=np.int64) for x in keys]
+        self._scores = [np.asarray(x, dtype=np.float32) for x in scores]
+        self._log_backoff = math.log(backoff_weight)
+        self._cache: dict[tuple[int, ...], np.ndarray] = {}
+
+    @classmethod
+    def train(
+        cls,
+        sequences: Iterable[Sequence[int]],
+        tokens: Sequence[str],
+        order: int = 3,
+        backoff_weight: float = 0.4,
+    ) -> PhonemeNgramLM:
+        """Counts the n-grams of token id sequences.
+
+        Parameters
+        ----------
+        sequences : Iterable[Sequence[int]]
+            The training sequences, e.g. tokenized phonetic transcriptions.
+        tokens : Sequence[str]
+            The tokens of the token set, in id order.
+        order : int, optional
+            The length of the longest n-grams (default is 3).
+        backoff_weight : float, optional
+            The stupid backoff penalty factor (default is 0.4).
+
+        Returns
+        -------
+        PhonemeNgramLM
+            The trained model.
+        """
+        if order < 1:
+            raise ValueError("The order must be at least 1")
+        vocabulary_size = len(tokens)
+        bos = vocabulary_size
+        counts: list[Counter] = [Counter() for _ in range(order + 1)]
+        for sequence in sequences:
+            padded = [bos] * (order - 1) + list(sequence)
+            for k in range(1, order + 1):
+                for end in range(order - 1, len(padded)):
+                    counts[k][tuple(padded[end - k + 1 : end + 1])] += 1
+
+        # add-one smoothing keeps every token scorable
+        unigram_counts = np.ones(vocabulary_size)
+        for (token_id,), count in counts[1].items():
+            unigram_counts[token_id] += count
+        unigram_scores = np.log(unigram_counts / unigram_counts.sum())
+
+        base = vocabulary_size + 1
+        keys, scores = [], []
+        for k in range(2, order + 1):
+            context_counts: Counter = Counter()
+            for ngram, count in counts[k].items():
+                context_counts[ngram[:-1]] += count
+            ngrams = sorted(counts[k], key=lambda ngram: _encode(ngram, base))
+            keys.append(
+                np.array([_encode(x, base) for x in ngrams], dtype=np.int64)
+            )
+            scores.append(
+                np.array(
+                    [
+                        math.log(counts[k][x] / context_counts[x[:-1]])
+                        for x in ngrams
+                    ],
+                    dtype=np.float32,
+                )
+            )
+        return cls(tokens, unigram_scores, keys, scores, backoff_weight)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: Iterable[str],
+        token_set: TokenSet,
+        order: int = 3,
+        backoff_weight: float = 0.4,
+    ) -> PhonemeNgramLM:
+        """Trains a model on phonetic transcriptions.
+
+        Parameters
+        ----------
+        texts : Iterable[str]
+            The transcriptions, with words separated by whitespace.
+        token_set : TokenSet
+            The token set of the model whose output will be scored.
+        order : int, optional
+            The length of the longest n-grams (default is 3).
+        backoff_weight : float, optional
+            The stupid backoff penalty factor (default is 0.4).
+
+        Returns
+        -------
+        PhonemeNgramLM
+            The trained model.
+        """
+        sequences = (
+            [token_set.id_by_token[x] for x in token_set.tokenize(text)]
+            for text in texts
+        )
+        return cls.train(sequences, token_set.tokens, order, backoff_weight)
+
+    def save(self, path: str):
+        """Saves the model arrays to a `.npz` file.
+
+        Parameters
+        ----------
+        path : str
+            Where to save the model.
+        """
+        arrays = {
+            "tokens": np.array(self.tokens),
+            "backoff_weight": np.array(self.backoff_weight),
+            "unigram_scores": self._unigram_scores,
+        }
+        for k, (keys, scores) in enumerate(zip(self._keys, self._scores), 2):
+            arrays[f"keys_{k}"] = keys
+            arrays[f"scores_{k}"] = scores
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> PhonemeNgramLM:
+        """Loads a model saved with `save`.
+
+        Parameters
+        ----------
+        path : str
+            The `.npz` file of the model.
+
+        Returns
+        -------
+        PhonemeNgramLM
+            The loaded model.
+        """
+        with np.load(path) as arrays:
+            order = 1
+            while f"keys_{order + 1}" in arrays:
+                order += 1
+            return cls(
+                arrays["tokens"].tolist(),
+                arrays["unigram_scores"],
+                [arrays[f"keys_{k}"] for k in range(2, order + 1)],
+                [arrays[f"scores_{k}"] for k in range(2, order + 1)],
+                float(arrays["backoff_weight"]),
+            )
+
+    def check_token_set(self, token_set: TokenSet):
+        """Raises a ValueError if the model was trained for other tokens.
+
+        Parameters
+        ----------
+        token_set : TokenSet
+            The token set of the model whose output will be scored.
+        """
+        if self.tokens != list(token_set.tokens):
+            raise ValueError(
+                "The language model was trained for a different token set"
+            )
+
+    def next_token_scores(self, history: Sequence[int]) -> np.ndarray:
+        """Scores every token as the continuation of a history.
+
+        Parameters
+        ----------
+        history : Sequence[int]
+            The token ids seen so far. Only the last `order - 1` are used.
+
+        Returns
+        -------
+        np.ndarray
+            The log-probability of every token id, of shape
+            (VOCABULARY_SIZE,). The array is cached and must not be
+            modified.
+        """
+        context = tuple(history[max(len(history) - self.order + 1, 0) :])
+        context = (self._bos,) * (self.order - 1 - len(context)) + context
+        scores = self._cache.get(context)
+        if scores is not None:
+            return scores
+
+        # backed off all the way to the unigrams, unless a longer n-gram
+        # is known; the longer orders are visited last so they win
+        scores = self._unigram_scores + (self.order - 1) * self._log_backoff
+        for k in range(2, self.order + 1):
+            prefix = _encode(context[len(context) - k + 1 :], self._base)
+            lo, hi = np.searchsorted(
+                self._keys[k - 2],
+                [prefix * self._base, (prefix + 1) * self._base],
+            )
+            if lo < hi:
+                token_ids = self._keys[k - 2][lo:hi] - prefix * self._base
+                scores[token_ids] = (
+                    self._scores[k - 2][lo:hi]
+                    + (self.order - k) * self._log_backoff
+                )
+
+        if len(self._cache) >= 100_000:
+            self._cache.clear()
+        self._cache[context] = scores
+        return scores
+
+
+def _encode(ngram: Sequence[int], base: int) -> int:
+    """Packs a sequence of symbols into a single integer key."""
+    key = 0
+    for symbol in ngram:
+        key = key * base + int(symbol)
+    return key
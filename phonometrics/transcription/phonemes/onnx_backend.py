@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+
+from typing import Optional
+
+import torch
+
+from transformers import AutoModelForCTC
+from transformers import PretrainedConfig
+from transformers.modeling_outputs import CausalLMOutput
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "phonometrics", "onnx"
+)
+
+
+def export_to_onnx(
+    model: AutoModelForCTC, path: str, with_attention_mask: bool
+):
+    """Exports a CTC model to an ONNX graph with dynamic batch and time axes.
+
+    The graph is written to a temporary file next to `path` first and moved
+    into place once complete, so a crashed export never leaves a truncated
+    graph behind.
+
+    Parameters
+    ----------
+    model : AutoModelForCTC
+        The CTC model to export.
+    path : str
+        Where to write the graph.
+    with_attention_mask : bool
+        Whether the graph takes an `attention_mask` input next to
+        `input_values`.
+    """
+    input_values = torch.zeros(1, 16000)
+    args: tuple = (input_values,)
+    input_names = ["input_values"]
+    dynamic_axes = {
+        "input_values": {0: "batch", 1: "samples"},
+        "logits": {0: "batch", 1: "frames"},
+    }
+    if with_attention_mask:
+        args = (input_values, torch.ones(1, 16000, dtype=torch.long))
+        input_names.append("attention_mask")
+        dynamic_axes["attention_mask"] = {0: "batch", 1: "samples"}
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix=".onnx", dir=directory)
+    os.close(fd)
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                model.eval(),
+                args,
+                tmp_path,
+                input_names=input_names,
+                output_names=["logits"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+            )
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def graph_fingerprint(
+    model: AutoModelForCTC, with_attention_mask: bool
+) -> str:
+    """Identifies the exported graph of a model.
+
+    The fingerprint covers the model configuration (including its name), its
+    weights, the graph inputs and the torch version used for the export, so
+    a changed model, e.g. a fine-tuned checkpoint with the same
+    configuration, never picks up a stale cached graph.
+
+    Parameters
+    ----------
+    model : AutoModelForCTC
+        The CTC model.
+    with_attention_mask : bool
+        Whether the graph takes an `attention_mask` input.
+
+    Returns
+    -------
+    str
+        A short hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    digest.update(model.config.to_json_string().encode())
+    for name, tensor in model.state_dict().items():
+        tensor = tensor.detach().cpu().contiguous().reshape(-1)
+        digest.update(f"{name}:{tensor.dtype}:{tensor.numel()}".encode())
+        digest.update(tensor.view(torch.uint8).numpy().tobytes())
+    digest.update(str(with_attention_mask).encode())
+    digest.update(torch.__version__.encode())
+    return digest.hexdigest()[:16]
+
+
+class OnnxCTCModel:
+    """Serves a CTC model through ONNX Runtime's CPU execution provider.
+
+    It is called like the original model, `model(input_values,
+    attention_mask=...)`, and returns an output with a `logits` tensor, so
+    it can stand in for the PyTorch model inside `TranscriptionModel`.
+
+    Attributes
+    ----------
+    config : PretrainedConfig
+        The configuration of the exported model.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        config: PretrainedConfig,
+        num_threads: Optional[int] = None,
+    ):
+        """
+        Parameters
+        ----------
+        path : str
+            Path to the exported ONNX graph.
+        config : PretrainedConfig
+            The configuration of the exported model.
+        num_threads : Optional[int], optional
+            The number of intra-op threads of the session (default is None,
+            which lets ONNX Runtime decide).
+        """
+        onnxruntime = _import_onnxruntime()
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = (
+            onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+
+        self.config = config
+        self._session = onnxruntime.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {x.name for x in self._session.get_inputs()}
+
+    @classmethod
+    def from_model(
+        cls,
+        model: AutoModelForCTC,
+        with_attention_mask: bool,
+        cache_dir: Optional[str] = None,
+        num_threads: Optional[int] = None,
+    ) -> OnnxCTCModel:
+        """Loads the cached ONNX graph of a model, exporting it if needed.
+
+        Parameters
+        ----------
+        model : AutoModelForCTC
+            The CTC model to serve.
+        with_attention_mask : bool
+            Whether the graph takes an `attention_mask` input.
+        cache_dir : Optional[str], optional
+            The folder holding the exported graphs (default is
+            `DEFAULT_CACHE_DIR`).
+        num_threads : Optional[int], optional
+            The number of intra-op threads of the session.
+
+        Returns
+        -------
+        OnnxCTCModel
+            The model served by ONNX Runtime.
+        """
+        # fail before the export rather than after it
+        _import_onnxruntime()
+        cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        fingerprint = graph_fingerprint(model, with_attention_mask)
+        path = os.path.join(cache_dir, f"{fingerprint}.onnx")
+        if not os.path.exists(path):
+            logger.info(f"Exporting the model to ONNX at {path}")
+            export_to_onnx(model, path, with_attention_mask)
+        else:
+            logger.info(f"Loading the cached ONNX model from {path}")
+        return cls(path, model.config, num_threads=num_threads)
+
+    def __call__(
+        self,
+        input_values: torch.Tensor,
+        attention_mask: Optional[torch.Tensor] = None,
+    ) -> CausalLMOutput:
+        """Runs the graph on a batch of processed inputs.
+
+        Parameters
+        ----------
+        input_values : torch.Tensor
+            The processed inputs of shape (BATCH_SIZE, SAMPLES).
+        attention_mask : Optional[torch.Tensor], optional
+            The mask of the real samples. If the graph expects a mask and none
+            is given, all samples are considered real.
+
+        Returns
+        -------
+        CausalLMOutput
+            The output holding the `logits` tensor.
+        """
+        feeds = {"input_values": input_values.float().numpy()}
+        if "attention_mask" in self._input_names:
+            if attention_mask is None:
+                attention_mask = torch.ones_like(
+                    input_values, dtype=torch.long
+                )
+            feeds["attention_mask"] = attention_mask.long().numpy()
+        (logits,) = self._session.run(["logits"], feeds)
+        return CausalLMOutput(logits=torch.from_numpy(logits))
+
+
+def _import_onnxruntime():
+    """Imports ONNX Runtime, an optional dependency of the ONNX backend."""
+    try:
+        import onnxruntime  # type: ignore
+    except ImportError:
+        raise ImportError(
+            "The ONNX backend requires onnxruntime, install it with the onnx "
+            "extra: `poetry install --extras onnx` or `pip install onnxruntime`"
+        ) from None
+    return onnxruntime
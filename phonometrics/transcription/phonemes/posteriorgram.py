@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import json
+
+import numpy as np
+
+
+ENCODINGS = ("float16", "topk", "uint8")
+FORMAT_VERSION = 1
+# the length of the JSON header, written before it
+_HEADER_LENGTH_BYTES = 4
+
+
+def encode_posteriorgram(
+    log_probs: np.ndarray,
+    tokens: list[str],
+    ms_per_timestep: int,
+    encoding: str = "float16",
+    top_k: int = 5,
+    log_prob_floor: float = -16.0,
+) -> bytes:
+    """Packs the frame-level log-posteriors of an audio into a payload.
+
+    The payload is the length of a JSON header as 4 little-endian bytes, the
+    UTF-8 header, then the binary body described by the header:
+
+    - "float16": the dense (FRAMES, TOKENS) log-posteriors as float16.
+    - "topk": the (FRAMES, TOP_K) token ids of the most likely tokens of
+      every frame as uint16, then their (FRAMES, TOP_K) log-posteriors as
+      float16, most likely first.
+    - "uint8": the dense (FRAMES, TOKENS) log-posteriors clipped to
+      [`log_prob_floor`, 0] and quantized linearly to uint8, 0 being the
+      floor and 255 a log-posterior of 0.
+
+    Parameters
+    ----------
+    log_probs : np.ndarray
+        The log-posteriors of shape (FRAMES, TOKENS).
+    tokens : list[str]
+        The vocabulary, one token per column of `log_probs`.
+    ms_per_timestep : int
+        The duration of a frame in milliseconds.
+    encoding : str, optional
+        The encoding of the body, one of `ENCODINGS` (default is "float16").
+    top_k : int, optional
+        The number of tokens kept per frame by the "topk" encoding
+        (default is 5).
+    log_prob_floor : float, optional
+        The lowest log-posterior of the "uint8" encoding (default is -16.0).
+
+    Returns
+    -------
+    bytes
+        The payload, see `decode_posteriorgram`.
+    """
+    log_probs = np.asarray(log_probs, dtype=np.float32)
+    if log_probs.ndim != 2 or log_probs.shape[1] != len(tokens):
+        raise ValueError(
+            f"Expected log-posteriors of shape (FRAMES, {len(tokens)}), "
+            f"got {log_probs.shape}"
+        )
+    header = {
+        "version": FORMAT_VERSION,
+        "encoding": encoding,
+        "frames": log_probs.shape[0],
+        "tokens": tokens,
+        "ms_per_timestep": ms_per_timestep,
+    }
+
+    if encoding == "float16":
+        body = log_probs.astype("<f2").tobytes()
+    elif encoding == "topk":
+        if not 0 < top_k <= len(tokens):
+            raise ValueError(
+                f"top_k must be between 1 and {len(tokens)}, got {top_k}"
+            )
+        ids = np.argpartition(-log_probs, top_k - 1, axis=1)[:, :top_k]
+        values = np.take_along_axis(log_probs, ids, axis=1)
+        order = np.argsort(-values, axis=1, kind="stable")
+        ids = np.take_along_axis(ids, order, axis=1)
+        values = np.take_along_axis(values, order, axis=1)
+        header["top_k"] = top_k
+        body = ids.astype("<u2").tobytes() + values.astype("<f2").tobytes()
+    elif encoding == "uint8":
+        if log_prob_floor >= 0:
+            raise ValueError("log_prob_floor must be negative")
+        scaled = 1 - np.clip(log_probs, log_prob_floor, 0) / log_prob_floor
+        header["log_prob_floor"] = log_prob_floor
+        body = np.rint(scaled * 255).astype(np.uint8).tobytes()
+    else:
+        raise ValueError(
+            f"Unknown encoding {encoding!r}, expected one of {ENCODINGS}"
+        )
+
+    encoded_header = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    return (
+        len(encoded_header).to_bytes(_HEADER_LENGTH_BYTES, "little")
+        + encoded_header
+        + body
+    )
+
+
+def decode_posteriorgram(payload: bytes) -> tuple[dict, np.ndarray]:
+    """Unpacks a payload built by `encode_posteriorgram`.
+
+    Parameters
+    ----------
+    payload : bytes
+        The payload.
+
+    Returns
+    -------
+    tuple[dict, np.ndarray]
+        The header, and the dense float32 log-posteriors of shape
+        (FRAMES, TOKENS). The tokens left out by the "topk" encoding get a
+        log-posterior of -inf.
+    """
+    header_length = int.from_bytes(payload[:_HEADER_LENGTH_BYTES], "little")
+    body_start = _HEADER_LENGTH_BYTES + header_length
+    header = json.loads(payload[_HEADER_LENGTH_BYTES:body_start])
+    body = memoryview(payload)[body_start:]
+    shape = (header["frames"], len(header["tokens"]))
+
+    encoding = header["encoding"]
+    if encoding == "float16":
+        log_probs = np.frombuffer(body, dtype="<f2").reshape(shape)
+    elif encoding == "topk":
+        k_shape = (header["frames"], header["top_k"])
+        n_ids = k_shape[0] * k_shape[1]
+        ids = np.frombuffer(body, dtype="<u2", count=n_ids).reshape(k_shape)
+        values = np.frombuffer(body, dtype="<f2", offset=2 * n_ids)
+        log_probs = np.full(shape, -np.inf, dtype=np.float32)
+        np.put_along_axis(
+            log_probs, ids.astype(np.int64), values.reshape(k_shape), axis=1
+        )
+    elif encoding == "uint8":
+        quantized = np.frombuffer(body, dtype=np.uint8).reshape(shape)
+        log_probs = header["log_prob_floor"] * (1 - quantized / 255)
+    else:
+        raise ValueError(f"Unknown encoding {encoding!r}")
+    return header, log_probs.astype(np.float32)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import logging
+
+import torch
+
+from transformers import AutoModelForCTC
+
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("fp32", "int8", "bf16", "fp16")
+# the precisions casting the weights and activations to a 16-bit float type
+REDUCED_DTYPES = {"bf16": torch.bfloat16, "fp16": torch.float16}
+
+
+def supports_precision(precision: str) -> bool:
+    """Tells whether the CPU runs a precision natively.
+
+    The 16-bit float precisions need the matching instructions (e.g.
+    AVX512-BF16 or AMX for "bf16"), without which PyTorch emulates them and
+    runs slower than in fp32.
+
+    Parameters
+    ----------
+    precision : str
+        One of `PRECISIONS`.
+
+    Returns
+    -------
+    bool
+        Whether the precision can be used.
+    """
+    if precision not in REDUCED_DTYPES:
+        return True
+    is_supported = {
+        "bf16": "_is_mkldnn_bf16_supported",
+        "fp16": "_is_mkldnn_fp16_supported",
+    }[precision]
+    try:
+        return bool(getattr(torch.ops.mkldnn, is_supported)())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def resolve_precision(precision: str) -> str:
+    """Falls back to fp32 if the CPU does not support a precision.
+
+    Parameters
+    ----------
+    precision : str
+        One of `PRECISIONS`.
+
+    Returns
+    -------
+    str
+        The precision to use.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(
+            f"Unknown precision {precision!r}, expected one of {PRECISIONS}"
+        )
+    if not supports_precision(precision):
+        logger.warning(
+            f"The CPU does not support the {precision} precision, "
+            "falling back to fp32"
+        )
+        return "fp32"
+    return precision
+
+
+def cast_to_half_precision(
+    model: AutoModelForCTC, dtype: torch.dtype
+) -> AutoModelForCTC:
+    """Casts a model to a 16-bit float type, all but its CTC head.
+
+    The activations follow the weights, so the inputs have to be cast to
+    `dtype` as well. The CTC head casts its inputs back to fp32 and keeps
+    its fp32 weights, so the logits, and the probabilities derived from
+    them, keep the precision of an fp32 run of the head.
+
+    Attention: This function modifies the model in place.
+
+    Parameters
+    ----------
+    model : AutoModelForCTC
+        The CTC model to cast.
+    dtype : torch.dtype
+        The 16-bit float type, e.g. `torch.bfloat16`.
+
+    Returns
+    -------
+    AutoModelForCTC
+        The cast model.
+    """
+    model.to(dtype)
+    head = getattr(model, "lm_head", None)
+    if head is not None:
+        head.float()
+        head.register_forward_pre_hook(
+            lambda module, args: tuple(arg.float() for arg in args)
+        )
+    return model
+
+
+def quantize_dynamic_int8(model: AutoModelForCTC) -> AutoModelForCTC:
+    """Applies dynamic INT8 quantization to the transformer linear layers.
+
+    The weights of every `torch.nn.Linear` of the encoder are stored as
+    INT8 and the activations are quantized on the fly, per batch. The
+    convolutional feature extractor and the CTC head stay in fp32, so the
+    logits keep their scale.
+
+    Attention: This function modifies the model in place.
+
+    Parameters
+    ----------
+    model : AutoModelForCTC
+        The CTC model to quantize.
+
+    Returns
+    -------
+    AutoModelForCTC
+        The quantized model.
+    """
+    torch.ao.quantization.quantize_dynamic(
+        model.base_model.encoder,
+        {torch.nn.Linear},
+        dtype=torch.qint8,
+        inplace=True,
+    )
+    return model
+
+
+def apply_precision(model: AutoModelForCTC, precision: str) -> AutoModelForCTC:
+    """Converts a model to the requested inference precision.
+
+    Parameters
+    ----------
+    model : AutoModelForCTC
+        The CTC model to convert, in fp32.
+    precision : str
+        One of `PRECISIONS`: "fp32" leaves the model untouched, "int8"
+        applies `quantize_dynamic_int8`, "bf16" and "fp16" apply
+        `cast_to_half_precision`. A 16-bit float precision that the CPU does
+        not support falls back to fp32, see `resolve_precision`.
+
+    Returns
+    -------
+    AutoModelForCTC
+        The converted model.
+    """
+    precision = resolve_precision(precision)
+    if precision == "int8":
+        logger.info("Quantizing the encoder linear layers to INT8")
+        model = quantize_dynamic_int8(model)
+    elif precision in REDUCED_DTYPES:
+        logger.info(f"Casting the model to {precision}")
+        model = cast_to_half_precision(model, REDUCED_DTYPES[precision])
+    return model
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from typing import Optional
+from typing import Sequence
+
+import numpy as np
+
+
+class TranscriptionResult:
+    """The transcription of a clip, one array entry per reported token.
+
+    The timestamps and probabilities are NumPy arrays with one entry per
+    token of the transcription (int32 milliseconds, float32 probabilities)
+    and the token ids are int16, so a result takes a few bytes per token
+    instead of a Python object per value. `to_dict` converts it to the JSON
+    contract of the API, and indexing it like that dictionary
+    (`result["transcription"]`) keeps older callers working.
+
+    Attributes
+    ----------
+    transcription : str
+        The transcribed text, words separated by spaces.
+    token_ids : Optional[np.ndarray]
+        The token id of every reported token, if known.
+    start_timestamps : Optional[np.ndarray]
+        The start of every token in milliseconds, if known.
+    end_timestamps : Optional[np.ndarray]
+        The end of every token in milliseconds, if known.
+    probabilities : Optional[np.ndarray]
+        The mean probability of every token over its frames, if known.
+    """
+
+    __slots__ = (
+        "transcription",
+        "token_ids",
+        "start_timestamps",
+        "end_timestamps",
+        "probabilities",
+    )
+
+    _KEYS = (
+        "transcription",
+        "start_timestamps",
+        "end_timestamps",
+        "probabilities",
+    )
+
+    def __init__(
+        self,
+        transcription: str,
+        token_ids: Optional[Sequence[int]] = None,
+        start_timestamps: Optional[Sequence[int]] = None,
+        end_timestamps: Optional[Sequence[int]] = None,
+        probabilities: Optional[Sequence[float]] = None,
+    ):
+        """
+        Parameters
+        ----------
+        transcription : str
+            The transcribed text, words separated by spaces.
+        token_ids : Optional[Sequence[int]], optional
+            The token id of every reported token (default is None).
+        start_timestamps : Optional[Sequence[int]], optional
+            The start of every token in milliseconds (default is None).
+        end_timestamps : Optional[Sequence[int]], optional
+            The end of every token in milliseconds (default is None).
+        probabilities : Optional[Sequence[float]], optional
+            The probability of every token (default is None).
+        """
+        self.transcription = transcription
+        self.token_ids = _as_array(token_ids, np.int16)
+        self.start_timestamps = _as_array(start_timestamps, np.int32)
+        self.end_timestamps = _as_array(end_timestamps, np.int32)
+        self.probabilities = _as_array(probabilities, np.float32)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> TranscriptionResult:
+        """Builds a result from its dictionary form, e.g. an API response.
+
+        Parameters
+        ----------
+        data : dict
+            The dictionary, as returned by `to_dict`.
+
+        Returns
+        -------
+        TranscriptionResult
+            The result.
+        """
+        return cls(
+            data.get("transcription", ""),
+            start_timestamps=data.get("start_timestamps"),
+            end_timestamps=data.get("end_timestamps"),
+            probabilities=data.get("probabilities"),
+        )
+
+    def to_dict(self) -> dict:
+        """Converts the result to the dictionary returned by the API.
+
+        Returns
+        -------
+        dict
+            The transcription with keys "transcription",
+            "start_timestamps", "end_timestamps" and "probabilities", the
+            missing or empty arrays being None.
+        """
+        return {key: self[key] for key in self._KEYS}
+
+    def __getitem__(self, key: str):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if isinstance(value, np.ndarray):
+            return value.tolist() if len(value) > 0 else None
+        return value
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, TranscriptionResult):
+            other = other.to_dict()
+        if not isinstance(other, dict):
+            return NotImplemented
+        return self.to_dict() == other
+
+    def __repr__(self) -> str:
+        return f"TranscriptionResult({self.transcription!r})"
+
+
+def _as_array(values: Optional[Sequence], dtype) -> Optional[np.ndarray]:
+    """Converts a sequence to an array of the given dtype, keeping None."""
+    if values is None:
+        return None
+    return np.asarray(values, dtype=dtype)
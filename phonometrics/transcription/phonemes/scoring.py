@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from typing import Optional
+from typing import Sequence
+from typing import Union
+
+import numpy as np
+import torch
+
+from phonometrics.transcription.phonemes.alignment import ForcedAligner
+from phonometrics.transcription.phonemes.alignment import segment_means
+
+
+class GOPScorer:
+    """Scores the pronunciation of every phoneme of a reference (GOP).
+
+    The reference is force-aligned with the clip first. The Goodness of
+    Pronunciation of a phoneme is then the log-posterior of the expected
+    phoneme minus the log-posterior of its best competitor, averaged over
+    the aligned frames. The competitors are the phonemes of the token set,
+    without the blank, the word boundary and the other special tokens. A
+    positive score means the expected phoneme was the most likely one, a
+    negative score that another phoneme was heard instead.
+
+    The best and second best competitors of every frame are found once for
+    the whole batch, and the scores of all the phonemes of a clip come from
+    prefix sums, so scoring costs little more than the alignment.
+
+    Attributes
+    ----------
+    aligner : ForcedAligner
+        The aligner finding the frames of each phoneme.
+    """
+
+    def __init__(self, aligner: ForcedAligner):
+        """
+        Parameters
+        ----------
+        aligner : ForcedAligner
+            The aligner finding the frames of each phoneme.
+        """
+        self.aligner = aligner
+        self._special_ids = aligner.token_set.compiled.special_ids
+
+    def score(
+        self,
+        log_probs: Union[torch.Tensor, np.ndarray],
+        references: Sequence[Union[str, Sequence[int]]],
+        lengths: Optional[Sequence[int]] = None,
+    ) -> list[dict]:
+        """Scores a batch of clips against their reference.
+
+        Parameters
+        ----------
+        log_probs : Union[torch.Tensor, np.ndarray]
+            The log-probabilities of the model, of shape
+            (BATCH_SIZE, TIMESTEPS, TOKEN_SET_SIZE).
+        references : Sequence[Union[str, Sequence[int]]]
+            The reference of every clip, as a phonetic transcription or as
+            token ids.
+        lengths : Optional[Sequence[int]], optional
+            The number of real frames of every clip (default is None, all
+            the frames are real).
+
+        Returns
+        -------
+        list[dict]
+            The scores of every clip with keys:
+            "phonemes": the reference phonemes,
+            "start_timestamps" and "end_timestamps": the time span of each
+            phoneme in milliseconds,
+            "scores": the GOP score of each phoneme,
+            "score": the mean GOP score of the clip.
+        """
+        if isinstance(log_probs, torch.Tensor):
+            log_probs = log_probs.detach().float().cpu().numpy()
+
+        # the two best competitors of every frame
+        competitors = log_probs.copy()
+        competitors[..., self._special_ids] = -np.inf
+        best_ids = np.argmax(competitors, axis=-1)
+        best = np.take_along_axis(competitors, best_ids[..., None], axis=-1)
+        np.put_along_axis(competitors, best_ids[..., None], -np.inf, axis=-1)
+        second_best = competitors.max(axis=-1, keepdims=True)
+
+        results = []
+        for i, segments in enumerate(
+            self.aligner.align_frames(log_probs, references, lengths)
+        ):
+            ids, columns = np.unique(segments["ids"], return_inverse=True)
+            # the expected phoneme competes with the best other phoneme
+            frame_scores = log_probs[i][:, ids] - np.where(
+                best_ids[i][:, None] == ids[None, :],
+                second_best[i],
+                best[i],
+            )
+            scores = segment_means(
+                frame_scores,
+                columns,
+                segments["start_frames"],
+                segments["end_frames"],
+            )
+            results.append(
+                {
+                    **self.aligner.timestamps(segments),
+                    "scores": scores.tolist(),
+                    "score": float(scores.mean()) if len(scores) else None,
+                }
+            )
+        return results
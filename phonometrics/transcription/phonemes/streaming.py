@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+from typing import Callable
+
+import numpy as np
+import torch
+
+from phonometrics.transcription.phonemes.decoder import Decoder
+from phonometrics.transcription.phonemes.result import TranscriptionResult
+
+
+SAMPLE_RATE = 16000
+
+
+class StreamingSession:
+    """Transcribes audio incrementally while it is being recorded.
+
+    The model runs on a sliding window made of `left_context_s` of audio
+    already transcribed, `step_s` of new audio and `right_context_s` of
+    lookahead. Only the frames of the new audio are kept, so every kept frame
+    saw context on both sides, and every step costs one forward pass over at
+    most `left_context_s + step_s + right_context_s` seconds, however long
+    the stream.
+
+    The kept frames pile up until a blank frame, where CTC tokens cannot
+    span, and the tokens before it are then finalized. The frames after it,
+    and the lookahead frames of the last window, are decoded again at every
+    step as the partial transcription. With the greedy decoder, the finalized
+    tokens are the ones an offline pass over the same frames finds.
+
+    Attributes
+    ----------
+    ms_per_timestep : int
+        The duration of a frame in milliseconds.
+    transcription : str
+        The finalized transcription so far, words separated by spaces.
+    """
+
+    def __init__(
+        self,
+        infer: Callable[[torch.Tensor], torch.Tensor],
+        decoder: Decoder,
+        samples_per_frame: int = 320,
+        left_context_s: float = 2.0,
+        step_s: float = 0.5,
+        right_context_s: float = 0.5,
+        max_pending_s: float = 5.0,
+    ):
+        """
+        Parameters
+        ----------
+        infer : Callable[[torch.Tensor], torch.Tensor]
+            Runs the model on a 16kHz mono waveform and returns its logits of
+            shape (1, TIMESTEPS, TOKEN_SET_SIZE).
+        decoder : Decoder
+            The decoder of the logits.
+        samples_per_frame : int, optional
+            How many samples one logit frame covers (default is 320).
+        left_context_s : float, optional
+            The audio already transcribed run again as left context, in
+            seconds (default is 2.0).
+        step_s : float, optional
+            The new audio transcribed by every forward pass, in seconds
+            (default is 0.5).
+        right_context_s : float, optional
+            The lookahead a frame needs before it is kept, in seconds. It
+            delays the finalized tokens by as much (default is 0.5).
+        max_pending_s : float, optional
+            The longest run of kept frames without a blank frame, in
+            seconds, after which its tokens are finalized anyway
+            (default is 5.0).
+        """
+        self._infer = infer
+        self._decoder = decoder
+        self._blank_id = decoder.token_set.compiled.blank_token_id
+        self.ms_per_timestep = decoder.ms_per_timestep
+        self._samples_per_frame = samples_per_frame
+
+        def frames(seconds):
+            return max(int(seconds * SAMPLE_RATE) // samples_per_frame, 1)
+
+        self._left_samples = frames(left_context_s) * samples_per_frame
+        self._step_frames = frames(step_s)
+        self._right_samples = frames(right_context_s) * samples_per_frame
+        self._max_pending_frames = frames(max_pending_s)
+
+        # the audio from `_audio_start` on, as far back as the left context
+        self._audio = np.zeros(0, dtype=np.float32)
+        self._audio_start = 0
+        # the frames before `_kept_frames` have been computed with lookahead
+        self._kept_frames = 0
+        # the kept frames not finalized yet, from `_pending_start` on
+        self._pending = None
+        self._pending_start = 0
+        self._trailing_silences = 0
+        self.transcription = ""
+
+    def push(self, samples: np.ndarray) -> list[dict]:
+        """Adds audio to the stream and transcribes what it completes.
+
+        Parameters
+        ----------
+        samples : np.ndarray
+            The next 16kHz mono samples.
+
+        Returns
+        -------
+        list[dict]
+            The messages of the new transcriptions, see `_final_message` and
+            `_partial_message`. A partial message follows every forward
+            pass, and replaces the previous one.
+        """
+        self._audio = np.concatenate(
+            (self._audio, np.asarray(samples, dtype=np.float32))
+        )
+        n_samples = self._audio_start + len(self._audio)
+
+        messages = []
+        lookahead = None
+        step_samples = self._step_frames * self._samples_per_frame
+        while (
+            self._kept_frames * self._samples_per_frame
+            + step_samples
+            + self._right_samples
+            <= n_samples
+        ):
+            kept_end = self._kept_frames + self._step_frames
+            logits = self._window_logits(
+                kept_end * self._samples_per_frame + self._right_samples
+            )
+            lookahead = logits[kept_end - self._kept_frames :]
+            messages.extend(self._keep(logits[: kept_end - self._kept_frames]))
+        if lookahead is not None:
+            messages.append(self._partial_message(lookahead))
+        return messages
+
+    def finish(self) -> list[dict]:
+        """Transcribes the rest of the stream, without lookahead.
+
+        Returns
+        -------
+        list[dict]
+            The last messages, the final one holding the whole
+            "transcription".
+        """
+        n_samples = self._audio_start + len(self._audio)
+        messages = []
+        # the model needs more than a frame of audio to produce one
+        if n_samples >= (self._kept_frames + 2) * self._samples_per_frame:
+            logits = self._window_logits(n_samples)
+            messages.extend(self._keep(logits))
+        if self._pending is not None:
+            messages.extend(self._finalize(len(self._pending)))
+        messages.append({"type": "end", "transcription": self.transcription})
+        return messages
+
+    def _window_logits(self, end: int) -> torch.Tensor:
+        """Runs the model on the window of the next frames to keep.
+
+        The window starts `left_context_s` before the first frame to keep,
+        on a frame boundary, and ends at sample `end`.
+
+        Returns
+        -------
+        torch.Tensor
+            The logits of the frames from `_kept_frames` on, of shape
+            (TIMESTEPS, TOKEN_SET_SIZE).
+        """
+        kept_start = self._kept_frames * self._samples_per_frame
+        start = max(kept_start - self._left_samples, 0)
+        waveform = self._audio[
+            start - self._audio_start : end - self._audio_start
+        ]
+        logits = self._infer(torch.from_numpy(waveform))[0]
+
+        # the audio before the next window is not needed anymore
+        self._audio = self._audio[start - self._audio_start :]
+        self._audio_start = start
+        return logits[(kept_start - start) // self._samples_per_frame :]
+
+    def _keep(self, logits: torch.Tensor) -> list[dict]:
+        """Adds frames computed with their lookahead, finalizing what it can.
+
+        Returns
+        -------
+        list[dict]
+            The final message of the finalized tokens, if any.
+        """
+        self._kept_frames += len(logits)
+        self._pending = (
+            logits
+            if self._pending is None
+            else torch.cat((self._pending, logits))
+        )
+
+        ids = self._pending.argmax(dim=-1).numpy()
+        blanks = np.flatnonzero(ids[1:] == self._blank_id) + 1
+        if len(blanks) > 0:
+            return self._finalize(int(blanks[-1]))
+        if len(self._pending) >= self._max_pending_frames:
+            return self._finalize(len(self._pending))
+        return []
+
+    def _finalize(self, n_frames: int) -> list[dict]:
+        """Finalizes the tokens of the first pending frames.
+
+        Returns
+        -------
+        list[dict]
+            The final message of the tokens, if there are any.
+        """
+        frames = self._pending[:n_frames]
+        self._pending = self._pending[n_frames:]
+        if len(self._pending) == 0:
+            self._pending = None
+        start = self._pending_start
+        self._pending_start += n_frames
+
+        result = self._decode(frames, start)
+        leading, trailing = self._edge_silences(frames)
+        if len(result.transcription) == 0:
+            self._trailing_silences += leading
+            return []
+
+        # the decoder strips the silences at the ends of the frames
+        if self.transcription:
+            self.transcription += " " * (self._trailing_silences + leading)
+        self.transcription += result.transcription
+        self._trailing_silences = trailing
+        return [self._final_message(result)]
+
+    def _edge_silences(self, logits: torch.Tensor) -> tuple[int, int]:
+        """Counts the silences reported before and after the other tokens.
+
+        Returns
+        -------
+        tuple[int, int]
+            The number of leading and trailing silences of the greedy path,
+            both the total number of silences if there is no other token.
+        """
+        ids = logits.argmax(dim=-1).numpy()
+        ids = ids[np.concatenate(([True], ids[1:] != ids[:-1]))]
+        compiled = self._decoder.token_set.compiled
+        ids = ids[compiled.reported(ids, self._decoder.skip_special_tokens)]
+        is_silence = ids == compiled.silence_token_id
+        if is_silence.all():
+            return len(ids), len(ids)
+        return int(np.argmin(is_silence)), int(np.argmin(is_silence[::-1]))
+
+    def _decode(self, logits: torch.Tensor, first_frame: int):
+        """Decodes frames starting at a given frame of the stream."""
+        result = self._decoder(logits[None])[0]
+        offset = first_frame * self.ms_per_timestep
+        for timestamps in (result.start_timestamps, result.end_timestamps):
+            if timestamps is not None:
+                timestamps += offset
+        return result
+
+    def _final_message(self, result: TranscriptionResult) -> dict:
+        """The message of newly finalized tokens.
+
+        Its keys are "type" ("final"), the keys of
+        `TranscriptionResult.to_dict` for the new tokens only, with
+        timestamps from the start of the stream, and "text", the whole
+        finalized transcription so far.
+        """
+        return {
+            "type": "final",
+            **result.to_dict(),
+            "text": self.transcription,
+        }
+
+    def _partial_message(self, lookahead: torch.Tensor) -> dict:
+        """The message of the tokens after the finalized ones.
+
+        It has the keys of `_final_message`, with "type" "partial". Its
+        tokens can still change, and the next partial message replaces it.
+        """
+        frames = (
+            lookahead
+            if self._pending is None
+            else torch.cat((self._pending, lookahead))
+        )
+        result = self._decode(frames, self._pending_start)
+        return {
+            "type": "partial",
+            **result.to_dict(),
+            "text": self.transcription,
+        }
@@ -6,8 +6,11 @@ import logging
 import os
 import tempfile
 
+from typing import Iterable
 from typing import Optional
 
+import numpy as np
+
 from transformers import AutoConfig
 from transformers import AutoFeatureExtractor
 from transformers import AutoTokenizer
@@ -106,6 +109,20 @@ class TokenSet:
 
         self.id_by_token = {token: i for i, token in enumerate(self.tokens)}
         self.token_by_id = {i: token for i, token in enumerate(self.tokens)}
+        self._compiled = None
+        self._processors = {}
+
+    @property
+    def compiled(self) -> CompiledTokenSet:
+        """The precompiled lookup tables of the TokenSet, built once.
+
+        The tables are a snapshot of the tokens at the first access, the
+        TokenSet must not be modified afterwards.
+        """
+
+        if self._compiled is None:
+            self._compiled = CompiledTokenSet(self)
+        return self._compiled
 
     @property
     def blank_token_id(self):
@@ -147,9 +164,49 @@ class TokenSet:
     def size(self):
         return len(self.tokens)
 
+    def tokenize(self, text: str) -> list[str]:
+        """Splits a transcription into tokens of the TokenSet.
+
+        Tokens are matched greedily, longest first, so phonemes spanning
+        several characters (e.g. nasal vowels with a combining tilde) stay in
+        one piece. Whitespaces become the silence token and characters that
+        match no token become the unk token.
+        """
+
+        max_token_length = max(len(token) for token in self.tokens)
+        tokens = []
+        i = 0
+        while i < len(text):
+            if text[i].isspace():
+                tokens.append(self.silence_token)
+                i += 1
+                continue
+            for length in range(min(max_token_length, len(text) - i), 0, -1):
+                if text[i : i + length] in self.id_by_token:
+                    tokens.append(text[i : i + length])
+                    i += length
+                    break
+            else:
+                tokens.append(self.unk_token)
+                i += 1
+        return tokens
+
     def to_processor(
         self, model_name_or_path: str = "facebook/wav2vec2-large-xlsr-53"
     ):
+        """Builds the processor of a model for this TokenSet.
+
+        The processor of every model is built once and cached, later calls
+        return the same processor without reaching the hub again.
+        """
+
+        if model_name_or_path not in self._processors:
+            self._processors[model_name_or_path] = self._build_processor(
+                model_name_or_path
+            )
+        return self._processors[model_name_or_path]
+
+    def _build_processor(self, model_name_or_path: str):
 
         tokens_dict = {v: i for i, v in enumerate(self.tokens)}
 
@@ -218,8 +275,13 @@ class TokenSet:
 
     def save(self, path: str):
 
+        attributes = {
+            key: value
+            for key, value in self.__dict__.items()
+            if not key.startswith("_")
+        }
         with open(path, "w", encoding="utf-8") as f:
-            json.dump(self.__dict__, f, indent=2, ensure_ascii=False)
+            json.dump(attributes, f, indent=2, ensure_ascii=False)
 
     @classmethod
     def load(cls, path: str):
@@ -235,3 +297,108 @@ class TokenSet:
                 o["eos_token"],
                 o["letter_case"],
             )
+
+
+class CompiledTokenSet:
+    """
+    An immutable view of a TokenSet, with lookup tables indexed by token id.
+
+    The decoders map whole id vectors to text at once with it, instead of
+    looking every token up in the lists of the TokenSet.
+
+    Parameters
+    ----------
+    token_set : TokenSet
+        The TokenSet to compile.
+
+    Attributes
+    ----------
+    tokens : np.ndarray
+        The text of every token, by id.
+    texts : np.ndarray
+        The text of every token in a transcription, by id: the token itself,
+        or a whitespace for the silence token.
+    is_special : np.ndarray
+        Whether every token, by id, is a special token.
+    special_ids : np.ndarray
+        The ids of the special tokens, in ascending order.
+    blank_token_id : int
+        The id of the blank token.
+    silence_token_id : int
+        The id of the silence token.
+    unk_token_id : int
+        The id of the unk token.
+    """
+
+    __slots__ = (
+        "tokens",
+        "texts",
+        "is_special",
+        "special_ids",
+        "blank_token_id",
+        "silence_token_id",
+        "unk_token_id",
+        "_id_by_token",
+    )
+
+    def __init__(self, token_set: TokenSet):
+
+        special_tokens = set(token_set.special_tokens)
+        self.tokens = _read_only(np.array(token_set.tokens, dtype=object))
+        self.is_special = _read_only(
+            np.array([x in special_tokens for x in token_set.tokens])
+        )
+        self.special_ids = _read_only(np.flatnonzero(self.is_special))
+        self.blank_token_id = token_set.blank_token_id
+        self.silence_token_id = token_set.silence_token_id
+        self.unk_token_id = token_set.unk_token_id
+        texts = self.tokens.copy()
+        texts[self.silence_token_id] = " "
+        self.texts = _read_only(texts)
+        self._id_by_token = dict(token_set.id_by_token)
+
+    def __setattr__(self, name, value):
+
+        if hasattr(self, name):
+            raise AttributeError(f"{type(self).__name__} is immutable")
+        super().__setattr__(name, value)
+
+    def token_id(self, token: str) -> int:
+        """Returns the id of a token, or the unk token id if it is unknown."""
+
+        return self._id_by_token.get(token, self.unk_token_id)
+
+    def ids(self, tokens: Iterable[str]) -> np.ndarray:
+        """Returns the ids of tokens, unknown ones mapping to the unk id."""
+
+        get = self._id_by_token.get
+        return np.array(
+            [get(token, self.unk_token_id) for token in tokens],
+            dtype=np.int64,
+        )
+
+    def reported(
+        self, ids: np.ndarray, skip_special_tokens: bool = True
+    ) -> np.ndarray:
+        """Returns the mask of the ids that show up in a transcription.
+
+        The silence token always does, as a whitespace, and the other special
+        tokens only when they are not skipped.
+        """
+
+        ids = np.asarray(ids, dtype=np.int64)
+        if not skip_special_tokens:
+            return np.ones(len(ids), dtype=bool)
+        return ~self.is_special[ids] | (ids == self.silence_token_id)
+
+    def to_text(self, ids: np.ndarray) -> str:
+        """Joins the text of every id, the silence token being a whitespace."""
+
+        return "".join(self.texts[np.asarray(ids, dtype=np.int64)])
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    """Makes an array read-only and returns it."""
+
+    array.setflags(write=False)
+    return array
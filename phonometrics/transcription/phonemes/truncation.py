@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import hashlib
+
+from contextlib import contextmanager
+from typing import Optional
+from typing import Sequence
+
+import numpy as np
+import torch
+
+from transformers import AutoModelForCTC
+from transformers import AutoProcessor
+
+
+class EncoderAdapter(torch.nn.Module):
+    """Maps the hidden states of a truncated encoder onto the full one's.
+
+    The CTC head was trained on the output of the last encoder layer. An
+    encoder cut after `num_layers` layers feeds it states from a different
+    space, which this affine map brings back close to the full-depth states,
+    recovering part of the accuracy lost by the truncation.
+
+    Attributes
+    ----------
+    num_layers : int
+        The number of encoder layers the adapter was fitted for.
+    """
+
+    def __init__(
+        self, weight: torch.Tensor, bias: torch.Tensor, num_layers: int
+    ):
+        """
+        Parameters
+        ----------
+        weight : torch.Tensor
+            The weight of the map, of shape (HIDDEN_SIZE, HIDDEN_SIZE),
+            applied as `hidden_states @ weight`.
+        bias : torch.Tensor
+            The bias of the map, of shape (HIDDEN_SIZE,).
+        num_layers : int
+            The number of encoder layers the adapter was fitted for.
+        """
+        super().__init__()
+        self.weight = torch.nn.Parameter(weight, requires_grad=False)
+        self.bias = torch.nn.Parameter(bias, requires_grad=False)
+        self.num_layers = num_layers
+
+    def forward(self, hidden_states: torch.Tensor) -> torch.Tensor:
+        return torch.addmm(
+            self.bias, hidden_states.flatten(0, -2), self.weight
+        ).view(hidden_states.shape)
+
+    def fingerprint(self) -> str:
+        """Returns a short hexadecimal digest of the adapter weights."""
+        digest = hashlib.sha256()
+        for array in (self.weight, self.bias):
+            digest.update(array.detach().cpu().float().numpy().tobytes())
+        return digest.hexdigest()[:16]
+
+    def save(self, path: str):
+        """Saves the adapter to a `.npz` file.
+
+        Parameters
+        ----------
+        path : str
+            The file to write.
+        """
+        np.savez(
+            path,
+            weight=self.weight.detach().cpu().numpy(),
+            bias=self.bias.detach().cpu().numpy(),
+            num_layers=np.array(self.num_layers),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> EncoderAdapter:
+        """Loads an adapter saved with `save`.
+
+        Parameters
+        ----------
+        path : str
+            The `.npz` file of the adapter.
+
+        Returns
+        -------
+        EncoderAdapter
+            The adapter.
+        """
+        with np.load(path) as arrays:
+            return cls(
+                torch.from_numpy(arrays["weight"]),
+                torch.from_numpy(arrays["bias"]),
+                int(arrays["num_layers"]),
+            )
+
+    @classmethod
+    def fit(
+        cls,
+        model: AutoModelForCTC,
+        processor: AutoProcessor,
+        waveforms: Sequence[torch.Tensor],
+        num_layers: int,
+        regularization: float = 1e-3,
+    ) -> EncoderAdapter:
+        """Fits an adapter by least squares on calibration audio.
+
+        The model runs over every waveform at full depth and cut after
+        `num_layers` layers, and the adapter is the ridge regression of the
+        full-depth inputs of the CTC head on the truncated ones. The ridge
+        pulls the map towards the identity, so little calibration audio
+        gives a map close to no adapter at all.
+
+        Parameters
+        ----------
+        model : AutoModelForCTC
+            The full-depth CTC model, left unchanged.
+        processor : AutoProcessor
+            The processor of the model.
+        waveforms : Sequence[torch.Tensor]
+            The calibration waveforms, 16kHz and mono.
+        num_layers : int
+            The number of encoder layers to keep.
+        regularization : float, optional
+            The strength of the ridge, relative to the mean energy of the
+            truncated states (default is 1e-3).
+
+        Returns
+        -------
+        EncoderAdapter
+            The fitted adapter.
+        """
+        sources, targets = [], []
+        for waveform in waveforms:
+            input_values = processor(
+                waveform, sampling_rate=16000, return_tensors="pt"
+            ).input_values
+            targets.append(_head_inputs(model, input_values))
+            with _truncated(model, num_layers):
+                sources.append(_head_inputs(model, input_values))
+
+        x = torch.cat(sources).double()
+        y = torch.cat(targets).double()
+        x_mean, y_mean = x.mean(dim=0), y.mean(dim=0)
+        x, y = x - x_mean, y - y_mean
+
+        # argmin |xW - y|^2 + ridge |W - I|^2
+        hidden_size = x.shape[1]
+        ridge = regularization * (x * x).sum() / hidden_size
+        identity = torch.eye(hidden_size, dtype=x.dtype)
+        weight = torch.linalg.solve(
+            x.T @ x + ridge * identity, x.T @ y + ridge * identity
+        )
+        bias = y_mean - x_mean @ weight
+        return cls(weight.float(), bias.float(), num_layers)
+
+
+def truncate_encoder(
+    model: AutoModelForCTC,
+    num_layers: int,
+    adapter: Optional[EncoderAdapter] = None,
+) -> AutoModelForCTC:
+    """Keeps only the first layers of the transformer encoder of a model.
+
+    The states of the last kept layer go through the rest of the encoder
+    (its final layer norm, if any) and the CTC head, optionally through an
+    adapter first. The configuration records the truncation, so the cached
+    ONNX graphs of different depths never mix.
+
+    Attention: This function modifies the model in place.
+
+    Parameters
+    ----------
+    model : AutoModelForCTC
+        The CTC model to truncate.
+    num_layers : int
+        The number of encoder layers to keep.
+    adapter : Optional[EncoderAdapter], optional
+        The adapter inserted before the CTC head, fitted for `num_layers`
+        layers (default is None).
+
+    Returns
+    -------
+    AutoModelForCTC
+        The truncated model.
+    """
+    layers = model.base_model.encoder.layers
+    if not 0 < num_layers <= len(layers):
+        raise ValueError(
+            f"num_layers must be between 1 and {len(layers)}, "
+            f"got {num_layers}"
+        )
+    if adapter is not None and adapter.num_layers != num_layers:
+        raise ValueError(
+            f"The adapter was fitted for {adapter.num_layers} layers, "
+            f"not {num_layers}"
+        )
+    model.base_model.encoder.layers = layers[:num_layers]
+    model.config.num_hidden_layers = num_layers
+    if adapter is not None:
+        model.lm_head = torch.nn.Sequential(adapter, model.lm_head)
+        model.config.encoder_adapter = adapter.fingerprint()
+    return model
+
+
+@contextmanager
+def _truncated(model: AutoModelForCTC, num_layers: int):
+    """Runs a model cut after its first encoder layers for a while."""
+    encoder = model.base_model.encoder
+    layers = encoder.layers
+    encoder.layers = layers[:num_layers]
+    try:
+        yield
+    finally:
+        encoder.layers = layers
+
+
+def _head_inputs(
+    model: AutoModelForCTC, input_values: torch.Tensor
+) -> torch.Tensor:
+    """Returns the states fed to the CTC head, of shape (FRAMES, HIDDEN)."""
+    captured = []
+    hook = model.lm_head.register_forward_pre_hook(
+        lambda module, args: captured.append(args[0])
+    )
+    try:
+        with torch.no_grad():
+            model(input_values)
+    finally:
+        hook.remove()
+    return captured[0][0].float()
@@ -1,12 +1,51 @@
 from typing import Dict
+from typing import Optional
 
 import torch
-import torchaudio  # type: ignore
 import whisper  # type: ignore
 
+from phonometrics.audio_processing.resampling import resample
+from phonometrics.audio_processing.vad import SpeechTrimmer
+from phonometrics.transcription.phonemes.precision import REDUCED_DTYPES
+from phonometrics.transcription.phonemes.precision import resolve_precision
 from phonometrics.transcription.words.model import WordsTranscriptionModel
 
 
+WHISPER_PRECISIONS = ("fp32", "bf16", "fp16")
+
+
+def cast_whisper_to_half_precision(model: whisper.Whisper, dtype: torch.dtype):
+    """
+    Casts a Whisper model to a 16-bit float type for CPU inference.
+
+    The layer norms stay in fp32, as Whisper computes them in fp32 anyway.
+    The encoder returns fp32 features, which Whisper's decoding checks, and
+    the decoder casts them back to `dtype`, so its activations follow the
+    weights instead of casting every weight to fp32. The logits are cast to
+    fp32 by Whisper itself. The model has to run under
+    `torch.autocast("cpu", dtype=dtype)`.
+
+    Attention: This function modifies the model in place.
+
+    Parameters
+    ----------
+    model : whisper.Whisper
+        The Whisper model to cast.
+    dtype : torch.dtype
+        The 16-bit float type, e.g. `torch.bfloat16`.
+    """
+    model.to(dtype)
+    for module in model.modules():
+        if isinstance(module, torch.nn.LayerNorm):
+            module.float()
+    model.encoder.register_forward_hook(
+        lambda module, args, output: output.float()
+    )
+    model.decoder.register_forward_pre_hook(
+        lambda module, args: (args[0], args[1].to(dtype), *args[2:])
+    )
+
+
 class LocalWhisperModel(WordsTranscriptionModel):
     """
     Local Whisper model implementation for transcribing audio files.
@@ -15,6 +54,11 @@ class LocalWhisperModel(WordsTranscriptionModel):
     ----------
     model : whisper.Model
         Pre-trained Whisper model for transcription.
+    trimmer : Optional[SpeechTrimmer]
+        The trimmer cutting the non-speech regions of waveforms before
+        transcription.
+    resampling_quality : str
+        The quality of the resampling of waveforms to 16kHz.
 
     Methods
     -------
@@ -22,7 +66,13 @@ class LocalWhisperModel(WordsTranscriptionModel):
         Transcribes an audio file using the locally loaded Whisper model.
     """
 
-    def __init__(self, model_size: str = "base"):
+    def __init__(
+        self,
+        model_size: str = "base",
+        trimmer: Optional[SpeechTrimmer] = None,
+        precision: Optional[str] = None,
+        resampling_quality: str = "high",
+    ):
         """
         Initializes the LocalWhisperModel with a specified model size.
 
@@ -30,14 +80,43 @@ class LocalWhisperModel(WordsTranscriptionModel):
         ----------
         model_size : str, optional
             Size of the Whisper model to load (default is "base").
+        trimmer : Optional[SpeechTrimmer], optional
+            If given, the non-speech regions of waveforms are cut before
+            transcription (default is None).
+        precision : Optional[str], optional
+            The inference precision, one of `WHISPER_PRECISIONS`. On CPU,
+            "bf16" and "fp16" cast the weights and activations with
+            `cast_whisper_to_half_precision`, halving the weight memory, and
+            fall back to fp32 on CPUs without native support. On GPU, both
+            run Whisper's own fp16 inference (default is None, Whisper's
+            default: fp16 on GPU and fp32 on CPU).
+        resampling_quality : str, optional
+            The quality of the resampling of waveforms that are not at 16kHz,
+            see `resampling.QUALITIES` (default is "high").
 
         Notes
         -----
         If a GPU is available, the model will be loaded onto the CUDA device;
         otherwise, it defaults to CPU.
         """
+        if precision is not None and precision not in WHISPER_PRECISIONS:
+            raise ValueError(
+                f"Unknown precision {precision!r}, "
+                f"expected one of {WHISPER_PRECISIONS}"
+            )
         device = "cuda" if torch.cuda.is_available() else "cpu"
         self.model = whisper.load_model(model_size, device=device)
+        self.trimmer = trimmer
+        self.resampling_quality = resampling_quality
+        self._fp16 = device == "cuda" and precision != "fp32"
+        self._autocast_dtype = None
+        if device == "cpu" and precision is not None:
+            precision = resolve_precision(precision)
+            if precision in REDUCED_DTYPES:
+                self._autocast_dtype = REDUCED_DTYPES[precision]
+                cast_whisper_to_half_precision(
+                    self.model, self._autocast_dtype
+                )
 
     def transcribe_from_file(self, file_path: str) -> Dict[str, str]:
         """
@@ -59,7 +138,7 @@ class LocalWhisperModel(WordsTranscriptionModel):
         The audio waveform is loaded with `torchaudio`, converted to a
         NumPy array, and transcribed by the Whisper model.
         """
-        result = self.model.transcribe(file_path)
+        result = self._transcribe(file_path)
         transcription = result.get("text", "")
         return {"transcription": transcription}
 
@@ -81,18 +160,40 @@ class LocalWhisperModel(WordsTranscriptionModel):
         Dict[str, str]
             A dictionary containing the transcription text.
         """
-        # Resample the audio to Whisper's required sample rate if necessary
-        if sample_rate != 16000:
-            waveform = torchaudio.transforms.Resample(
-                orig_freq=sample_rate, new_freq=16000
-            )(waveform)
-
         # Convert to mono if it's stereo by averaging channels
         if waveform.shape[0] > 1:
             waveform = waveform.mean(dim=0)
 
+        # Resample the audio to Whisper's required sample rate if necessary
+        waveform = resample(
+            waveform, sample_rate, 16000, self.resampling_quality
+        )
+
         # Convert waveform to a numpy array with shape (samples,)
         audio_np = waveform.numpy().flatten()
-        result = self.model.transcribe(audio_np)
+
+        # Cut the leading, trailing and long inner silences
+        if self.trimmer is not None:
+            audio_np, _ = self.trimmer.trim(audio_np, 16000)
+        result = self._transcribe(audio_np)
         transcription = result.get("text", "")
         return {"transcription": transcription}
+
+    def _transcribe(self, audio) -> dict:
+        """
+        Runs Whisper in the configured precision.
+
+        Parameters
+        ----------
+        audio : Union[str, np.ndarray]
+            The path to an audio file, or its 16kHz mono samples.
+
+        Returns
+        -------
+        dict
+            The result of `whisper.Whisper.transcribe`.
+        """
+        if self._autocast_dtype is None:
+            return self.model.transcribe(audio, fp16=self._fp16)
+        with torch.autocast("cpu", dtype=self._autocast_dtype):
+            return self.model.transcribe(audio, fp16=False)
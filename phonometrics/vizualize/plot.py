@@ -2,12 +2,16 @@ from __future__ import annotations
 
 from typing import Any
 from typing import Dict
+from typing import Optional
+from typing import Union
 
 import matplotlib.cm as cm
 import matplotlib.pyplot as plt
 import numpy as np
 import parselmouth  # type: ignore
 
+from phonometrics.transcription.phonemes.result import TranscriptionResult
+
 
 class WaveformPlotBuilder:
     def __init__(self, title: str):
@@ -21,7 +25,7 @@ class WaveformPlotBuilder:
         self.y = None  # Audio waveform
         self.sr = None  # Sample rate
         self.pitch = None  # Pitch data
-        self.transcription_data = None
+        self.transcription_data: Optional[TranscriptionResult] = None
 
     def with_waveform(self, y: np.ndarray, sr: int) -> WaveformPlotBuilder:
         """Enable waveform plotting and store its parameters."""
@@ -37,11 +41,19 @@ class WaveformPlotBuilder:
         return self
 
     def with_transcription(
-        self, transcription_data: Dict[str, Any]
+        self, transcription_data: Union[TranscriptionResult, Dict[str, Any]]
     ) -> WaveformPlotBuilder:
-        """Enable transcription plotting and store transcription data."""
+        """Enable transcription plotting and store transcription data.
+
+        A dictionary, e.g. an API response, is converted to a
+        `TranscriptionResult` once, and the plot reads its arrays directly.
+        """
+        if isinstance(transcription_data, dict):
+            transcription_data = TranscriptionResult.from_dict(
+                transcription_data
+            )
         self.plot_transcription = True
-        self.transcription_data = transcription_data  # type: ignore
+        self.transcription_data = transcription_data
         return self
 
     def build(self) -> plt.Figure:
@@ -78,15 +90,16 @@ class WaveformPlotBuilder:
             )
 
         # Plot transcription if enabled
-        if self.plot_transcription and self.transcription_data:
-            transcription = self.transcription_data["transcription"]
-            start_times = (
-                np.array(self.transcription_data["start_timestamps"]) / 1000
-            )  # Convert to seconds
-            end_times = (
-                np.array(self.transcription_data["end_timestamps"]) / 1000
-            )  # Convert to seconds
-            probabilities = self.transcription_data["probabilities"]
+        if (
+            self.plot_transcription
+            and self.transcription_data is not None
+            and self.transcription_data.start_timestamps is not None
+        ):
+            transcription = self.transcription_data.transcription
+            # Convert to seconds
+            start_times = self.transcription_data.start_timestamps / 1000
+            end_times = self.transcription_data.end_timestamps / 1000
+            probabilities = self.transcription_data.probabilities
             y_position = (ax.get_ylim()[0] + ax.get_ylim()[1]) / 5
             # Add transcription rectangles and labels based on probability
             for char, start, end, prob in zip(
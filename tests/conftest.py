@@ -1,8 +1,16 @@
+import json
+
 from pathlib import Path
 
 import pytest
 import yaml
 
+from transformers import Wav2Vec2Config
+from transformers import Wav2Vec2CTCTokenizer
+from transformers import Wav2Vec2FeatureExtractor
+from transformers import Wav2Vec2ForCTC
+from transformers import Wav2Vec2Processor
+
 
 @pytest.fixture
 def sample_audio_data():
@@ -19,6 +27,29 @@ def sample_audio_data():
     }
 
 
+@pytest.fixture
+def tiny_ctc_model(tmp_path):
+    """A randomly initialized wav2vec2 CTC model and its processor."""
+    tokens = ["<pad>", "<s>", "</s>", "<unk>", "|", "a", "b", "ɑ̃"]
+    vocab_path = tmp_path / "vocab.json"
+    vocab_path.write_text(json.dumps({x: i for i, x in enumerate(tokens)}))
+    processor = Wav2Vec2Processor(
+        feature_extractor=Wav2Vec2FeatureExtractor(),
+        tokenizer=Wav2Vec2CTCTokenizer(str(vocab_path)),
+    )
+    config = Wav2Vec2Config(
+        vocab_size=len(tokens),
+        hidden_size=16,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=32,
+        conv_dim=(8,) * 7,
+        num_conv_pos_embeddings=16,
+        num_conv_pos_embedding_groups=2,
+    )
+    return Wav2Vec2ForCTC(config).eval(), processor
+
+
 @pytest.fixture
 def tests_directory():
     return Path(__file__).parent
@@ -46,3 +77,11 @@ def openai_word_transcription_service_url(tests_directory):
     with open(path_to_config, "r") as f:
         config = yaml.safe_load(f)
     return config["openai_word_transcription_service_url"]
+
+
+@pytest.fixture
+def combined_transcription_service_url(tests_directory):
+    path_to_config = tests_directory / "../config.yaml"
+    with open(path_to_config, "r") as f:
+        config = yaml.safe_load(f)
+    return config["combined_transcription_service_url"]
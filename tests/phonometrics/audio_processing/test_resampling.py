@@ -0,0 +1,63 @@
+import math
+
+import pytest
+import torch
+import torchaudio
+
+from phonometrics.audio_processing.resampling import StreamingResampler
+from phonometrics.audio_processing.resampling import resample
+from phonometrics.audio_processing.resampling import resample_batch
+
+
+@pytest.mark.parametrize("sample_rate", [8000, 22050, 44100, 48000])
+def test_batch_matches_torchaudio(sample_rate):
+    generator = torch.Generator().manual_seed(0)
+    lengths = [sample_rate, sample_rate // 3 + 7, 1234]
+    waveforms = [torch.randn(n, generator=generator) for n in lengths]
+
+    resampled = resample_batch(
+        waveforms + [torch.randn(2000)], [sample_rate] * 3 + [16000]
+    )
+
+    for waveform, actual in zip(waveforms, resampled):
+        expected = torchaudio.functional.resample(waveform, sample_rate, 16000)
+        assert actual.shape == expected.shape
+        torch.testing.assert_close(actual, expected)
+        torch.testing.assert_close(resample(waveform, sample_rate), expected)
+    assert len(resampled[3]) == 2000
+
+
+@pytest.mark.parametrize("sample_rate", [8000, 44100])
+def test_fast_quality_keeps_speech_frequencies(sample_rate):
+    duration = 0.5
+    times = torch.arange(int(sample_rate * duration)) / sample_rate
+    tone = torch.sin(2 * math.pi * 440 * times)[None]
+
+    actual = resample(tone, sample_rate, quality="fast")
+
+    expected = torch.sin(2 * math.pi * 440 * torch.arange(8000) / 16000)
+    assert actual.shape == (1, 8000)
+    # the edges of the fast filter are off by a fraction of a sample
+    assert (actual[0, 10:-10] - expected[10:-10]).abs().max() < 0.1
+
+
+@pytest.mark.parametrize("sample_rate", [8000, 16000, 44100, 48000])
+@pytest.mark.parametrize("chunk_size", [1, 1000, 4099])
+def test_stream_matches_whole_clip_resampling(sample_rate, chunk_size):
+    waveform = torch.randn(2 * sample_rate + 13)
+    resampler = StreamingResampler(sample_rate)
+
+    chunks = [
+        resampler.push(waveform[i : i + chunk_size])
+        for i in range(0, len(waveform), chunk_size)
+    ]
+    actual = torch.cat(chunks + [resampler.flush()])
+
+    expected = resample(waveform, sample_rate)
+    assert actual.shape == expected.shape
+    torch.testing.assert_close(actual, expected)
+
+
+def test_stream_rejects_invalid_sample_rates():
+    with pytest.raises(ValueError):
+        StreamingResampler(0)
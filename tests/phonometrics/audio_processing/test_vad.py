@@ -0,0 +1,67 @@
+import numpy as np
+import torch
+
+from phonometrics.audio_processing.vad import SpeechTimeline
+from phonometrics.audio_processing.vad import SpeechTrimmer
+
+
+SAMPLE_RATE = 16000
+
+
+def voiced(seconds):
+    """A harmonic signal, loud and with a peaky spectrum like a vowel."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return sum(
+        np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 6)
+    ).astype(np.float32)
+
+
+def silence(seconds, seed=0):
+    """Faint white noise."""
+    generator = np.random.default_rng(seed)
+    samples = int(seconds * SAMPLE_RATE)
+    return (generator.standard_normal(samples) * 1e-4).astype(np.float32)
+
+
+def test_trim_cuts_long_silences_only():
+    waveform = np.concatenate(
+        [silence(2), voiced(1), silence(0.2), voiced(1), silence(1), voiced(1)]
+    )
+    trimmer = SpeechTrimmer(min_silence_ms=400, padding_ms=100)
+
+    trimmed, timeline = trimmer.trim(waveform, SAMPLE_RATE)
+
+    # the 200 ms pause stays, the 1 s one is cut down to its padding
+    assert timeline.regions.tolist() == [[30400, 68800], [81600, 99200]]
+    assert len(trimmed) == 38400 + 17600
+    assert np.array_equal(trimmed[38400:], waveform[81600:])
+
+
+def test_trim_keeps_noise_only_audio_and_tensors():
+    waveform = torch.randn(SAMPLE_RATE)
+
+    trimmed, timeline = SpeechTrimmer().trim(waveform, SAMPLE_RATE)
+
+    assert isinstance(trimmed, torch.Tensor)
+    assert torch.equal(trimmed, waveform)
+    assert timeline.regions.tolist() == [[0, SAMPLE_RATE]]
+
+
+def test_timeline_maps_back_to_the_original_audio():
+    timeline = SpeechTimeline(
+        np.array([[16000, 32000], [48000, 64000]]), SAMPLE_RATE
+    )
+    starts = np.array([0, 500, 1000, 1500], dtype=np.int32)
+
+    assert timeline.to_original_ms(starts).tolist() == [
+        1000,
+        1500,
+        3000,
+        3500,
+    ]
+    assert timeline.to_original_ms(starts, is_end=True).tolist() == [
+        1000,
+        1500,
+        2000,
+        3500,
+    ]
@@ -0,0 +1,102 @@
+import threading
+import time
+
+from phonometrics.cache import ResultCache
+
+
+def test_memory_lru_evicts_by_size():
+    cache = ResultCache(max_memory_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"5678")
+    assert cache.get("a") == b"1234"  # "b" is now the least recently used
+
+    cache.put("c", b"90ab")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234"
+    assert cache.get("c") == b"90ab"
+    assert cache.stats() == {
+        "memory_hits": 3,
+        "disk_hits": 0,
+        "misses": 1,
+        "hit_rate": 0.75,
+        "entries": 2,
+        "memory_bytes": 8,
+    }
+
+
+def test_disk_store_survives_a_new_cache(tmp_path):
+    key = ResultCache.key(b"audio", "/transcribe/phonemes", "model")
+    ResultCache(directory=str(tmp_path)).put(key, b'{"transcription":"a"}')
+
+    cache = ResultCache(directory=str(tmp_path))
+    assert cache.get(key) == b'{"transcription":"a"}'
+    assert cache.get(key) == b'{"transcription":"a"}'
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_key_depends_on_every_part():
+    key = ResultCache.key(b"audio", "ab", "c")
+    assert key == ResultCache.key(b"audio", "ab", "c")
+    assert key != ResultCache.key(b"audio", "a", "bc")
+    assert key != ResultCache.key(b"other", "ab", "c")
+
+
+def test_disk_store_evicts_the_least_recently_used(tmp_path):
+    cache = ResultCache(
+        max_memory_bytes=0, directory=str(tmp_path), max_disk_bytes=10
+    )
+    cache.put("aa", b"1234")
+    time.sleep(0.01)
+    cache.put("bb", b"5678")
+    time.sleep(0.01)
+    assert cache.get("aa") == b"1234"  # "bb" is now the least recently used
+    time.sleep(0.01)
+
+    cache.put("cc", b"90ab")
+    assert cache.get("bb") is None
+    assert cache.get("aa") == b"1234"
+    assert cache.get("cc") == b"90ab"
+
+    # a new cache over the same folder starts from the files on disk
+    cache = ResultCache(directory=str(tmp_path), max_disk_bytes=10)
+    cache.put("dd", b"cdef")
+    assert sorted(p.name for p in tmp_path.glob("*/*.json")) == [
+        "cc.json",
+        "dd.json",
+    ]
+
+
+def test_prune_scan_runs_without_the_lock(tmp_path, monkeypatch):
+    cache = ResultCache(directory=str(tmp_path), max_disk_bytes=10)
+    cache.put("aa", b"1234")
+    cache.put("bb", b"5678")
+    scanning, resume = threading.Event(), threading.Event()
+    disk_files = cache._disk_files
+
+    def slow_disk_files():
+        scanning.set()
+        resume.wait(timeout=10)
+        return disk_files()
+
+    monkeypatch.setattr(cache, "_disk_files", slow_disk_files)
+    pruning = threading.Thread(target=cache.put, args=("cc", b"90ab"))
+    pruning.start()
+    assert scanning.wait(timeout=10)
+
+    # the cache keeps serving while the store is scanned
+    served = []
+    serving = threading.Thread(
+        target=lambda: served.append((cache.get("aa"), cache.put("dd", b"ef")))
+    )
+    serving.start()
+    serving.join(timeout=5)
+    resume.set()
+    assert served == [(b"1234", None)]
+    pruning.join(timeout=10)
+
+    assert not pruning.is_alive()
+    assert sorted(p.name for p in tmp_path.glob("*/*.json")) == [
+        "cc.json",
+        "dd.json",
+    ]
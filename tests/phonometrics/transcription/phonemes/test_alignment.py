@@ -0,0 +1,55 @@
+import pytest
+import torch
+import torchaudio
+
+from phonometrics.transcription.phonemes.alignment import ForcedAligner
+from phonometrics.transcription.phonemes.tokens import TokenSet
+
+
+TOKENS = ["<pad>", "<s>", "</s>", "<unk>", "|", "a", "b", "ɛ", "ɑ̃"]
+
+
+def test_alignment_timestamps():
+    aligner = ForcedAligner(TokenSet(TOKENS))
+    # a a _ | b b ɑ̃ _
+    frame_ids = [5, 5, 0, 4, 6, 6, 8, 0]
+    log_probs = torch.log_softmax(
+        torch.nn.functional.one_hot(torch.tensor([frame_ids]), len(TOKENS))
+        * 10.0,
+        dim=-1,
+    )
+
+    (alignment,) = aligner.align(log_probs, ["a bɑ̃"])
+    assert alignment["phonemes"] == ["a", "b", "ɑ̃"]
+    assert alignment["start_timestamps"] == [0, 80, 120]
+    assert alignment["end_timestamps"] == [40, 120, 140]
+    assert all(score > -0.01 for score in alignment["scores"])
+
+
+def test_batch_matches_torchaudio():
+    aligner = ForcedAligner(TokenSet(TOKENS))
+    generator = torch.Generator().manual_seed(0)
+    log_probs = torch.log_softmax(
+        torch.randn(3, 120, len(TOKENS), generator=generator) * 3, dim=-1
+    )
+    references = ["ab ɛ", "ɑ̃ɑ̃ b", "bb"]
+    lengths = [120, 90, 12]
+
+    alignments = aligner.align(log_probs, references, lengths)
+    for i, (reference, length) in enumerate(zip(references, lengths)):
+        targets = torch.tensor([aligner.tokenize(reference)])
+        _, scores = torchaudio.functional.forced_align(
+            log_probs[i, :length][None], targets, blank=0
+        )
+        assert alignments[i]["score"] == pytest.approx(
+            scores.sum().item() / length, abs=1e-4
+        )
+
+
+def test_reference_errors():
+    aligner = ForcedAligner(TokenSet(TOKENS))
+    log_probs = torch.zeros(1, 3, len(TOKENS))
+    with pytest.raises(ValueError):
+        aligner.align(log_probs, ["xyz"])
+    with pytest.raises(ValueError):
+        aligner.align(log_probs, ["aab"])
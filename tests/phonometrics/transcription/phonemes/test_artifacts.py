@@ -0,0 +1,33 @@
+import torch
+
+from phonometrics.transcription.phonemes.artifacts import artifact_dir
+from phonometrics.transcription.phonemes.artifacts import load_artifacts
+from phonometrics.transcription.phonemes.artifacts import save_artifacts
+
+
+def test_artifacts_round_trip(tmp_path, tiny_ctc_model):
+    model, processor = tiny_ctc_model
+    directory = artifact_dir("org/model", str(tmp_path / "artifacts"))
+
+    save_artifacts(model, processor, directory)
+    loaded_model, loaded_processor, token_set = load_artifacts(directory)
+
+    assert token_set.tokens == [
+        "<pad>",
+        "<s>",
+        "</s>",
+        "<unk>",
+        "|",
+        "a",
+        "b",
+        "ɑ̃",
+    ]
+    assert loaded_processor.tokenizer.get_vocab() == (
+        processor.tokenizer.get_vocab()
+    )
+    input_values = torch.randn(1, 4000)
+    with torch.no_grad():
+        assert torch.equal(
+            loaded_model.eval()(input_values).logits,
+            model(input_values).logits,
+        )
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+import torch
+
+from phonometrics.transcription.phonemes.batching import MicroBatchScheduler
+
+
+class RecordingModel:
+    """Stands in for TranscriptionModel and records the batch sizes."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def transcribe_batch(self, waveforms, sample_rates):
+        self.batch_sizes.append(len(waveforms))
+        return [
+            {"transcription": str(int(waveform[0]))} for waveform in waveforms
+        ]
+
+
+def run_requests(scheduler, n_requests):
+    async def main():
+        await scheduler.start()
+        try:
+            return await asyncio.gather(
+                *[
+                    scheduler.transcribe(torch.tensor([float(i)]), 16000)
+                    for i in range(n_requests)
+                ]
+            )
+        finally:
+            await scheduler.stop()
+
+    return asyncio.run(main())
+
+
+def test_scheduler_coalesces_concurrent_requests():
+    model = RecordingModel()
+    scheduler = MicroBatchScheduler(model, max_batch_size=4, max_wait_ms=50)
+
+    results = run_requests(scheduler, 10)
+
+    # every request gets its own result back, in order
+    assert [r["transcription"] for r in results] == [
+        str(i) for i in range(10)
+    ]
+    assert sum(model.batch_sizes) == 10
+    assert max(model.batch_sizes) == 4
+    assert len(model.batch_sizes) < 10
+
+
+def test_scheduler_propagates_model_errors():
+    class FailingModel:
+        def transcribe_batch(self, waveforms, sample_rates):
+            raise ValueError("boom")
+
+    scheduler = MicroBatchScheduler(FailingModel(), max_wait_ms=1)
+    with pytest.raises(ValueError, match="boom"):
+        run_requests(scheduler, 2)
@@ -0,0 +1,60 @@
+import pytest
+import torch
+
+from phonometrics.transcription.phonemes.chunking import chunk_starts
+from phonometrics.transcription.phonemes.chunking import frame_boundaries
+from phonometrics.transcription.phonemes.model import TranscriptionModel
+
+
+def test_chunk_starts_cover_the_whole_waveform():
+    starts = chunk_starts(
+        n_samples=10_000, chunk_samples=3_200, stride_samples=2_560
+    )
+
+    assert starts == [0, 2_560, 5_120, 7_680]
+    assert starts[-1] + 3_200 >= 10_000
+
+
+def test_short_waveform_is_a_single_chunk():
+    assert chunk_starts(1_000, 3_200, 2_560) == [0]
+
+
+def test_frame_boundaries_split_overlaps_in_the_middle():
+    starts = [0, 2_560, 5_120, 7_680]
+    boundaries = frame_boundaries(
+        starts, chunk_samples=3_200, n_frames=31, samples_per_frame=320
+    )
+
+    # the overlap of the first two windows spans frames 8 to 10
+    assert boundaries == [0, 9, 17, 25, 31]
+    # every window only contributes frames it actually computed
+    for k, start in enumerate(starts):
+        first_frame = start // 320
+        assert boundaries[k] >= first_frame
+        assert boundaries[k + 1] <= first_frame + 3_200 // 320
+
+
+@pytest.mark.parametrize("extra_samples", [1, 320, 400, 719, 16_000])
+def test_chunked_logits_have_the_unchunked_frames(
+    tiny_ctc_model, extra_samples
+):
+    model, processor = tiny_ctc_model
+    waveform = torch.randn(16_000 + extra_samples)
+    whole = TranscriptionModel(model, processor)
+    sequential = TranscriptionModel(
+        model, processor, chunk_length_s=1.0, chunk_overlap_s=0.2
+    )
+    batched = TranscriptionModel(
+        model,
+        processor,
+        chunk_length_s=1.0,
+        chunk_overlap_s=0.2,
+        chunk_batch_size=2,
+    )
+    inputs = whole._process_inputs(waveform, 16_000)
+
+    expected = whole._infer(inputs)
+    logits = sequential._infer(inputs)
+
+    assert logits.shape == expected.shape
+    torch.testing.assert_close(batched._infer(inputs), logits)
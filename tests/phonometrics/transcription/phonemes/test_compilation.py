@@ -0,0 +1,48 @@
+import torch
+
+from transformers import Wav2Vec2ForCTC
+
+from phonometrics.transcription.phonemes import compilation
+
+
+def test_inputs_are_padded_to_buckets_and_cut_back(
+    monkeypatch, tiny_ctc_model
+):
+    # traced by dynamo like in production, without inductor's slow codegen
+    compile = torch.compile
+    monkeypatch.setattr(
+        torch,
+        "compile",
+        lambda model, **options: compile(
+            model, backend="aot_eager", **options
+        ),
+    )
+    tiny_model, _ = tiny_ctc_model
+    # padding with a mask is exact for the layer-normalized architecture
+    config = tiny_model.config
+    config.feat_extract_norm = "layer"
+    config.do_stable_layer_norm = True
+    torch.manual_seed(0)
+    model = Wav2Vec2ForCTC(config).eval()
+    input_values = torch.randn(3, 11200)
+    attention_mask = torch.ones(3, 11200, dtype=torch.long)
+    attention_mask[2, 8000:] = 0
+    with torch.no_grad():
+        expected = model(input_values, attention_mask=attention_mask).logits
+
+    compiled = compilation.BucketedCompiledModel(
+        model, [0.5, 1.0], with_attention_mask=True, max_batch_size=4
+    )
+    shapes = []
+    run = compiled._run
+    compiled._run = lambda values, mask: shapes.append(values.shape) or run(
+        values, mask
+    )
+    logits = compiled(input_values, attention_mask=attention_mask).logits
+
+    assert shapes == [(4, 16000)]
+    assert logits.shape == expected.shape
+    torch.testing.assert_close(logits, expected, atol=1e-4, rtol=1e-4)
+    # longer than the largest bucket, so eager
+    assert compiled(torch.randn(1, 20000)).logits.shape[1] == 62
+    assert shapes == [(4, 16000)]
@@ -0,0 +1,187 @@
+import numpy as np
+import pytest
+import torch
+
+from phonometrics.transcription.phonemes.decoder import GreedyDecoder
+from phonometrics.transcription.phonemes.decoder import PrefixBeamSearchDecoder
+from phonometrics.transcription.phonemes.decoder import build_decoder
+from phonometrics.transcription.phonemes.ngram import PhonemeNgramLM
+from phonometrics.transcription.phonemes.tokens import TokenSet
+
+
+TOKENS = ["<pad>", "<s>", "</s>", "<unk>", "|", "a", "b", "ɛ", "ɑ̃"]
+
+
+def reference_ctc_decode(predicted_ids, blank_token_id):
+    """The timestep by timestep CTC collapse the decoder used to run."""
+    predictions = []
+    for item in predicted_ids:
+        ids, start_timesteps, end_timesteps = [], [], []
+        previous_id = None
+        for t in range(len(item)):
+            predicted_id = int(item[t])
+            if predicted_id != blank_token_id:
+                if (
+                    len(ids) == 0
+                    or previous_id == blank_token_id
+                    or predicted_id != ids[-1]
+                ):
+                    ids.append(predicted_id)
+                    start_timesteps.append(t)
+                    end_timesteps.append(t + 1)
+                else:
+                    end_timesteps[-1] = t
+            previous_id = predicted_id
+        predictions.append(
+            {
+                "ids": ids,
+                "start_timesteps": start_timesteps,
+                "end_timesteps": end_timesteps,
+            }
+        )
+    return predictions
+
+
+def test_ctc_decode_matches_reference():
+    decoder = GreedyDecoder(TokenSet(TOKENS))
+    generator = torch.Generator().manual_seed(0)
+    # few classes so that repeats and blanks are frequent
+    logits = torch.randn(8, 200, 3, generator=generator)
+    predicted_ids = torch.argmax(logits, dim=-1) + 3
+    predicted_ids[predicted_ids == 3] = decoder.token_set.blank_token_id
+
+    expected = reference_ctc_decode(
+        predicted_ids, decoder.token_set.blank_token_id
+    )
+    assert decoder._ctc_decode(predicted_ids) == expected
+    assert decoder._ctc_decode(predicted_ids.numpy()) == expected
+
+
+def test_ctc_decode_ragged_items():
+    decoder = GreedyDecoder(TokenSet(TOKENS))
+    blank = decoder.token_set.blank_token_id
+    rng = np.random.default_rng(0)
+    items = [
+        rng.choice([blank, 5, 6], size=length).tolist()
+        for length in (0, 1, 17, 0, 40)
+    ]
+
+    predictions = decoder._ctc_decode(items)
+    assert predictions == reference_ctc_decode(items, blank)
+    assert all(type(x) is int for x in predictions[-1]["ids"])
+
+
+def test_greedy_decoder_output():
+    decoder = GreedyDecoder(TokenSet(TOKENS))
+    token_ids = [0, 5, 5, 0, 5, 4, 6, 6, 6]
+    logits = torch.nn.functional.one_hot(
+        torch.tensor([token_ids]), len(TOKENS)
+    ).float()
+
+    (result,) = decoder(logits)
+    assert result["transcription"] == "aa b"
+    assert result["start_timestamps"] == [20, 80, 100, 120]
+    assert result["end_timestamps"] == [40, 100, 120, 160]
+
+
+def test_probabilities_are_segment_means():
+    decoder = GreedyDecoder(TokenSet(TOKENS))
+    a, b = TOKENS.index("a"), TOKENS.index("b")
+    probabilities = torch.full((1, 6, len(TOKENS)), 0.01)
+    for t, (token_id, probability) in enumerate(
+        [(a, 0.9), (a, 0.7), (a, 0.5), (0, 0.8), (b, 0.6), (b, 0.4)]
+    ):
+        probabilities[0, t, token_id] = probability
+
+    (result,) = decoder(probabilities.log())
+    softmax = torch.softmax(probabilities.log(), dim=-1)
+    assert result["transcription"] == "ab"
+    # the windows end at the last timestep of each token: [0, 2) and [4, 5)
+    assert np.allclose(
+        result["probabilities"],
+        [float(softmax[0, :2, a].mean()), float(softmax[0, 4, b])],
+    )
+
+
+def test_probabilities_from_log_probs_and_half_logits():
+    class LogProbsDecoder(GreedyDecoder):
+        def _get_predictions(self, logits):
+            predictions = super()._get_predictions(logits)
+            for prediction, item_logits in zip(predictions, logits):
+                # stands for log-probabilities computed by a beam search
+                prediction["log_probs"] = torch.zeros_like(item_logits)
+            return predictions
+
+    generator = torch.Generator().manual_seed(0)
+    logits = torch.randn(2, 50, len(TOKENS), generator=generator) * 3
+    token_set = TokenSet(TOKENS)
+
+    for result in LogProbsDecoder(token_set)(logits):
+        assert result["probabilities"] == [1.0] * len(result["probabilities"])
+
+    expected = GreedyDecoder(token_set)(logits)
+    for result, reference in zip(
+        GreedyDecoder(token_set)(logits.half()), expected
+    ):
+        assert result["transcription"] == reference["transcription"]
+        assert np.allclose(
+            result["probabilities"], reference["probabilities"], atol=1e-2
+        )
+
+
+def peaky_logits(batch_size, n_timesteps, seed=0):
+    """Confident CTC-like logits, mostly blank."""
+    generator = torch.Generator().manual_seed(seed)
+    ids = torch.randint(
+        0, len(TOKENS), (batch_size, n_timesteps), generator=generator
+    )
+    ids[torch.rand(batch_size, n_timesteps, generator=generator) < 0.7] = 0
+    noise = torch.randn(
+        batch_size, n_timesteps, len(TOKENS), generator=generator
+    )
+    return torch.nn.functional.one_hot(ids, len(TOKENS)).float() * 8 + noise
+
+
+def test_beam_search_matches_greedy_on_confident_logits():
+    token_set = TokenSet(TOKENS)
+    logits = peaky_logits(2, 300)
+
+    expected = GreedyDecoder(token_set)(logits)
+    actual = PrefixBeamSearchDecoder(token_set, beam_width=8)(logits)
+    for result, reference in zip(actual, expected):
+        assert result["transcription"] == reference["transcription"]
+        assert result["start_timestamps"] == reference["start_timestamps"]
+        assert result["end_timestamps"] == reference["end_timestamps"]
+        assert np.allclose(result["probabilities"], reference["probabilities"])
+
+
+def test_beam_search_follows_the_language_model():
+    token_set = TokenSet(TOKENS)
+    a, b = TOKENS.index("a"), TOKENS.index("b")
+    # the frames hesitate between "a" and "b" after a clear "a"
+    probabilities = torch.full((1, 5, len(TOKENS)), 0.001)
+    probabilities[0, 0, a] = 0.99
+    probabilities[0, 1, 0] = 0.99
+    probabilities[0, 2, a] = 0.5
+    probabilities[0, 2, b] = 0.45
+    probabilities[0, 3:, 0] = 0.99
+    logits = probabilities.log()
+
+    (without_lm,) = PrefixBeamSearchDecoder(token_set)(logits)
+    assert without_lm["transcription"] == "aa"
+
+    lm = PhonemeNgramLM.from_texts(["ab"] * 10, token_set, order=2)
+    (with_lm,) = PrefixBeamSearchDecoder(token_set, lm, alpha=1.0)(logits)
+    assert with_lm["transcription"] == "ab"
+    assert with_lm["start_timestamps"] == [0, 40]
+
+
+def test_build_decoder_by_name():
+    token_set = TokenSet(TOKENS)
+
+    decoder = build_decoder("beam", token_set, beam_width=4)
+    assert isinstance(decoder, PrefixBeamSearchDecoder)
+    assert decoder.beam_width == 4
+    assert isinstance(build_decoder("greedy", token_set), GreedyDecoder)
+    with pytest.raises(ValueError):
+        build_decoder("unknown", token_set)
@@ -0,0 +1,162 @@
+import ctypes
+import sys
+import threading
+import time
+import types
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+import torch
+
+from phonometrics.transcription.phonemes.decoder import FlashlightLMDecoder
+from phonometrics.transcription.phonemes.decoder import GreedyDecoder
+from phonometrics.transcription.phonemes.decoder import KenshoLMDecoder
+from phonometrics.transcription.phonemes.tokens import TokenSet
+
+
+TOKENS = ["<pad>", "<s>", "</s>", "<unk>", "|", "a", "b", "ɛ", "ɑ̃"]
+
+
+@pytest.fixture
+def logits():
+    generator = torch.Generator().manual_seed(0)
+    return torch.randn(3, 50, len(TOKENS), generator=generator) * 4
+
+
+def test_kensho_workers_match_in_process_decoding(logits):
+    pytest.importorskip("pyctcdecode")
+    token_set = TokenSet(TOKENS)
+    in_process = KenshoLMDecoder(token_set, None, beam_width=8, num_workers=0)
+    pooled = KenshoLMDecoder(token_set, None, beam_width=8, num_workers=2)
+    try:
+        expected = in_process(logits)
+        actual = pooled(logits)
+        # the workers are kept, the second call reuses them
+        repeated = pooled(logits)
+    finally:
+        pooled.close()
+
+    # the probabilities of the approximated timesteps can be NaN
+    expected = [result.to_dict() for result in expected]
+    np.testing.assert_equal([result.to_dict() for result in actual], expected)
+    np.testing.assert_equal(
+        [result.to_dict() for result in repeated], expected
+    )
+
+
+def test_kensho_worker_build_error_is_raised(logits, tmp_path):
+    pytest.importorskip("pyctcdecode")
+    decoder = KenshoLMDecoder(
+        TokenSet(TOKENS), str(tmp_path / "missing.arpa"), num_workers=1
+    )
+    try:
+        # a respawning pool would never answer, so the call is bounded
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(decoder, logits)
+            with pytest.raises(RuntimeError, match="could not be built"):
+                future.result(timeout=60)
+    finally:
+        decoder.close()
+
+
+def test_kensho_decoder_refuses_to_decode_once_closed(logits):
+    pytest.importorskip("pyctcdecode")
+    decoder = KenshoLMDecoder(TokenSet(TOKENS), None, num_workers=1)
+    decoder.close()
+
+    assert decoder.pool is None
+    with pytest.raises(RuntimeError, match="closed"):
+        decoder._get_predictions(logits)
+
+
+class FakeFlashlightDecoder:
+    """A lexicon-free flashlight decoder returning the argmax tokens."""
+
+    builds = []
+    fail = False
+
+    def __init__(self, *args):
+        self.builds.append(threading.get_ident())
+        self.thread = threading.get_ident()
+
+    def decode(self, logits_ptr, n_timesteps, n_tokens):
+        # a decoder keeps the state of its search, it must not be shared
+        assert threading.get_ident() == self.thread
+        emissions = np.ctypeslib.as_array(
+            (ctypes.c_float * (n_timesteps * n_tokens)).from_address(
+                logits_ptr
+            )
+        ).reshape(n_timesteps, n_tokens)
+        if self.fail:
+            raise RuntimeError("beam search failed")
+        # the first items finish last
+        time.sleep(0.002 * emissions[0, 0])
+        return [types.SimpleNamespace(tokens=list(emissions.argmax(-1)))]
+
+
+@pytest.fixture
+def fake_flashlight(monkeypatch):
+    """Installs stand-ins for the flashlight bindings, which are optional."""
+    decoder = types.ModuleType("flashlight.lib.text.decoder")
+    # only the lexicon-free decoder is built without a lexicon file
+    for name in [
+        "LexiconDecoder",
+        "LexiconDecoderOptions",
+        "SmearingMode",
+        "Trie",
+    ]:
+        setattr(decoder, name, None)
+    decoder.CriterionType = types.SimpleNamespace(CTC="ctc")
+    decoder.KenLM = lambda *args: None
+    decoder.LexiconFreeDecoderOptions = types.SimpleNamespace
+    decoder.LexiconFreeDecoder = FakeFlashlightDecoder
+    dictionary = types.ModuleType("flashlight.lib.text.dictionary")
+    dictionary.create_word_dict = lambda words: words
+    dictionary.load_words = lambda path: {}
+    modules = {
+        "flashlight": types.ModuleType("flashlight"),
+        "flashlight.lib": types.ModuleType("flashlight.lib"),
+        "flashlight.lib.text": types.ModuleType("flashlight.lib.text"),
+        "flashlight.lib.text.decoder": decoder,
+        "flashlight.lib.text.dictionary": dictionary,
+    }
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+    monkeypatch.setattr(FakeFlashlightDecoder, "builds", [])
+    return FakeFlashlightDecoder
+
+
+def test_flashlight_threads_keep_the_batch_order(fake_flashlight, logits):
+    logits = torch.cat([logits] * 4)
+    logits[:, 0, 0] = torch.arange(len(logits), 0, -1)
+    decoder = FlashlightLMDecoder(TokenSet(TOKENS), "lm.bin", num_threads=4)
+    try:
+        actual = decoder(logits)
+        n_builds = len(fake_flashlight.builds)
+        repeated = decoder(logits)
+    finally:
+        decoder.close()
+
+    expected = [
+        result.to_dict() for result in GreedyDecoder(TokenSet(TOKENS))(logits)
+    ]
+    assert [result.to_dict() for result in actual] == expected
+    assert [result.to_dict() for result in repeated] == expected
+    # one decoder per thread, the constructing one and the pool threads
+    builds = fake_flashlight.builds
+    assert len(builds) == len(set(builds)) == n_builds
+    assert 1 < n_builds <= 1 + 4
+
+
+def test_flashlight_thread_errors_are_raised(
+    fake_flashlight, logits, monkeypatch
+):
+    decoder = FlashlightLMDecoder(TokenSet(TOKENS), "lm.bin", num_threads=2)
+    monkeypatch.setattr(fake_flashlight, "fail", True)
+    try:
+        with pytest.raises(RuntimeError, match="beam search failed"):
+            decoder(logits)
+    finally:
+        decoder.close()
@@ -0,0 +1,14 @@
+from phonometrics.transcription.phonemes.metrics import edit_distance
+from phonometrics.transcription.phonemes.metrics import phoneme_error_rate
+
+
+def test_edit_distance():
+    assert edit_distance("kitten", "sitting") == 3
+    assert edit_distance([], ["a"]) == 1
+    assert edit_distance(["ɑ̃", "b"], ["ɑ̃", "b"]) == 0
+
+
+def test_phoneme_error_rate():
+    reference = ["b", "i", "j", "ɛ"]
+    assert phoneme_error_rate(reference, ["b", "i", "ɛ"]) == 0.25
+    assert phoneme_error_rate([], []) == 0.0
@@ -1,5 +1,10 @@
+import numpy as np
+import pytest
+import torch
+
 from transformers import AutoModelForCTC
 from transformers import AutoProcessor
+from transformers import Wav2Vec2ForCTC
 
 from phonometrics.transcription.phonemes.model import TranscriptionModel
 
@@ -31,3 +36,42 @@ def test_transcription_model(sample_audio_data):
     assert len_check == len(result["end_timestamps"]) == len(
         result["probabilities"]) == len(result['transcription']), \
         "Lengths of timestamps and probabilities do not match"
+
+
+@pytest.mark.parametrize("return_attention_mask", [False, True])
+def test_transcribe_batch_matches_single_requests(
+    tiny_ctc_model, return_attention_mask
+):
+    """Tests that batched transcription returns the same result as
+    transcribing each waveform on its own.
+    """
+    model, processor = tiny_ctc_model
+    generator = torch.Generator().manual_seed(0)
+    if return_attention_mask:
+        # only the models normalizing each frame on its own are masked
+        model.config.feat_extract_norm = "layer"
+        model.config.do_stable_layer_norm = True
+        model = Wav2Vec2ForCTC(model.config).eval()
+        processor.feature_extractor.return_attention_mask = True
+        # shorter items force padding inside the batch
+        lengths = [24000, 11000, 16000]
+    else:
+        # without a mask the padding changes the output, so it is avoided
+        lengths = [16000, 16000]
+    waveforms = [torch.randn(1, n, generator=generator) for n in lengths]
+    audio_transcriber = TranscriptionModel(model, processor)
+
+    results = audio_transcriber.transcribe_batch(
+        waveforms, [16000] * len(waveforms)
+    )
+
+    assert len(results) == len(waveforms)
+    for waveform, result in zip(waveforms, results):
+        expected = audio_transcriber.transcribe_from_waveform(waveform, 16000)
+        assert expected["transcription"]
+        assert result["transcription"] == expected["transcription"]
+        assert result["start_timestamps"] == expected["start_timestamps"]
+        assert result["end_timestamps"] == expected["end_timestamps"]
+        np.testing.assert_allclose(
+            result["probabilities"], expected["probabilities"], rtol=1e-5
+        )
@@ -0,0 +1,40 @@
+import math
+
+import numpy as np
+
+from phonometrics.transcription.phonemes.ngram import PhonemeNgramLM
+from phonometrics.transcription.phonemes.tokens import TokenSet
+
+
+TOKENS = ["<pad>", "<s>", "</s>", "<unk>", "|", "a", "b", "ɛ", "ɑ̃"]
+
+
+def test_scores_and_backoff():
+    token_set = TokenSet(TOKENS)
+    lm = PhonemeNgramLM.from_texts(["ab ab", "aɑ̃"], token_set, order=2)
+    a, b, ɑ̃ = (token_set.id_by_token[x] for x in ("a", "b", "ɑ̃"))
+
+    scores = lm.next_token_scores([a])
+    # "a" is followed twice by "b" and once by "ɑ̃"
+    assert math.isclose(scores[b], math.log(2 / 3), rel_tol=1e-6)
+    assert math.isclose(scores[ɑ̃], math.log(1 / 3), rel_tol=1e-6)
+    # unseen bigrams back off to the add-one smoothed unigrams: 3 "a" out of
+    # 7 tokens plus one count for each of the 9 tokens
+    assert math.isclose(scores[a], math.log(0.4 * 4 / 16), rel_tol=1e-6)
+    after_unseen = lm.next_token_scores([token_set.id_by_token["ɛ"]])
+    assert math.isclose(after_unseen[b], math.log(0.4 * 3 / 16), rel_tol=1e-6)
+
+
+def test_save_and_load(tmp_path):
+    token_set = TokenSet(TOKENS)
+    lm = PhonemeNgramLM.from_texts(["ab ɛb", "bɑ̃ a"], token_set, order=3)
+    path = str(tmp_path / "lm.npz")
+    lm.save(path)
+
+    loaded = PhonemeNgramLM.load(path)
+    assert loaded.order == 3
+    loaded.check_token_set(token_set)
+    for history in ([], [5], [5, 6], [4, 6, 7]):
+        assert np.array_equal(
+            lm.next_token_scores(history), loaded.next_token_scores(history)
+        )
@@ -0,0 +1,74 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+import torch
+
+from transformers import Wav2Vec2ForCTC
+
+from phonometrics.transcription.phonemes import onnx_backend
+
+
+requires_onnxruntime = pytest.mark.skipif(
+    importlib.util.find_spec("onnxruntime") is None,
+    reason="onnxruntime is not installed",
+)
+
+
+def test_missing_onnxruntime_fails_before_the_export(
+    tiny_ctc_model, tmp_path, monkeypatch
+):
+    model, _ = tiny_ctc_model
+    cache_dir = tmp_path / "onnx"
+    monkeypatch.setitem(sys.modules, "onnxruntime", None)
+
+    with pytest.raises(ImportError, match="--extras onnx"):
+        onnx_backend.OnnxCTCModel.from_model(
+            model, with_attention_mask=False, cache_dir=str(cache_dir)
+        )
+
+    assert not cache_dir.exists()
+
+
+@requires_onnxruntime
+def test_onnx_logits_match_eager(tiny_ctc_model, tmp_path):
+    model, _ = tiny_ctc_model
+    input_values = torch.randn(2, 16000)
+    attention_mask = torch.ones(2, 16000, dtype=torch.long)
+    attention_mask[1, 12000:] = 0
+    with torch.no_grad():
+        expected = model(input_values, attention_mask=attention_mask).logits
+
+    onnx_model = onnx_backend.OnnxCTCModel.from_model(
+        model, with_attention_mask=True, cache_dir=str(tmp_path)
+    )
+    logits = onnx_model(input_values, attention_mask=attention_mask).logits
+
+    torch.testing.assert_close(logits, expected, atol=1e-5, rtol=1e-4)
+
+
+@requires_onnxruntime
+def test_changed_weights_never_load_a_stale_graph(tiny_ctc_model, tmp_path):
+    model, _ = tiny_ctc_model
+    cache_dir = tmp_path / "onnx"
+    torch.manual_seed(1)
+    retrained = Wav2Vec2ForCTC(model.config).eval()
+    input_values = torch.randn(1, 16000)
+    with torch.no_grad():
+        expected = retrained(input_values).logits
+
+    onnx_backend.OnnxCTCModel.from_model(
+        model, with_attention_mask=False, cache_dir=str(cache_dir)
+    )
+    onnx_model = onnx_backend.OnnxCTCModel.from_model(
+        retrained, with_attention_mask=False, cache_dir=str(cache_dir)
+    )
+
+    assert onnx_backend.graph_fingerprint(
+        model, False
+    ) != onnx_backend.graph_fingerprint(retrained, False)
+    assert len(os.listdir(cache_dir)) == 2
+    torch.testing.assert_close(
+        onnx_model(input_values).logits, expected, atol=1e-5, rtol=1e-4
+    )
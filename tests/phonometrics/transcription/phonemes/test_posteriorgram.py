@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from phonometrics.transcription.phonemes import posteriorgram
+
+
+TOKENS = ["<pad>", "<s>", "</s>", "<unk>", "|", "a", "b", "ɑ̃"]
+
+
+def log_posteriors(n_frames=50, seed=0):
+    logits = np.random.default_rng(seed).normal(size=(n_frames, len(TOKENS)))
+    logits *= 4
+    return logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))
+
+
+@pytest.mark.parametrize(
+    "encoding, floor, tolerance",
+    [("float16", -np.inf, 1e-2), ("uint8", -16.0, 16 / 255)],
+)
+def test_dense_encodings_round_trip(encoding, floor, tolerance):
+    log_probs = log_posteriors()
+
+    payload = posteriorgram.encode_posteriorgram(
+        log_probs, TOKENS, 20, encoding=encoding
+    )
+    header, decoded = posteriorgram.decode_posteriorgram(payload)
+
+    assert header["tokens"] == TOKENS
+    assert header["frames"] == 50
+    assert header["ms_per_timestep"] == 20
+    assert decoded.dtype == np.float32
+    expected = np.maximum(log_probs, floor)
+    np.testing.assert_allclose(decoded, expected, atol=tolerance)
+    assert len(payload) < log_probs.astype(np.float32).nbytes
+
+
+def test_topk_keeps_the_most_likely_tokens():
+    log_probs = log_posteriors()
+
+    payload = posteriorgram.encode_posteriorgram(
+        log_probs, TOKENS, 20, "topk", top_k=2
+    )
+    header, decoded = posteriorgram.decode_posteriorgram(payload)
+
+    assert header["top_k"] == 2
+    assert np.array_equal(decoded.argmax(axis=1), log_probs.argmax(axis=1))
+    assert (np.isfinite(decoded).sum(axis=1) == 2).all()
+    kept = np.isfinite(decoded)
+    np.testing.assert_allclose(decoded[kept], log_probs[kept], atol=1e-2)
@@ -0,0 +1,65 @@
+import pytest
+import torch
+
+from phonometrics.transcription.phonemes import precision
+from phonometrics.transcription.phonemes.model import TranscriptionModel
+
+
+@pytest.mark.parametrize("name", ["bf16", "fp16"])
+def test_half_precision_keeps_fp32_logits(name, tiny_ctc_model):
+    if not precision.supports_precision(name):
+        pytest.skip(f"The CPU does not support {name}")
+    model, processor = tiny_ctc_model
+    input_values = torch.randn(1, 16000)
+    with torch.no_grad():
+        expected = model(input_values).logits
+
+    transcriber = TranscriptionModel(model, processor, precision=name)
+    inputs = transcriber._process_inputs(input_values[0], 16000)
+    logits = transcriber._forward(inputs)
+
+    assert model.wav2vec2.encoder.layers[0].attention.q_proj.weight.dtype == (
+        precision.REDUCED_DTYPES[name]
+    )
+    assert logits.dtype == torch.float32
+    torch.testing.assert_close(logits, expected, atol=0.25, rtol=0)
+
+
+def test_unsupported_precision_falls_back_to_fp32(
+    monkeypatch, tiny_ctc_model
+):
+    monkeypatch.setattr(precision, "supports_precision", lambda name: False)
+    model, _ = tiny_ctc_model
+
+    assert precision.resolve_precision("bf16") == "fp32"
+    assert precision.apply_precision(model, "bf16").dtype == torch.float32
+
+
+def test_int8_quantizes_only_the_encoder_linear_layers(tiny_ctc_model):
+    model, processor = tiny_ctc_model
+    input_values = torch.randn(1, 16000)
+    with torch.no_grad():
+        expected = model(input_values).logits
+
+    transcriber = TranscriptionModel(model, processor, precision="int8")
+    inputs = transcriber._process_inputs(input_values[0], 16000)
+    logits = transcriber._forward(inputs)
+
+    quantized = torch.ao.nn.quantized.dynamic.Linear
+    encoder_linears = [
+        module
+        for module in model.wav2vec2.encoder.modules()
+        if isinstance(module, (torch.nn.Linear, quantized))
+    ]
+    assert encoder_linears
+    assert all(isinstance(module, quantized) for module in encoder_linears)
+    assert type(model.lm_head) is torch.nn.Linear
+    assert model.lm_head.weight.dtype == torch.float32
+    assert all(
+        parameter.dtype == torch.float32
+        for parameter in model.wav2vec2.feature_extractor.parameters()
+    )
+    assert logits.dtype == torch.float32
+    # the INT8 weights and activations only approximate the fp32 ones
+    error = (logits - expected).abs().max() / expected.abs().max()
+    assert 0 < error < 0.01
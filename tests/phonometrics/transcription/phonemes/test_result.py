@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from phonometrics.transcription.phonemes.result import TranscriptionResult
+
+
+def test_result_arrays_and_dict():
+    result = TranscriptionResult(
+        "ab c",
+        token_ids=[5, 6, 7],
+        start_timestamps=[0, 40, 100],
+        end_timestamps=[20, 60, 120],
+        probabilities=[0.5, 0.25, 1.0],
+    )
+
+    assert result.token_ids.dtype == np.int16
+    assert result.start_timestamps.dtype == np.int32
+    assert result.end_timestamps.dtype == np.int32
+    assert result.probabilities.dtype == np.float32
+    assert result.to_dict() == {
+        "transcription": "ab c",
+        "start_timestamps": [0, 40, 100],
+        "end_timestamps": [20, 60, 120],
+        "probabilities": [0.5, 0.25, 1.0],
+    }
+    assert result["start_timestamps"] == [0, 40, 100]
+    assert TranscriptionResult.from_dict(result.to_dict()) == result
+    with pytest.raises(KeyError):
+        result["token_ids"]
+
+
+def test_empty_result_reports_none():
+    result = TranscriptionResult(
+        "",
+        token_ids=[],
+        start_timestamps=[],
+        end_timestamps=[],
+        probabilities=[],
+    )
+
+    assert result.to_dict() == {
+        "transcription": "",
+        "start_timestamps": None,
+        "end_timestamps": None,
+        "probabilities": None,
+    }
+    assert TranscriptionResult.from_dict(result.to_dict()) == result
@@ -0,0 +1,43 @@
+import numpy as np
+import torch
+
+from phonometrics.transcription.phonemes.alignment import ForcedAligner
+from phonometrics.transcription.phonemes.scoring import GOPScorer
+from phonometrics.transcription.phonemes.tokens import TokenSet
+
+
+TOKENS = ["<pad>", "<s>", "</s>", "<unk>", "|", "a", "b", "ɛ", "ɑ̃"]
+
+
+def test_gop_of_mispronounced_phoneme():
+    token_set = TokenSet(TOKENS)
+    scorer = GOPScorer(ForcedAligner(token_set))
+    # "a b" is expected, the speaker says "a ɛ"
+    frame_ids = [5, 5, 0, 4, 7, 7, 0]
+    logits = torch.nn.functional.one_hot(
+        torch.tensor([frame_ids]), len(TOKENS)
+    ) * 5.0 + torch.linspace(0, 0.1, len(TOKENS))
+    log_probs = torch.log_softmax(logits, dim=-1)
+
+    (result,) = scorer.score(log_probs, ["a b"])
+    assert result["phonemes"] == ["a", "b"]
+    good, bad = result["scores"]
+    # "a" beats the best other phoneme, "b" loses against "ɛ"
+    assert good > 4
+    assert bad < -4
+    assert result["score"] == np.mean(result["scores"])
+
+
+def test_batch_scores_match_single_clips():
+    token_set = TokenSet(TOKENS)
+    scorer = GOPScorer(ForcedAligner(token_set))
+    generator = torch.Generator().manual_seed(0)
+    log_probs = torch.log_softmax(
+        torch.randn(2, 80, len(TOKENS), generator=generator) * 3, dim=-1
+    )
+    references = ["ab ɛ", "ɑ̃b"]
+
+    batch = scorer.score(log_probs, references, lengths=[80, 50])
+    first = scorer.score(log_probs[:1], references[:1])
+    second = scorer.score(log_probs[1:, :50], references[1:])
+    assert batch == first + second
@@ -0,0 +1,87 @@
+import numpy as np
+import torch
+
+from phonometrics.transcription.phonemes.decoder import GreedyDecoder
+from phonometrics.transcription.phonemes.streaming import StreamingSession
+from phonometrics.transcription.phonemes.tokens import TokenSet
+
+
+TOKENS = ["<pad>", "<s>", "</s>", "<unk>", "|", "a", "b", "ɛ", "ɑ̃"]
+SAMPLES_PER_FRAME = 320
+
+
+def fake_infer(waveform):
+    """A model predicting, for every frame, the id written in its samples."""
+    n_frames = (len(waveform) - 400) // SAMPLES_PER_FRAME + 1
+    ids = waveform[::SAMPLES_PER_FRAME][:n_frames].long()
+    return torch.nn.functional.one_hot(ids, len(TOKENS)).float()[None] * 5
+
+
+def frame_ids(n_frames, seed=0):
+    """Runs of phonemes, blanks and word separators, like real speech."""
+    generator = np.random.default_rng(seed)
+    ids = []
+    while len(ids) < n_frames:
+        token_id = generator.choice([0, 0, 4, 5, 6, 7, 8])
+        ids.extend([token_id] * generator.integers(1, 6))
+    return np.array(ids[:n_frames])
+
+
+def test_stream_finalizes_the_offline_transcription():
+    decoder = GreedyDecoder(TokenSet(TOKENS))
+    ids = frame_ids(400)
+    waveform = np.repeat(ids, SAMPLES_PER_FRAME).astype(np.float32)
+    offline = decoder(fake_infer(torch.from_numpy(waveform)))[0]
+
+    session = StreamingSession(fake_infer, decoder, left_context_s=0.3)
+    messages = []
+    for chunk in np.array_split(waveform, len(waveform) // 2731):
+        messages.extend(session.push(chunk))
+    messages.extend(session.finish())
+
+    finals = [message for message in messages if message["type"] == "final"]
+    assert len(finals) > 1
+    assert {message["type"] for message in messages} == {
+        "partial",
+        "final",
+        "end",
+    }
+    assert messages[-1] == {
+        "type": "end",
+        "transcription": offline.transcription,
+    }
+    # the same tokens, but the word separators at the ends of the finals
+    tokens = [
+        token
+        for message in finals
+        for token in zip(
+            message["start_timestamps"],
+            message["end_timestamps"],
+            message["probabilities"],
+        )
+    ]
+    offline_tokens = list(
+        zip(
+            offline["start_timestamps"],
+            offline["end_timestamps"],
+            offline["probabilities"],
+        )
+    )
+    assert set(tokens) <= set(offline_tokens)
+    assert tokens == sorted(tokens)
+    assert len(tokens) >= np.count_nonzero(offline.token_ids != 4)
+
+
+def test_stream_bounds_the_window_of_every_forward_pass():
+    lengths = []
+
+    def infer(waveform):
+        lengths.append(len(waveform))
+        return fake_infer(torch.zeros(len(waveform)))
+
+    session = StreamingSession(infer, GreedyDecoder(TokenSet(TOKENS)))
+    for _ in range(40):
+        session.push(np.zeros(8000, dtype=np.float32))
+
+    assert len(lengths) == 39
+    assert max(lengths) == 16000 * 3
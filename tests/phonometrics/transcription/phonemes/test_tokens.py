@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from phonometrics.transcription.phonemes.tokens import TokenSet
+
+
+TOKENS = ["<pad>", "<s>", "</s>", "<unk>", "|", "a", "b", "ɑ̃"]
+
+
+def test_compiled_token_set_tables():
+    token_set = TokenSet(TOKENS)
+    compiled = token_set.compiled
+
+    assert compiled is token_set.compiled
+    assert compiled.special_ids.tolist() == [0, 1, 2, 3, 4]
+    assert compiled.is_special.tolist() == [True] * 5 + [False] * 3
+    assert compiled.token_id("ɑ̃") == 7
+    assert compiled.token_id("x") == token_set.unk_token_id
+    assert compiled.ids(["a", "|", "x"]).tolist() == [5, 4, 3]
+    with pytest.raises(ValueError):
+        compiled.is_special[0] = False
+    with pytest.raises(AttributeError):
+        compiled.unk_token_id = 0
+
+
+def test_compiled_token_set_text():
+    compiled = TokenSet(TOKENS).compiled
+    ids = np.array([5, 0, 4, 7, 3, 6])
+
+    assert compiled.reported(ids).tolist() == [
+        True,
+        False,
+        True,
+        True,
+        False,
+        True,
+    ]
+    assert compiled.to_text(ids[compiled.reported(ids)]) == "a ɑ̃b"
+    assert compiled.reported(ids, skip_special_tokens=False).all()
+
+
+def test_save_and_load_skip_the_compiled_view(tmp_path):
+    token_set = TokenSet(TOKENS)
+    token_set.compiled
+    token_set.save(str(tmp_path / "tokens.json"))
+
+    loaded = TokenSet.load(str(tmp_path / "tokens.json"))
+    assert loaded.tokens == token_set.tokens
+    assert loaded.compiled.to_text([5, 4, 6]) == "a b"
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+import torch
+
+from phonometrics.transcription.phonemes import truncation
+from phonometrics.transcription.phonemes.model import TranscriptionModel
+
+
+def test_truncated_encoder_feeds_the_ctc_head(tiny_ctc_model):
+    model, processor = tiny_ctc_model
+    input_values = torch.randn(1, 16000)
+    with torch.no_grad():
+        outputs = model(input_values, output_hidden_states=True)
+        expected = model.lm_head(outputs.hidden_states[1])
+
+    transcriber = TranscriptionModel(model, processor, num_encoder_layers=1)
+    logits = transcriber._forward(
+        transcriber._process_inputs(input_values[0], 16000)
+    )
+
+    assert len(model.wav2vec2.encoder.layers) == 1
+    assert model.config.num_hidden_layers == 1
+    torch.testing.assert_close(logits, expected)
+    with pytest.raises(ValueError):
+        truncation.truncate_encoder(model, 2)
+
+
+def test_adapter_brings_the_truncated_states_closer(tiny_ctc_model, tmp_path):
+    model, processor = tiny_ctc_model
+    generator = torch.Generator().manual_seed(0)
+    waveforms = [torch.randn(8000, generator=generator) for _ in range(4)]
+    input_values = processor(
+        waveforms[0], sampling_rate=16000, return_tensors="pt"
+    ).input_values
+
+    adapter = truncation.EncoderAdapter.fit(
+        model, processor, waveforms, num_layers=1
+    )
+    adapter.save(tmp_path / "adapter.npz")
+    loaded = truncation.EncoderAdapter.load(tmp_path / "adapter.npz")
+
+    target = truncation._head_inputs(model, input_values)
+    with truncation._truncated(model, 1):
+        source = truncation._head_inputs(model, input_values)
+    with torch.no_grad():
+        adapted = adapter(source)
+    assert ((adapted - target) ** 2).mean() < ((source - target) ** 2).mean()
+    assert loaded.num_layers == 1
+    assert loaded.fingerprint() == adapter.fingerprint()
+    np.testing.assert_array_equal(loaded.weight, adapter.weight)
+
+    with pytest.raises(ValueError):
+        truncation.truncate_encoder(model, 2, loaded)
+    truncated = truncation.truncate_encoder(model, 1, loaded)
+    assert truncated.config.encoder_adapter == adapter.fingerprint()
+    with torch.no_grad():
+        torch.testing.assert_close(
+            truncated(input_values).logits[0],
+            truncated.lm_head[1](adapted),
+        )
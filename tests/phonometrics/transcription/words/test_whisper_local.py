@@ -1,5 +1,12 @@
+import pytest
+import torch
 import torchaudio
+import whisper
 
+from whisper.model import ModelDimensions
+from whisper.model import Whisper
+
+from phonometrics.transcription.phonemes.precision import supports_precision
 from phonometrics.transcription.words.whisper_local import LocalWhisperModel
 
 
@@ -36,3 +43,37 @@ def test_local_whisper_model_from_waveform(sample_audio_data):
     assert computed_transcription == expected_transcription.strip().replace(
         ",", ""
     ), f"Expected: {expected_transcription}, but got: {computed_transcription}"
+
+
+def test_local_whisper_model_in_bf16(monkeypatch):
+    if not supports_precision("bf16"):
+        pytest.skip("The CPU does not support bf16")
+    dims = ModelDimensions(
+        n_mels=80,
+        n_audio_ctx=1500,
+        n_audio_state=64,
+        n_audio_head=2,
+        n_audio_layer=1,
+        n_vocab=51865,
+        n_text_ctx=448,
+        n_text_state=64,
+        n_text_head=2,
+        n_text_layer=1,
+    )
+    torch.manual_seed(0)
+    tiny_model = Whisper(dims).eval()
+    # left uninitialized by Whisper until the checkpoint is loaded
+    torch.nn.init.normal_(tiny_model.decoder.positional_embedding, std=0.01)
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: False)
+    monkeypatch.setattr(
+        whisper, "load_model", lambda *args, **kwargs: tiny_model
+    )
+
+    model = LocalWhisperModel(model_size="base", precision="bf16")
+    transcription = model.transcribe_from_waveform(
+        torch.zeros(1, 16000), 16000
+    )
+
+    assert tiny_model.encoder.conv1.weight.dtype == torch.bfloat16
+    assert tiny_model.encoder.ln_post.weight.dtype == torch.float32
+    assert isinstance(transcription["transcription"], str)
@@ -0,0 +1,36 @@
+import matplotlib
+import pytest
+
+from phonometrics.transcription.phonemes.result import TranscriptionResult
+from phonometrics.vizualize.plot import WaveformPlotBuilder
+
+
+matplotlib.use("Agg")
+
+RESULT = TranscriptionResult(
+    "ab a",
+    token_ids=[5, 6, 4, 5],
+    start_timestamps=[0, 40, 80, 100],
+    end_timestamps=[20, 60, 100, 140],
+    probabilities=[0.9, 0.5, 0.8, 0.7],
+)
+
+
+@pytest.mark.parametrize("transcription", [RESULT, RESULT.to_dict()])
+def test_transcription_is_drawn_from_the_result_arrays(transcription):
+    builder = WaveformPlotBuilder("test").with_transcription(transcription)
+
+    figure = builder.build()
+
+    assert isinstance(builder.transcription_data, TranscriptionResult)
+    texts = figure.axes[0].texts
+    assert [text.get_text() for text in texts] == ["a", "b", "a"]
+    assert texts[2].get_position()[0] == pytest.approx(0.12)
+
+
+def test_empty_transcription_draws_nothing():
+    builder = WaveformPlotBuilder("test").with_transcription(
+        {"transcription": ""}
+    )
+
+    assert len(builder.build().axes[0].texts) == 0
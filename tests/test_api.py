@@ -1,5 +1,173 @@
+import importlib
+import io
+import shutil
+import sys
+import threading
+import time
+
+from pathlib import Path
+
+import numpy as np
 import pytest
 import requests
+import torch
+import torchaudio
+
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from phonometrics.audio_processing.resampling import resample
+from phonometrics.transcription.phonemes import artifacts
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path, tiny_ctc_model):
+    """The API module, serving the tiny model from a scratch folder."""
+    model, processor = tiny_ctc_model
+    monkeypatch.setattr(
+        artifacts,
+        "load_or_create_artifacts",
+        lambda *args, **kwargs: (model, processor, None),
+    )
+    root = Path(__file__).parent.parent
+    shutil.copy(root / "config.yaml", tmp_path / "config.yaml")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(root))
+    monkeypatch.delitem(sys.modules, "api", raising=False)
+    return importlib.import_module("api")
+
+
+def wait_for_warm_up(client, timeout_s=10.0):
+    """Polls `/health` until the warm-up is over, returning the response."""
+    deadline = time.monotonic() + timeout_s
+    response = client.get("/health")
+    while response.json()["status"] == "warming up":
+        assert time.monotonic() < deadline, "The warm-up never ended"
+        time.sleep(0.01)
+        response = client.get("/health")
+    return response
+
+
+def test_health_turns_ok_after_the_warm_up(api, monkeypatch):
+    warmed_up = threading.Event()
+    monkeypatch.setattr(api.transcriber, "warm_up", warmed_up.wait)
+
+    with TestClient(api.app) as client:
+        response = client.get("/health")
+        assert response.status_code == 503
+        assert response.json() == {"status": "warming up"}
+
+        warmed_up.set()
+        response = wait_for_warm_up(client)
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok"}
+
+
+def test_health_reports_a_failed_warm_up(api, monkeypatch, caplog):
+    def fail():
+        raise RuntimeError("inductor is not available")
+
+    monkeypatch.setattr(api.transcriber, "warm_up", fail)
+
+    with TestClient(api.app) as client:
+        response = wait_for_warm_up(client)
+
+    assert response.status_code == 503
+    assert response.json() == {
+        "status": "failed",
+        "detail": "RuntimeError: inductor is not available",
+    }
+    assert "Transcriber warm-up failed" in caplog.text
+
+
+def test_cache_lookups_and_writes_run_off_the_event_loop(api, monkeypatch):
+    threads = []
+
+    def recording(method):
+        def record(*args):
+            threads.append(threading.get_ident())
+            return method(*args)
+
+        return record
+
+    monkeypatch.setattr(
+        api.result_cache, "get", recording(api.result_cache.get)
+    )
+    monkeypatch.setattr(
+        api.result_cache, "put", recording(api.result_cache.put)
+    )
+    audio = io.BytesIO()
+    torchaudio.save(audio, torch.randn(1, 16000) * 0.1, 16000, format="wav")
+    files = {"file": ("audio.wav", audio.getvalue(), "audio/wav")}
+
+    with TestClient(api.app) as client:
+        loop_thread = client.portal.call(threading.get_ident)
+        first = client.post("/transcribe/phonemes", files=files)
+        second = client.post("/transcribe/phonemes", files=files)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert api.result_cache.stats()["memory_hits"] == 1
+    # a miss and a write, then a hit
+    assert len(threads) == 3
+    assert loop_thread not in threads
+
+
+def stream(client, waveform, sample_rate, chunk_size):
+    """Streams a waveform as 16-bit PCM chunks, returning the last reply."""
+    pcm = (waveform.clamp(-1, 1) * 32767).to(torch.int16).numpy().tobytes()
+    url = f"/transcribe/phonemes/stream?sample_rate={sample_rate}"
+    with client.websocket_connect(url) as websocket:
+        for i in range(0, len(pcm), chunk_size):
+            websocket.send_bytes(pcm[i : i + chunk_size])
+        websocket.send_text("end")
+        reply = websocket.receive_json()
+        while reply["type"] != "end":
+            reply = websocket.receive_json()
+    return reply
+
+
+@pytest.mark.parametrize("sample_rate", [44100, 48000])
+def test_stream_resamples_the_chunks_as_one_clip(
+    api, monkeypatch, sample_rate
+):
+    pushed = []
+    open_stream = api.transcriber.open_stream
+
+    def recording_stream(**options):
+        session = open_stream(**options)
+        push = session.push
+        monkeypatch.setattr(
+            session,
+            "push",
+            lambda samples: pushed.append(samples) or push(samples),
+        )
+        return session
+
+    monkeypatch.setattr(api.transcriber, "open_stream", recording_stream)
+    generator = torch.Generator().manual_seed(0)
+    waveform = torch.randn(3 * sample_rate, generator=generator) * 0.3
+
+    with TestClient(api.app) as client:
+        # an odd chunk size splits samples across chunks
+        reply = stream(client, waveform, sample_rate, chunk_size=2001)
+
+    assert reply["type"] == "end"
+    pcm = (waveform.clamp(-1, 1) * 32767).to(torch.int16).float() / 32768
+    expected = resample(pcm, sample_rate)
+    actual = torch.from_numpy(np.concatenate(pushed))
+    assert actual.shape == expected.shape
+    torch.testing.assert_close(actual, expected)
+
+
+def test_stream_rejects_an_invalid_sample_rate(api):
+    with TestClient(api.app) as client:
+        url = "/transcribe/phonemes/stream?sample_rate=0"
+        with client.websocket_connect(url) as websocket:
+            with pytest.raises(WebSocketDisconnect) as error:
+                websocket.receive_json()
+
+    assert error.value.code == 1008
 
 
 @pytest.mark.integration
@@ -33,3 +201,27 @@ def test_whisper_api(sample_audio_data, openai_word_transcription_service_url):
         sample_audio_data["transcription_words"]
         == response_data["transcription"].strip()
     )
+
+
+@pytest.mark.integration
+def test_combined_api(sample_audio_data, combined_transcription_service_url):
+    input_file = sample_audio_data["path"]
+    files = {"file": ("billet.mp3", open(str(input_file), "rb"), "audio/wav")}
+    params = {"model_size": "base", "pitch": True}
+    response = requests.post(
+        combined_transcription_service_url, files=files, params=params
+    )
+    assert (
+        response.status_code == 200
+    ), f"Request failed with status code {response.status_code}"
+    response_data = response.json()
+    assert (
+        sample_audio_data["transcription_phonemes"]
+        == response_data["phonemes"]["transcription"]
+    )
+    assert (
+        sample_audio_data["transcription_words"]
+        == response_data["words"]["transcription"].strip()
+    )
+    pitch = response_data["pitch"]
+    assert len(pitch["times"]) == len(pitch["frequencies"]) > 0